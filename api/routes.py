@@ -1,19 +1,23 @@
 """
 API路由定义
-处理/api/furigana端点的请求
+处理/api/furigana、/api/furigana/doc、/api/furigana/diff、/api/furigana/batch及/api/export端点的请求
 """
+import json
 import logging
-import re
-from typing import List, Dict, Any
-from flask import Blueprint, request, jsonify
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from flask import Blueprint, Response, g, request, jsonify
 
 from config import config
-from utils.kana_converter import (
-    katakana_to_hiragana, is_all_katakana, is_hiragana_text
+from services.annotation_service import annotation_service
+from services import metrics_service, profiling_service
+from services.document_service import (
+    VERSION_HEADER, content_version, document_etag, document_store, is_valid_hash
+)
+from services.export_service import SVG_MIMETYPE, THEMES, ExportOptions, export_service
+from utils.wire_format import (
+    COMPACT_MIMETYPE, FORMAT_HEADER, CompactEncoder, encode_compact, gzip_body, line_hash, wants_compact
 )
-from utils.text_processor import contains_kanji, collect_next_hiragana
-from services.tokenizer_service import tokenizer_service
-from services.reading_service import reading_service
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +25,190 @@ logger = logging.getLogger(__name__)
 # 创建蓝图
 api_bp = Blueprint('api', __name__)
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+class PayloadError(ValueError):
+    """请求参数不合法（返回400）"""
+
+
+def parse_furigana_payload(data: Any) -> Tuple[str, bool]:
+    """
+    校验 /furigana 请求体（WSGI与ASGI共用）
+    
+    Args:
+        data: 解析后的JSON请求体
+    
+    Returns:
+        (日语文本, 是否为片假名单词注音)
+    
+    Raises:
+        PayloadError: 参数缺失、类型错误或文本过长
+    """
+    if not data or not isinstance(data, dict) or "lyrics" not in data:
+        raise PayloadError("缺少lyrics参数")
+    
+    lyrics_text = data["lyrics"]
+    
+    # 验证文本类型
+    if not isinstance(lyrics_text, str):
+        raise PayloadError("lyrics参数必须是字符串类型")
+    
+    # 验证文本长度
+    if len(lyrics_text) > config.MAX_TEXT_LENGTH:
+        raise PayloadError(f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符")
+    
+    return lyrics_text, bool(data.get("katakana", True))
+
+
+def parse_diff_payload(data: Any) -> Tuple[List[str], Dict[str, str], bool]:
+    """
+    校验 /furigana/diff 请求体（WSGI与ASGI共用）
+    
+    Args:
+        data: 解析后的JSON请求体
+    
+    Returns:
+        (文档全部行哈希, 需要注音的行 {哈希: 行文本}, 是否为片假名单词注音)
+    
+    Raises:
+        PayloadError: 参数缺失、类型错误、文本过长或哈希不匹配
+    """
+    if not data or not isinstance(data, dict) or "hashes" not in data:
+        raise PayloadError("缺少hashes参数")
+    
+    hashes = data["hashes"]
+    changed = data.get("lines", {})
+    if not isinstance(hashes, list) or not all(isinstance(h, str) for h in hashes):
+        raise PayloadError("hashes参数必须是字符串数组")
+    if not isinstance(changed, dict) or not all(isinstance(t, str) for t in changed.values()):
+        raise PayloadError("lines参数必须是 {哈希: 行文本} 对象")
+    
+    # 文档行数不超过最大长度对应的行数
+    if len(hashes) > config.MAX_TEXT_LENGTH + 1:
+        raise PayloadError(f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符")
+    if sum(len(text) for text in changed.values()) > config.MAX_TEXT_LENGTH:
+        raise PayloadError(f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符")
+    
+    document = set(hashes)
+    for key, text in changed.items():
+        if '\n' in text:
+            raise PayloadError("lines中的行文本不能包含换行")
+        if key not in document or line_hash(text) != key:
+            raise PayloadError(f"行哈希不匹配: {key}")
+    
+    return hashes, changed, bool(data.get("katakana", True))
+
+
+def parse_export_payload(data: Any) -> Tuple[str, ExportOptions]:
+    """
+    校验 /export 请求体（WSGI与ASGI共用）
+    
+    Args:
+        data: 解析后的JSON请求体
+    
+    Returns:
+        (日语文本, 导出选项)
+    
+    Raises:
+        PayloadError: 参数缺失、类型错误或超出长度限制
+    """
+    lyrics_text, want_katakana_conversion = parse_furigana_payload(data)
+    
+    title = data.get("title", "")
+    if not isinstance(title, str):
+        raise PayloadError("title参数必须是字符串类型")
+    if len(title) > config.EXPORT_MAX_TITLE_LENGTH:
+        raise PayloadError(f"标题过长，最大长度为{config.EXPORT_MAX_TITLE_LENGTH}字符")
+    
+    theme = data.get("theme", "light")
+    if theme not in THEMES:
+        raise PayloadError(f"theme参数必须是 {'/'.join(THEMES)} 之一")
+    
+    readings = data.get("readings", [])
+    if not isinstance(readings, list) or not all(
+        isinstance(item, list) and len(item) == 3
+        and isinstance(item[0], int) and isinstance(item[1], int) and isinstance(item[2], str)
+        for item in readings
+    ):
+        raise PayloadError("readings参数必须是 [行号, token序号, 读音] 数组")
+    if sum(len(item[2]) for item in readings) > config.MAX_TEXT_LENGTH:
+        raise PayloadError(f"readings过长，最大长度为{config.MAX_TEXT_LENGTH}字符")
+    
+    options = ExportOptions(
+        title=title,
+        theme=theme,
+        katakana=want_katakana_conversion,
+        readings=tuple(sorted((line, token, text) for line, token, text in readings))
+    )
+    return lyrics_text, options
+
+
+def annotate_changed_lines(changed: Dict[str, str], want_katakana_conversion: bool) -> Dict[str, Any]:
+    """
+    为增量请求中的变更行注音
+    
+    Args:
+        changed: {哈希: 行文本}
+        want_katakana_conversion: 是否为片假名单词注音
+    
+    Returns:
+        {哈希: 行token列表}
+    """
+    keys = list(changed)
+    lines = annotation_service.annotate_lines([changed[k] for k in keys], want_katakana_conversion)
+    return dict(zip(keys, lines))
+
+
+@api_bp.before_request
+def _start_timer() -> None:
+    """记录请求开始时间"""
+    g.request_started = time.perf_counter()
+
+
+@api_bp.after_request
+def _record_request(response: Response) -> Response:
+    """记录请求耗时和状态（流式响应只统计到响应头发出为止）"""
+    started = g.get("request_started")
+    if started is not None:
+        metrics_service.record_request(
+            request.endpoint or "unknown",
+            response.status_code,
+            time.perf_counter() - started
+        )
+    return response
+
+
+@api_bp.after_request
+def _compress_response(response: Response) -> Response:
+    """客户端接受gzip时压缩较大的响应（流式响应不压缩，保证逐行到达）"""
+    if (
+        not config.RESPONSE_GZIP
+        or response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    
+    started = time.perf_counter()
+    compressed = gzip_body(
+        response.get_data(),
+        request.headers.get("Accept-Encoding", ""),
+        config.GZIP_MIN_BYTES,
+        config.GZIP_LEVEL
+    )
+    response.vary.add("Accept-Encoding")
+    if compressed is not None:
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = "gzip"
+        # 强ETag须区分编码
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag + "-gzip")
+        metrics_service.record_stage("compress", time.perf_counter() - started)
+    return response
+
 
 @api_bp.route('/furigana', methods=['POST'])
 def get_furigana() -> tuple:
@@ -30,283 +218,391 @@ def get_furigana() -> tuple:
     请求体:
         {
             "lyrics": "日语文本",
-            "katakana": true/false
+            "katakana": true/false,
+            "stream": true/false,  # 可选，也可通过 Accept: application/x-ndjson 开启
+            "format": "compact"    # 可选，也可通过 Accept: application/vnd.furigana.compact+json 开启
         }
     
+    请求头:
+        X-Furigana-Profile: 1   # 可选，开启本次请求的逐token剖析
+        Accept-Encoding: gzip   # 可选，较大的非流式响应以gzip压缩
+    
     返回:
         按行返回的token列表，每个token包含:
         - surface: 词表面形式
         - reading: 读音
         - alternatives: 备选读音列表
         - has_alternatives: 是否有多个读音
+        
+        流式模式下返回NDJSON，每行一个JSON数组，对应一行输入；
+        处理中途出错时输出 {"error": "..."} 并结束。
+        
+        紧凑格式（响应头 X-Furigana-Format: compact）见 utils/wire_format.py，
+        流式时每条记录为 [新增字符串, 新增候选列表, 行]。
+        
+        开启剖析时（非流式）响应头 X-Furigana-Profile 给出剖析摘要，
+        Server-Timing 给出各阶段耗时，完整明细写入慢请求日志。
+        
+        响应头 X-Furigana-Version 给出当前内容版本，之后同一文本可改用
+        GET /furigana/doc/<版本>/<文本SHA-256> 获取可缓存的结果。
     """
     try:
         data = request.get_json()
         
-        if not data or "lyrics" not in data:
-            return jsonify({"error": "缺少lyrics参数"}), 400
+        try:
+            lyrics_text, want_katakana_conversion = parse_furigana_payload(data)
+        except PayloadError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        lines = lyrics_text.split('\n')
+        metrics_service.record_request_size("furigana", len(lyrics_text), len(lines))
+        profile = profiling_service.start_profile(
+            lyrics_text, request.headers.get(profiling_service.PROFILE_HEADER)
+        )
+        compact = wants_compact(data, request.headers.get("Accept", ""))
+        document_store.remember(lyrics_text)
         
-        lyrics_text = data["lyrics"]
+        if _wants_stream(data):
+            headers = {
+                "X-Accel-Buffering": "no",
+                "Cache-Control": "no-cache",
+                VERSION_HEADER: content_version()
+            }
+            if compact:
+                headers[FORMAT_HEADER] = "compact"
+            return Response(
+                _stream_lines(lines, want_katakana_conversion, profile, compact),
+                mimetype=NDJSON_MIMETYPE,
+                headers=headers
+            )
         
-        # 验证文本类型
-        if not isinstance(lyrics_text, str):
-            return jsonify({"error": "lyrics参数必须是字符串类型"}), 400
+        # 重复行（如副歌）只计算一次，且命中进程级行缓存
+        started = time.perf_counter()
+        with profiling_service.activate(profile):
+            processed_lines = annotation_service.annotate_lines(
+                lines, want_katakana_conversion
+            )
+        annotated = time.perf_counter()
+        response = _lines_response(processed_lines, compact)
+        response.headers[VERSION_HEADER] = content_version()
+        serialized = time.perf_counter()
+        metrics_service.record_stage("annotate", annotated - started)
+        metrics_service.record_stage("serialize", serialized - annotated)
         
-        # 验证文本长度
-        if len(lyrics_text) > config.MAX_TEXT_LENGTH:
-            return jsonify({
-                "error": f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符"
-            }), 400
+        if profile is not None:
+            profile.add_stage("annotate", annotated - started)
+            profile.add_stage("serialize", serialized - annotated)
+            profiling_service.finish_profile(profile)
+            if profile.detailed:
+                response.headers[profiling_service.PROFILE_HEADER] = profile.summary_header()
+                response.headers["Server-Timing"] = profile.server_timing()
+        
+        return response
+    
+    except Exception as e:
+        logger.error(f"处理请求时发生错误: {e}", exc_info=True)
+        return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
+
+
+
+@api_bp.route('/furigana/doc/<version>/<digest>', methods=['GET'])
+def get_furigana_document(version: str, digest: str) -> tuple:
+    """
+    按内容寻址获取注音结果（可被浏览器缓存和CDN缓存）
+    
+    URL参数:
+        version: 内容版本（POST响应头 X-Furigana-Version）
+        digest: 文本UTF-8字节的SHA-256（64位小写十六进制）
+        ?katakana=0/1: 是否为片假名单词注音（默认1）
+    
+    返回格式同 POST /furigana（非流式，支持紧凑格式和gzip），并带强ETag和
+    长期 Cache-Control；If-None-Match 命中时返回304。
+    服务端没有该文本（未POST过、已淘汰或版本已更新）时返回404且不可缓存，
+    客户端应改用 POST /furigana。
+    """
+    try:
+        if not is_valid_hash(digest):
+            return jsonify({"error": "文本哈希格式错误"}), 400
+        
+        want_katakana_conversion = request.args.get("katakana", "1") != "0"
+        compact = wants_compact(None, request.headers.get("Accept", ""))
+        current = version == content_version()
+        etag = document_etag(version, digest, want_katakana_conversion, compact)
+        cache_control = f"public, max-age={config.HTTP_CACHE_MAX_AGE}, immutable"
+        
+        if current and (request.if_none_match.contains(etag) or request.if_none_match.contains(etag + "-gzip")):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
+            response.vary.add("Accept")
+            return response
+        
+        lyrics_text = document_store.lookup(digest) if current else None
+        if lyrics_text is None:
+            response = jsonify({"error": "文档不在缓存中，请使用POST请求"})
+            response.status_code = 404
+            response.headers["Cache-Control"] = "no-store"
+            response.headers[VERSION_HEADER] = content_version()
+            return response
         
-        want_katakana_conversion = bool(data.get("katakana", True))
         lines = lyrics_text.split('\n')
+        metrics_service.record_request_size("furigana_doc", len(lyrics_text), len(lines))
+        started = time.perf_counter()
+        processed_lines = annotation_service.annotate_lines(lines, want_katakana_conversion)
+        annotated = time.perf_counter()
+        response = _lines_response(processed_lines, compact)
+        metrics_service.record_stage("annotate", annotated - started)
+        metrics_service.record_stage("serialize", time.perf_counter() - annotated)
         
-        processed_lines = []
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = cache_control
+        response.headers[VERSION_HEADER] = version
+        return response
+    
+    except Exception as e:
+        logger.error(f"处理GET请求时发生错误: {e}", exc_info=True)
+        return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
+
+
+def _lines_response(processed_lines: List[Any], compact: bool) -> Response:
+    """按协商的格式序列化注音结果"""
+    if compact:
+        response = Response(
+            json.dumps(encode_compact(processed_lines), ensure_ascii=False, separators=(',', ':')),
+            mimetype=COMPACT_MIMETYPE
+        )
+        response.headers[FORMAT_HEADER] = "compact"
+    else:
+        response = jsonify(processed_lines)
+    response.vary.add("Accept")
+    return response
+
+
+def _wants_stream(data: dict) -> bool:
+    """判断请求是否要求流式返回"""
+    if data.get("stream"):
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def _stream_lines(
+    lines: List[str],
+    want_katakana_conversion: bool,
+    profile: Optional[profiling_service.RequestProfile] = None,
+    compact: bool = False
+) -> Iterator[str]:
+    """
+    逐行注音并输出NDJSON，每完成一行立即发送
+    
+    响应头在生成第一行前已发出，剖析结果只写入慢请求日志
+    """
+    started = time.perf_counter()
+    encoder = CompactEncoder() if compact else None
+    try:
+        with profiling_service.activate(profile):
+            for line_result in annotation_service.iter_annotated_lines(
+                lines, want_katakana_conversion
+            ):
+                record = encoder.encode_stream_record(line_result) if encoder else line_result
+                yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        # 流式模式下注音与序列化交替进行，整体计入annotate阶段
+        elapsed = time.perf_counter() - started
+        metrics_service.record_stage("annotate", elapsed)
+        if profile is not None:
+            profile.add_stage("annotate", elapsed)
+            profiling_service.finish_profile(profile)
+    except Exception as e:
+        logger.error(f"流式处理请求时发生错误: {e}", exc_info=True)
+        yield json.dumps({"error": f"服务器内部错误: {str(e)}"}, ensure_ascii=False) + '\n'
+
+
+@api_bp.route('/furigana/diff', methods=['POST'])
+def get_furigana_diff() -> tuple:
+    """
+    增量注音：只为客户端尚无结果的行注音
+    
+    客户端以行哈希（见 utils/wire_format.line_hash）缓存已渲染的行结果，
+    编辑后只发送哈希未命中的行，并把返回结果拼接进已渲染的输出，
+    耗时取决于编辑涉及的行数而不是文档长度。
+    
+    请求体:
+        {
+            "hashes": ["8位十六进制", ...],   # 编辑后文档每行的哈希（按行序）
+            "lines": {"哈希": "行文本", ...},  # 需要注音的行
+            "katakana": true/false
+        }
+    
+    返回:
+        {"results": {"哈希": [token, ...], ...}}
+    """
+    try:
+        try:
+            _, changed, want_katakana_conversion = parse_diff_payload(request.get_json(silent=True))
+        except PayloadError as e:
+            return jsonify({"error": str(e)}), 400
         
-        for line in lines:
-            if not line.strip():
-                processed_lines.append([])
-                continue
-            
-            # 使用智能分词
-            tokens = tokenizer_service.smart_tokenize(line)
-            line_result = []
-            
-            for idx, m in enumerate(tokens):
-                surface = m.surface()
-                reading = m.reading_form()
-                pos = m.part_of_speech()
-                
-                reading_hiragana = ""
-                alternative_readings = []
-                
-                # 处理空白和符号
-                if surface.isspace() or pos[0] == "補助記号":
-                    reading_hiragana = surface
-                else:
-                    # 检查是否为片假名单词
-                    if is_all_katakana(surface) and len(surface) > 1:
-                        if want_katakana_conversion:
-                            reading_hiragana = katakana_to_hiragana(surface)
-                        else:
-                            reading_hiragana = ""
-                    # 非片假名单词
-                    else:
-                        if reading and reading != "*":
-                            reading_hiragana = katakana_to_hiragana(reading)
-                            
-                            # 英文不注音
-                            if re.fullmatch(r"[A-Za-z\s]+", surface or ""):
-                                reading_hiragana = ""
-                            
-                            # 助词/助动词/符号/纯假名不出多音菜单
-                            if reading_service.should_skip_alternatives(pos[0], surface):
-                                alternative_readings = []
-                            # 为汉字单词获取多音字选项
-                            elif contains_kanji(surface):
-                                alternative_readings = reading_service.get_alternative_readings_with_primary(
-                                    surface,
-                                    reading_hiragana,
-                                    line
-                                )
-                                
-                                # 融合外部词典
-                                alternative_readings = reading_service.add_external_dictionary_candidates(
-                                    surface, 
-                                    alternative_readings
-                                )
-                                
-                                # 白名单合并
-                                white = reading_service.get_reading_whitelist(surface)
-                                if white:
-                                    alternative_readings = _merge_with_whitelist(
-                                        reading_hiragana,
-                                        white,
-                                        alternative_readings
-                                    )
-                                
-                                # 特殊字符处理
-                                if surface == "僕":
-                                    allow = set(reading_service.get_reading_whitelist(surface) or [])
-                                    if allow:
-                                        alternative_readings = [
-                                            r for r in alternative_readings 
-                                            if r in allow or r == reading_hiragana
-                                        ]
-                                
-                                # 全局裁剪
-                                alternative_readings = reading_service.restrict_to_kanjidic_allowlist(
-                                    surface, 
-                                    alternative_readings, 
-                                    reading_hiragana
-                                )
-                                
-                                # 特殊词汇处理
-                                alternative_readings, reading_hiragana = _handle_special_words(
-                                    surface, tokens, idx, reading_hiragana, alternative_readings
-                                )
-                                
-                                # 过滤候选
-                                alternative_readings = _filter_with_context(
-                                    tokens, idx, reading, reading_hiragana, 
-                                    surface, alternative_readings
-                                )
-                        else:
-                            reading_hiragana = ""
-                
-                line_result.append({
-                    "surface": surface,
-                    "reading": reading_hiragana,
-                    "alternatives": alternative_readings,
-                    "has_alternatives": len(alternative_readings) > 1
-                })
-            
-            processed_lines.append(line_result)
+        metrics_service.record_request_size(
+            "furigana_diff", sum(len(text) for text in changed.values()), len(changed)
+        )
+        started = time.perf_counter()
+        results = annotate_changed_lines(changed, want_katakana_conversion)
+        annotated = time.perf_counter()
+        response = jsonify({"results": results})
+        metrics_service.record_stage("annotate", annotated - started)
+        metrics_service.record_stage("serialize", time.perf_counter() - annotated)
+        return response
+    
+    except Exception as e:
+        logger.error(f"处理增量请求时发生错误: {e}", exc_info=True)
+        return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
+
+
+@api_bp.route('/export', methods=['POST'])
+def export_svg() -> tuple:
+    """
+    导出注音结果为SVG图片（服务端排版，替代前端截图）
+    
+    请求体:
+        {
+            "lyrics": "日语文本",
+            "katakana": true/false,
+            "title": "标题",                       # 可选
+            "theme": "light" / "dark",             # 可选
+            "readings": [[行号, token序号, "读音"], ...]  # 可选，用户修改过的读音
+        }
+    
+    返回:
+        image/svg+xml。首次导出时逐行流式输出（注音一行输出一行），
+        完整结果按内容缓存，之后相同的请求直接返回缓存（可gzip压缩）。
+    """
+    try:
+        try:
+            lyrics_text, options = parse_export_payload(request.get_json(silent=True))
+        except PayloadError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        lines = lyrics_text.split('\n')
+        metrics_service.record_request_size("export", len(lyrics_text), len(lines))
+        key = export_service.cache_key(lyrics_text, options)
+        svg = export_service.cached(key)
+        if svg is not None:
+            return Response(svg, mimetype=SVG_MIMETYPE)
         
-        return jsonify(processed_lines)
+        return Response(
+            _stream_export(lines, options, key),
+            mimetype=SVG_MIMETYPE,
+            headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"}
+        )
     
     except Exception as e:
-        logger.error(f"处理请求时发生错误: {e}", exc_info=True)
+        logger.error(f"处理导出请求时发生错误: {e}", exc_info=True)
         return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
 
 
-def _merge_with_whitelist(
-    reading_hiragana: str,
-    white: List[str],
-    alternative_readings: List[str]
-) -> List[str]:
-    """合并白名单和候选读音"""
-    merged = []
-    seen = set()
-    
-    # 1) 先放当前上下文读音
-    if reading_hiragana:
-        merged.append(reading_hiragana)
-        seen.add(reading_hiragana)
-    
-    # 2) 再放白名单
-    for r in white:
-        if r and r not in seen:
-            seen.add(r)
-            merged.append(r)
-    
-    # 3) 最后放通用候选
-    for r in alternative_readings:
-        if r and r not in seen:
-            seen.add(r)
-            merged.append(r)
-    
-    return merged
-
-
-def _handle_special_words(
-    surface: str,
-    tokens: List,
-    idx: int,
-    reading_hiragana: str,
-    alternative_readings: List[str]
-) -> tuple:
+def _stream_export(lines: List[str], options: ExportOptions, key: str) -> Iterator[bytes]:
+    """逐行注音并输出SVG（响应头已发出，出错时只能记录日志并截断输出）"""
+    started = time.perf_counter()
+    try:
+        yield from export_service.iter_svg(
+            len(lines),
+            annotation_service.iter_annotated_lines(lines, options.katakana),
+            options,
+            key
+        )
+        metrics_service.record_stage("export", time.perf_counter() - started)
+    except Exception as e:
+        logger.error(f"流式导出时发生错误: {e}", exc_info=True)
+
+
+@api_bp.route('/furigana/batch', methods=['POST'])
+def get_furigana_batch() -> tuple:
     """
-    处理特殊词汇的读音
-    返回: (alternative_readings, reading_hiragana)
+    批量获取多篇文档的假名注音
+    
+    整个批次共享分词器和缓存，相同的行跨文档只计算一次；
+    长度限制按批次总长度(MAX_BATCH_TEXT_LENGTH)而非单篇计算。
+    
+    请求体:
+        {
+            "documents": [
+                {"id": "可选标识", "lyrics": "日语文本", "katakana": true/false},
+                ...
+            ],
+            "katakana": true/false   # 文档未指定时的默认值
+        }
+    
+    返回:
+        {
+            "results": [
+                {"id": ..., "lines": [...]},       # 成功
+                {"id": ..., "error": "错误信息"}    # 单篇失败
+            ]
+        }
     """
-    from utils.text_processor import extract_trailing_hiragana, voicing_variants
-    
-    # 1. 送假名内部容错过滤
-    surf_tail = extract_trailing_hiragana(surface)
-    if surf_tail and reading_hiragana and reading_hiragana.endswith(surf_tail):
-        base = reading_hiragana[:-len(surf_tail)] if len(surf_tail) <= len(reading_hiragana) else reading_hiragana
-        vset = voicing_variants(surf_tail[0])
-        bad_forms = set()
-        for v in vset:
-            if v == surf_tail[0]:
-                continue
-            bad_forms.add(base + v)
-            bad_forms.add(base + v + surf_tail[1:])
-        if bad_forms:
-            alternative_readings = [r for r in alternative_readings if r not in bad_forms]
-    
-    # 2. "明"字特殊处理
-    if surface in {"明", "明くる", "明る"}:
-        n1 = tokens[idx + 1] if idx + 1 < len(tokens) else None
-        n2 = tokens[idx + 2] if idx + 2 < len(tokens) else None
-        n1s = n1.surface() if n1 else ""
-        n2s = n2.surface() if n2 else ""
+    try:
+        data = request.get_json(silent=True)
         
-        if surface == "明くる" or (surface == "明る" and n1s in {"日", "朝", "年"}):
-            reading_hiragana = "あくる"
-        elif surface == "明" and (n1s in {"る", "く", "くる"} or (n1s == "く" and n2s == "る")):
-            reading_hiragana = "あく"
+        if not data or not isinstance(data, dict) or "documents" not in data:
+            return jsonify({"error": "缺少documents参数"}), 400
         
-        # 提供候选
-        if surface == "明" and reading_hiragana == "あく":
-            cand = [reading_hiragana, "あか"]
-        elif reading_hiragana == "あくる":
-            cand = [reading_hiragana, "あかる"]
-        else:
-            cand = [reading_hiragana, "あか", "あかる"]
+        documents = data["documents"]
+        if not isinstance(documents, list):
+            return jsonify({"error": "documents参数必须是数组"}), 400
         
-        seen = set()
-        alternative_readings = [c for c in cand if c and not (c in seen or seen.add(c))]
-    
-    # 3. "何"字特殊处理
-    if surface == "何":
-        next_token = tokens[idx + 1] if idx + 1 < len(tokens) else None
-        if next_token is not None:
-            next_surface = next_token.surface()
-            next_pos0 = next_token.part_of_speech()[0]
-            if next_pos0 == "助詞" and next_surface in {"も", "か", "が", "を", "に", "へ", "と"}:
-                reading_hiragana = "なに"
+        if len(documents) > config.MAX_BATCH_DOCUMENTS:
+            return jsonify({
+                "error": f"文档过多，单批最多{config.MAX_BATCH_DOCUMENTS}篇"
+            }), 400
         
-        # 始终提供「なに/なん」两个选项
-        alt_set = set(alternative_readings) if alternative_readings else set()
-        alt_set.update(["なに", "なん"])
-        ordered = [reading_hiragana] + [r for r in alt_set if r != reading_hiragana]
-        alternative_readings = ordered
-    
-    return alternative_readings, reading_hiragana
-
-
-def _filter_with_context(
-    tokens: List,
-    idx: int,
-    reading: str,
-    reading_hiragana: str,
-    surface: str,
-    alternative_readings: List[str]
-) -> List[str]:
-    """基于上下文过滤候选读音"""
-    from utils.text_processor import voicing_variants
-    
-    # 收集后续平假名
-    next_hira = collect_next_hiragana(tokens, idx, max_chars=2)
-    
-    # 特殊处理：皆
-    keep_always = []
-    if surface == "皆":
-        keep_always.append("みんな")
-    
-    # 通用防误拼
-    if next_hira:
-        bad_suffixes = {next_hira, next_hira[:1]}
+        total_length = sum(
+            len(doc["lyrics"]) for doc in documents
+            if isinstance(doc, dict) and isinstance(doc.get("lyrics"), str)
+        )
+        if total_length > config.MAX_BATCH_TEXT_LENGTH:
+            return jsonify({
+                "error": f"批次文本过长，总长度上限为{config.MAX_BATCH_TEXT_LENGTH}字符"
+            }), 400
         
-        # 浊音变体
-        first = next_hira[0]
-        variants = voicing_variants(first)
-        for v in variants:
-            bad_suffixes.add(v)
-            if len(next_hira) > 1:
-                bad_suffixes.add(v + next_hira[1:])
+        default_katakana = bool(data.get("katakana", True))
+        computed = {}
+        results = []
+        total_lines = sum(
+            doc["lyrics"].count('\n') + 1 for doc in documents
+            if isinstance(doc, dict) and isinstance(doc.get("lyrics"), str)
+        )
+        metrics_service.record_request_size("furigana_batch", total_length, total_lines)
+        started = time.perf_counter()
         
-        alternative_readings = [
-            r for r in alternative_readings 
-            if not any(r.endswith(suf) for suf in bad_suffixes if suf)
-        ]
+        for index, doc in enumerate(documents):
+            if not isinstance(doc, dict):
+                results.append({"id": index, "error": "文档必须是对象"})
+                continue
+            
+            doc_id = doc.get("id", index)
+            lyrics_text = doc.get("lyrics")
+            if not isinstance(lyrics_text, str):
+                results.append({"id": doc_id, "error": "lyrics参数必须是字符串类型"})
+                continue
+            
+            try:
+                want_katakana_conversion = bool(doc.get("katakana", default_katakana))
+                lines = annotation_service.annotate_lines(
+                    lyrics_text.split('\n'),
+                    want_katakana_conversion,
+                    computed
+                )
+                results.append({"id": doc_id, "lines": lines})
+            except Exception as e:
+                logger.error(f"批量处理文档{doc_id}时发生错误: {e}", exc_info=True)
+                results.append({"id": doc_id, "error": f"服务器内部错误: {str(e)}"})
         
-        # 进一步过滤：默认读音 + 变体
-        if reading_hiragana:
-            ban_heads = {reading_hiragana + v for v in variants}
-            alternative_readings = [r for r in alternative_readings if r not in ban_heads]
+        annotated = time.perf_counter()
+        response = jsonify({"results": results})
+        metrics_service.record_stage("annotate", annotated - started)
+        metrics_service.record_stage("serialize", time.perf_counter() - annotated)
+        return response
     
-    return alternative_readings
-
+    except Exception as e:
+        logger.error(f"处理批量请求时发生错误: {e}", exc_info=True)
+        return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
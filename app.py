@@ -3,11 +3,16 @@ Flask应用主入口
 采用应用工厂模式，模块化设计
 """
 import logging
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 
 from config import config
 from api.routes import api_bp
+from services.lifecycle import init_services, freeze_shared_state
+from services import metrics_service, profiling_service
+from services.document_service import VERSION_HEADER
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.wire_format import FORMAT_HEADER
 
 
 def setup_logging() -> None:
@@ -28,7 +33,7 @@ def create_app(config_obj=None) -> Flask:
     
     Args:
         config_obj: 配置对象，如果为None则使用默认配置
-        
+    
     Returns:
         Flask应用实例
     """
@@ -49,18 +54,25 @@ def create_app(config_obj=None) -> Flask:
     else:
         config.validate()
     
-    # 配置CORS
+    # 配置CORS（暴露剖析响应头供前端读取）
+    expose_headers = [profiling_service.PROFILE_HEADER, "Server-Timing", FORMAT_HEADER, VERSION_HEADER]
     if config.CORS_ORIGINS == '*':
-        CORS(app)
+        CORS(app, expose_headers=expose_headers)
         logger.warning("⚠ CORS允许所有源，生产环境请设置CORS_ORIGINS")
     else:
-        CORS(app, origins=config.CORS_ORIGINS.split(','))
+        CORS(app, origins=config.CORS_ORIGINS.split(','), expose_headers=expose_headers)
         logger.info(f"✓ CORS配置完成: {config.CORS_ORIGINS}")
     
     # 注册蓝图
     app.register_blueprint(api_bp, url_prefix='/api')
     logger.info("✓ API蓝图注册完成")
     
+    # 预加载词典（gunicorn --preload 时在主进程执行，工作进程共享）
+    if config.PRELOAD_SERVICES:
+        init_services()
+        if config.GC_FREEZE:
+            freeze_shared_state()
+    
     # 首页路由
     @app.route("/")
     def index():
@@ -76,6 +88,13 @@ def create_app(config_obj=None) -> Flask:
             "timestamp": __import__('datetime').datetime.now().isoformat()
         })
     
+    # Prometheus指标端点（多worker时汇总 METRICS_DIR 下各进程的快照）
+    @app.route("/metrics")
+    def metrics():
+        if not metrics_service.registry.enabled:
+            return Response("metrics disabled\n", status=404, mimetype='text/plain')
+        return Response(metrics_service.render(), content_type=METRICS_CONTENT_TYPE)
+    
     logger.info("=" * 50)
     logger.info("日语平假名注音器启动成功")
     logger.info(f"服务器地址: http://{config.HOST}:{config.PORT}")
@@ -0,0 +1,591 @@
+"""
+ASGI应用入口
+与 app.create_app 共用服务层，提供 /api/furigana、/api/furigana/doc、/api/furigana/diff、
+/api/export、/health、/metrics 和静态文件
+
+事件循环只负责收发数据，慢速上传/下载的连接只占用一个协程；分词注音等CPU密集的
+同步代码在有界线程池(ASGI_THREADS)中执行，超出的请求在协程中排队等待，不占线程。
+多核并行仍依靠多个工作进程（--workers）或并行注音进程池(PARALLEL_WORKERS)。
+
+用法:
+    uvicorn asgi:create_asgi_app --factory --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker "asgi:create_asgi_app()"
+"""
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+from app import setup_logging
+from config import config
+from api.routes import (
+    NDJSON_MIMETYPE, PayloadError, annotate_changed_lines, parse_diff_payload, parse_export_payload,
+    parse_furigana_payload
+)
+from services.annotation_service import annotation_service
+from services.lifecycle import init_services
+from services import metrics_service, profiling_service
+from services.document_service import (
+    VERSION_HEADER, content_version, document_etag, document_store, is_valid_hash
+)
+from services.export_service import SVG_MIMETYPE, export_service
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.wire_format import (
+    COMPACT_MIMETYPE, FORMAT_HEADER, CompactEncoder, encode_compact, gzip_body, wants_compact
+)
+
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+
+JSON_CONTENT_TYPE = 'application/json'
+
+DOCUMENT_PREFIX = '/api/furigana/doc/'
+
+# 请求体上限：JSON中每个字符最多转义为6字节，另加字段开销
+MAX_BODY_BYTES = config.MAX_TEXT_LENGTH * 6 + 4096
+
+
+class RequestTooLarge(Exception):
+    """请求体超过上限"""
+
+
+class AsgiApp:
+    """注音服务的ASGI应用"""
+    
+    def __init__(self, threads: int = config.ASGI_THREADS):
+        """
+        Args:
+            threads: 注音线程池大小
+        """
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="annotate")
+        self.static_root = os.path.realpath(os.path.join(config.BASE_DIR, config.STATIC_FOLDER))
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._routes: Dict[Tuple[str, str], Callable] = {
+            ("POST", "/api/furigana"): self.furigana,
+            ("POST", "/api/furigana/diff"): self.furigana_diff,
+            ("POST", "/api/export"): self.export,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.handle_http(scope, receive, send)
+    
+    async def lifespan(self, receive: Callable, send: Callable) -> None:
+        """启动时在线程中预加载服务数据，关闭时释放线程池"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if config.PRELOAD_SERVICES:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, init_services)
+                except Exception as e:
+                    logger.error(f"✗ 服务数据加载失败: {e}", exc_info=True)
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    
+    async def run_sync(self, func: Callable, *args) -> Any:
+        """在注音线程池中执行同步函数，线程全部占用时在协程中排队"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.threads)
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def handle_http(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """路由分发"""
+        method = scope["method"]
+        path = scope["path"]
+        headers = _header_dict(scope)
+        cors = self.cors_headers(headers)
+        
+        if method == "OPTIONS":
+            await _respond(send, 204, b"", None, cors + self.preflight_headers(headers))
+            return
+        
+        handler = self._routes.get((method, path))
+        if method == "GET" and path.startswith(DOCUMENT_PREFIX):
+            await self.furigana_document(scope, receive, send, headers, cors)
+        elif handler is not None:
+            await handler(scope, receive, send, headers, cors)
+        elif method in ("GET", "HEAD"):
+            await self.static(path, send, cors, head=method == "HEAD")
+        else:
+            status = 405 if any(p == path for _, p in self._routes) else 404
+            await _respond_json(send, status, {"error": "不支持的请求"}, cors)
+    
+    async def furigana(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """POST /api/furigana，参数和返回格式同WSGI版本"""
+        started = time.perf_counter()
+        status = 500
+        try:
+            try:
+                body = await _read_body(receive, MAX_BODY_BYTES)
+            except RequestTooLarge:
+                status = 413
+                await _respond_json(send, status, {
+                    "error": f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符"
+                }, cors)
+                return
+            
+            try:
+                data = json.loads(body) if body else None
+                lyrics_text, want_katakana_conversion = parse_furigana_payload(data)
+            except (ValueError, PayloadError) as e:
+                status = 400
+                message = str(e) if isinstance(e, PayloadError) else "缺少lyrics参数"
+                await _respond_json(send, status, {"error": message}, cors)
+                return
+            
+            lines = lyrics_text.split('\n')
+            metrics_service.record_request_size("furigana", len(lyrics_text), len(lines))
+            # 文本写入共享的持久缓存（SQLite），不在事件循环中执行
+            await self.run_sync(document_store.remember, lyrics_text)
+            version = content_version()
+            profile = profiling_service.start_profile(
+                lyrics_text, headers.get(profiling_service.PROFILE_HEADER.lower())
+            )
+            
+            compact = wants_compact(data, headers.get("accept", ""))
+            
+            status = 200
+            if _wants_stream(data, headers.get("accept", "")):
+                await self.stream_lines(send, lines, want_katakana_conversion, profile,
+                                        cors + [(VERSION_HEADER.lower().encode(), version.encode())], compact)
+                return
+            
+            payload, annotate_time, serialize_time, compress_time = await self.run_sync(
+                _annotate_and_serialize, lines, want_katakana_conversion, profile,
+                compact, headers.get("accept-encoding", "")
+            )
+            metrics_service.record_stage("annotate", annotate_time)
+            metrics_service.record_stage("serialize", serialize_time)
+            
+            extra = list(cors)
+            extra.append((b"vary", b"Accept, Accept-Encoding"))
+            extra.append((VERSION_HEADER.lower().encode(), version.encode()))
+            if compact:
+                extra.append((FORMAT_HEADER.lower().encode(), b"compact"))
+            if compress_time is not None:
+                metrics_service.record_stage("compress", compress_time)
+                extra.append((b"content-encoding", b"gzip"))
+            if profile is not None:
+                profile.add_stage("annotate", annotate_time)
+                profile.add_stage("serialize", serialize_time)
+                profiling_service.finish_profile(profile)
+                if profile.detailed:
+                    extra.append((profiling_service.PROFILE_HEADER.lower().encode(),
+                                  profile.summary_header().encode('latin-1', 'replace')))
+                    extra.append((b"server-timing", profile.server_timing().encode()))
+            await _respond(send, 200, payload, COMPACT_MIMETYPE if compact else JSON_CONTENT_TYPE, extra)
+        
+        except Exception as e:
+            logger.error(f"处理请求时发生错误: {e}", exc_info=True)
+            status = 500
+            await _respond_json(send, 500, {"error": f"服务器内部错误: {str(e)}"}, cors)
+        finally:
+            metrics_service.record_request("api.get_furigana", status, time.perf_counter() - started)
+    
+    async def furigana_document(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """GET /api/furigana/doc/<版本>/<文本哈希>，参数和返回格式同WSGI版本"""
+        started = time.perf_counter()
+        status = 500
+        try:
+            parts = scope["path"][len(DOCUMENT_PREFIX):].split("/")
+            if len(parts) != 2 or not is_valid_hash(parts[1]):
+                status = 400
+                await _respond_json(send, status, {"error": "文本哈希格式错误"}, cors)
+                return
+            version, digest = parts
+            
+            query = parse_qs(scope.get("query_string", b"").decode('latin-1'))
+            want_katakana_conversion = query.get("katakana", ["1"])[0] != "0"
+            compact = wants_compact(None, headers.get("accept", ""))
+            current = version == content_version()
+            etag = document_etag(version, digest, want_katakana_conversion, compact)
+            cache_headers = [
+                (b"cache-control", f"public, max-age={config.HTTP_CACHE_MAX_AGE}, immutable".encode()),
+                (b"vary", b"Accept, Accept-Encoding"),
+            ]
+            
+            if current and _etag_matches(headers.get("if-none-match", ""), etag):
+                status = 304
+                await _respond(send, status, b"", None, cors + cache_headers + [(b"etag", f'"{etag}"'.encode())])
+                return
+            
+            lyrics_text = await self.run_sync(document_store.lookup, digest) if current else None
+            if lyrics_text is None:
+                status = 404
+                await _respond_json(send, status, {"error": "文档不在缓存中，请使用POST请求"}, cors + [
+                    (b"cache-control", b"no-store"),
+                    (VERSION_HEADER.lower().encode(), content_version().encode()),
+                ])
+                return
+            
+            lines = lyrics_text.split('\n')
+            metrics_service.record_request_size("furigana_doc", len(lyrics_text), len(lines))
+            payload, annotate_time, serialize_time, compress_time = await self.run_sync(
+                _annotate_and_serialize, lines, want_katakana_conversion, None,
+                compact, headers.get("accept-encoding", "")
+            )
+            metrics_service.record_stage("annotate", annotate_time)
+            metrics_service.record_stage("serialize", serialize_time)
+            
+            extra = cors + cache_headers + [(VERSION_HEADER.lower().encode(), version.encode())]
+            if compact:
+                extra.append((FORMAT_HEADER.lower().encode(), b"compact"))
+            if compress_time is not None:
+                metrics_service.record_stage("compress", compress_time)
+                extra.append((b"content-encoding", b"gzip"))
+                etag += "-gzip"
+            extra.append((b"etag", f'"{etag}"'.encode()))
+            status = 200
+            await _respond(send, status, payload, COMPACT_MIMETYPE if compact else JSON_CONTENT_TYPE, extra)
+        
+        except Exception as e:
+            logger.error(f"处理GET请求时发生错误: {e}", exc_info=True)
+            status = 500
+            await _respond_json(send, 500, {"error": f"服务器内部错误: {str(e)}"}, cors)
+        finally:
+            metrics_service.record_request("api.get_furigana_document", status, time.perf_counter() - started)
+    
+    async def furigana_diff(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """POST /api/furigana/diff，参数和返回格式同WSGI版本"""
+        started = time.perf_counter()
+        status = 500
+        try:
+            try:
+                body = await _read_body(receive, MAX_BODY_BYTES)
+                _, changed, want_katakana_conversion = parse_diff_payload(json.loads(body) if body else None)
+            except RequestTooLarge:
+                status = 413
+                await _respond_json(send, status, {
+                    "error": f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符"
+                }, cors)
+                return
+            except (ValueError, PayloadError) as e:
+                status = 400
+                message = str(e) if isinstance(e, PayloadError) else "缺少hashes参数"
+                await _respond_json(send, status, {"error": message}, cors)
+                return
+            
+            metrics_service.record_request_size(
+                "furigana_diff", sum(len(text) for text in changed.values()), len(changed)
+            )
+            annotate_started = time.perf_counter()
+            results = await self.run_sync(annotate_changed_lines, changed, want_katakana_conversion)
+            metrics_service.record_stage("annotate", time.perf_counter() - annotate_started)
+            status = 200
+            await _respond_json(send, status, {"results": results}, cors)
+        
+        except Exception as e:
+            logger.error(f"处理增量请求时发生错误: {e}", exc_info=True)
+            status = 500
+            await _respond_json(send, 500, {"error": f"服务器内部错误: {str(e)}"}, cors)
+        finally:
+            metrics_service.record_request("api.get_furigana_diff", status, time.perf_counter() - started)
+    
+    async def export(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """POST /api/export，参数和返回格式同WSGI版本；逐行在线程池中注音排版，发送时不占用线程"""
+        started = time.perf_counter()
+        status = 500
+        response_started = False
+        try:
+            try:
+                body = await _read_body(receive, MAX_BODY_BYTES)
+                lyrics_text, options = parse_export_payload(json.loads(body) if body else None)
+            except RequestTooLarge:
+                status = 413
+                await _respond_json(send, status, {
+                    "error": f"文本过长，最大长度为{config.MAX_TEXT_LENGTH}字符"
+                }, cors)
+                return
+            except (ValueError, PayloadError) as e:
+                status = 400
+                message = str(e) if isinstance(e, PayloadError) else "缺少lyrics参数"
+                await _respond_json(send, status, {"error": message}, cors)
+                return
+            
+            lines = lyrics_text.split('\n')
+            metrics_service.record_request_size("export", len(lyrics_text), len(lines))
+            key = export_service.cache_key(lyrics_text, options)
+            svg = export_service.cached(key)
+            status = 200
+            if svg is not None:
+                extra = list(cors)
+                extra.append((b"vary", b"Accept-Encoding"))
+                compressed = None
+                if config.RESPONSE_GZIP:
+                    compressed = gzip_body(svg, headers.get("accept-encoding", ""),
+                                           config.GZIP_MIN_BYTES, config.GZIP_LEVEL)
+                if compressed is not None:
+                    extra.append((b"content-encoding", b"gzip"))
+                await _respond(send, status, compressed or svg, SVG_MIMETYPE, extra)
+                return
+            
+            await send({"type": "http.response.start", "status": status, "headers": [
+                (b"content-type", SVG_MIMETYPE.encode()),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ] + cors})
+            response_started = True
+            chunks = export_service.iter_svg(
+                len(lines), annotation_service.iter_annotated_lines(lines, options.katakana), options, key
+            )
+            while True:
+                chunk = await self.run_sync(_next_line, chunks, None)
+                if chunk is None:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            metrics_service.record_stage("export", time.perf_counter() - started)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        
+        except Exception as e:
+            logger.error(f"处理导出请求时发生错误: {e}", exc_info=True)
+            if response_started:
+                # 响应头已发出，只能截断输出
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                status = 500
+                await _respond_json(send, 500, {"error": f"服务器内部错误: {str(e)}"}, cors)
+        finally:
+            metrics_service.record_request("api.export_svg", status, time.perf_counter() - started)
+    
+    async def stream_lines(
+        self,
+        send: Callable,
+        lines: List[str],
+        want_katakana_conversion: bool,
+        profile: Optional[profiling_service.RequestProfile],
+        cors: Headers,
+        compact: bool = False
+    ) -> None:
+        """逐行注音并输出NDJSON，每行在线程池中计算，发送时不占用线程"""
+        response_headers = [
+            (b"content-type", NDJSON_MIMETYPE.encode()),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]
+        if compact:
+            response_headers.append((FORMAT_HEADER.lower().encode(), b"compact"))
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers + cors})
+        started = time.perf_counter()
+        iterator = annotation_service.iter_annotated_lines(lines, want_katakana_conversion)
+        encoder = CompactEncoder() if compact else None
+        try:
+            while True:
+                line_result = await self.run_sync(_next_line, iterator, profile)
+                if line_result is None:
+                    break
+                record = encoder.encode_stream_record(line_result) if encoder else line_result
+                chunk = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                await send({"type": "http.response.body", "body": chunk.encode('utf-8'), "more_body": True})
+            elapsed = time.perf_counter() - started
+            metrics_service.record_stage("annotate", elapsed)
+            if profile is not None:
+                profile.add_stage("annotate", elapsed)
+                profiling_service.finish_profile(profile)
+        except Exception as e:
+            logger.error(f"流式处理请求时发生错误: {e}", exc_info=True)
+            error = json.dumps({"error": f"服务器内部错误: {str(e)}"}, ensure_ascii=False) + '\n'
+            await send({"type": "http.response.body", "body": error.encode('utf-8'), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    
+    async def health(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """健康检查"""
+        await _respond_json(send, 200, {
+            "status": "healthy",
+            "service": "Japanese Furigana Generator",
+            "timestamp": __import__('datetime').datetime.now().isoformat()
+        }, cors)
+    
+    async def metrics(self, scope, receive, send, headers: Dict[str, str], cors: Headers) -> None:
+        """Prometheus指标"""
+        if not metrics_service.registry.enabled:
+            await _respond(send, 404, b"metrics disabled\n", "text/plain", cors)
+            return
+        body = await asyncio.get_running_loop().run_in_executor(None, metrics_service.render)
+        await _respond(send, 200, body.encode('utf-8'), METRICS_CONTENT_TYPE, cors)
+    
+    async def static(self, path: str, send: Callable, cors: Headers, head: bool = False) -> None:
+        """静态文件（首页为 index.html），路径限制在静态目录内"""
+        relative = "index.html" if path in ("", "/") else path.lstrip("/")
+        file_path = os.path.realpath(os.path.join(self.static_root, relative))
+        if not file_path.startswith(self.static_root + os.sep) or not os.path.isfile(file_path):
+            await _respond(send, 404, b"Not Found", "text/plain", cors)
+            return
+        
+        content = await asyncio.get_running_loop().run_in_executor(None, _read_file, file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        await _respond(send, 200, b"" if head else content, content_type, cors,
+                       content_length=len(content))
+    
+    def cors_headers(self, headers: Dict[str, str]) -> Headers:
+        """按 CORS_ORIGINS 生成跨域响应头"""
+        origin = headers.get("origin")
+        if not origin:
+            return []
+        expose = f"{profiling_service.PROFILE_HEADER}, Server-Timing, {FORMAT_HEADER}, {VERSION_HEADER}".encode()
+        if config.CORS_ORIGINS == '*':
+            return [(b"access-control-allow-origin", b"*"), (b"access-control-expose-headers", expose)]
+        if origin in config.CORS_ORIGINS.split(','):
+            return [
+                (b"access-control-allow-origin", origin.encode('latin-1')),
+                (b"access-control-expose-headers", expose),
+                (b"vary", b"Origin"),
+            ]
+        return []
+    
+    def preflight_headers(self, headers: Dict[str, str]) -> Headers:
+        """CORS预检响应头"""
+        requested = headers.get("access-control-request-headers", "")
+        return [
+            (b"access-control-allow-methods", b"GET, HEAD, POST, OPTIONS"),
+            (b"access-control-allow-headers", requested.encode('latin-1')),
+            (b"access-control-max-age", b"600"),
+        ]
+
+
+def _annotate_and_serialize(
+    lines: List[str],
+    want_katakana_conversion: bool,
+    profile: Optional[profiling_service.RequestProfile],
+    compact: bool = False,
+    accept_encoding: str = ""
+) -> Tuple[bytes, float, float, Optional[float]]:
+    """
+    在线程池中执行：注音、序列化并按需gzip压缩
+    
+    Returns:
+        (响应体, 注音耗时, 序列化耗时, 压缩耗时；未压缩时为None)
+    """
+    started = time.perf_counter()
+    with profiling_service.activate(profile):
+        processed_lines = annotation_service.annotate_lines(lines, want_katakana_conversion)
+    annotated = time.perf_counter()
+    result = encode_compact(processed_lines) if compact else processed_lines
+    payload = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    serialized = time.perf_counter()
+    
+    if not config.RESPONSE_GZIP:
+        return payload, annotated - started, serialized - annotated, None
+    compressed = gzip_body(payload, accept_encoding, config.GZIP_MIN_BYTES, config.GZIP_LEVEL)
+    if compressed is None:
+        return payload, annotated - started, serialized - annotated, None
+    return compressed, annotated - started, serialized - annotated, time.perf_counter() - serialized
+
+
+def _next_line(iterator: Iterator, profile: Optional[profiling_service.RequestProfile]):
+    """在线程池中执行：计算下一行，结束时返回None"""
+    with profiling_service.activate(profile):
+        return next(iterator, None)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _header_dict(scope: Dict[str, Any]) -> Dict[str, str]:
+    """请求头（小写键，同名头以逗号合并）"""
+    headers: Dict[str, str] = {}
+    for key, value in scope.get("headers", []):
+        name = key.decode('latin-1').lower()
+        text = value.decode('latin-1')
+        headers[name] = f"{headers[name]}, {text}" if name in headers else text
+    return headers
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 是否包含该ETag（含gzip变体）"""
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return etags.contains(etag) or etags.contains(etag + "-gzip")
+
+
+def _wants_stream(data: dict, accept: str) -> bool:
+    """判断请求是否要求流式返回（规则同WSGI版本）"""
+    if data.get("stream"):
+        return True
+    best = parse_accept_header(accept, MIMEAccept).best_match([JSON_CONTENT_TYPE, NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+async def _read_body(receive: Callable, limit: int) -> bytes:
+    """
+    读取完整请求体（慢速上传只占用协程）
+    
+    Raises:
+        RequestTooLarge: 超过 limit 字节
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _respond(
+    send: Callable,
+    status: int,
+    body: bytes,
+    content_type: Optional[str],
+    headers: Headers = (),
+    content_length: Optional[int] = None
+) -> None:
+    """发送完整响应"""
+    response_headers = [(b"content-length", str(len(body) if content_length is None else content_length).encode())]
+    if content_type:
+        response_headers.append((b"content-type", content_type.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": response_headers + list(headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _respond_json(send: Callable, status: int, data: Any, headers: Headers = ()) -> None:
+    """发送JSON响应"""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    await _respond(send, status, body, JSON_CONTENT_TYPE, headers)
+
+
+def create_asgi_app() -> AsgiApp:
+    """
+    ASGI应用工厂函数
+    
+    Returns:
+        ASGI应用实例
+    """
+    setup_logging()
+    config.validate()
+    app = AsgiApp()
+    logger.info(f"✓ ASGI应用创建完成 (注音线程池={app.threads})")
+    return app
@@ -0,0 +1,4 @@
+"""
+性能基准模块
+包含工具函数微基准和端到端基准，通过 python -m benchmarks.<模块> 运行
+"""
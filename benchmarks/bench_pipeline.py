@@ -0,0 +1,355 @@
+"""
+注音流水线端到端基准
+在 benchmarks/corpus/ 下的歌词语料上驱动真实流水线，输出JSON结果并可与基线比较
+
+测量项:
+    startup   子进程中测量: 导入耗时、create_app耗时、首个请求耗时、冷启动总耗时、峰值RSS
+    corpus    每篇语料两种方式各运行 N 次:
+                service_cold  清空缓存后直接调用 annotation_service（完整计算路径）
+                api_warm      create_app 测试客户端 POST /api/furigana（缓存已预热）
+              输出 p50/p99/平均延迟和 tokens/sec
+    peak_rss  本进程运行全部用例后的峰值RSS
+
+持久行缓存在磁盘上跨进程、跨运行共享，基准中一律禁用（PERSISTENT_CACHE 置空），
+否则冷启动的首个请求和重复运行都会命中上次写入的结果。
+
+用法:
+    python -m benchmarks.bench_pipeline [--iterations N] [--output FILE]
+                                        [--compare BASELINE] [--tolerance 0.15]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpus')
+
+# 子进程中执行的冷启动测量脚本
+_STARTUP_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+application = app.create_app()
+t2 = time.perf_counter()
+application.test_client().post('/api/furigana', json={"lyrics": "夜空に光る星を見た"})
+t3 = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+except ImportError:
+    rss = None
+print(json.dumps({
+    "import_s": t1 - t0,
+    "create_app_s": t2 - t1,
+    "first_request_s": t3 - t2,
+    "cold_start_s": t3 - t0,
+    "peak_rss_kb": rss,
+}))
+"""
+
+
+def load_corpus(directory: str = CORPUS_DIR) -> Dict[str, str]:
+    """
+    读取语料目录下的全部 .txt 文件
+    
+    Args:
+        directory: 语料目录
+    
+    Returns:
+        文件名（不含扩展名） -> 文本
+    """
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.txt'):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                corpus[name[:-4]] = f.read().rstrip('\n')
+    return corpus
+
+
+def peak_rss_kb() -> Optional[int]:
+    """本进程的峰值RSS（KB），平台不支持时返回None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(durations: List[float], tokens: int) -> Dict[str, float]:
+    """
+    汇总一组单次耗时
+    
+    Args:
+        durations: 每次运行耗时（秒）
+        tokens: 单次运行处理的token数
+    
+    Returns:
+        延迟(ms)与吞吐统计
+    """
+    total = sum(durations)
+    return {
+        "runs": len(durations),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "mean_ms": round(total / len(durations) * 1000, 3),
+        "tokens_per_sec": round(tokens * len(durations) / total, 1) if total else 0.0,
+    }
+
+
+def measure_startup(runs: int = 3) -> Dict[str, Any]:
+    """
+    在全新子进程中测量冷启动（取各项最小值）
+    
+    Args:
+        runs: 运行次数
+    
+    Returns:
+        冷启动各项耗时（秒）与峰值RSS
+    """
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-c', _STARTUP_SCRIPT],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            encoding='utf-8'
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"冷启动测量失败: {proc.stderr.strip()[-500:]}")
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    
+    result = {}
+    for key in samples[0]:
+        values = [s[key] for s in samples if s[key] is not None]
+        if not values:
+            result[key] = None
+        elif key.endswith('_s'):
+            result[key] = round(min(values), 4)
+        else:
+            result[key] = min(values)
+    return result
+
+
+def bench_document(client, text: str, iterations: int) -> Dict[str, Any]:
+    """
+    对一篇语料运行 service_cold 和 api_warm 两种测量
+    
+    Args:
+        client: Flask测试客户端
+        text: 语料文本
+        iterations: 每种方式的运行次数
+    
+    Returns:
+        该篇语料的统计结果
+    """
+    from services.annotation_service import annotation_service
+    
+    lines = text.split('\n')
+    
+    # 完整计算路径：每次清空行缓存和候选缓存
+    cold = []
+    tokens = 0
+    for _ in range(iterations):
+        annotation_service.clear_caches()
+        started = time.perf_counter()
+        result = annotation_service.annotate_lines(lines)
+        cold.append(time.perf_counter() - started)
+        tokens = sum(len(line) for line in result)
+    
+    # 真实请求路径（含请求解析和JSON序列化），先预热一次
+    payload = {"lyrics": text}
+    client.post('/api/furigana', json=payload)
+    warm = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.post('/api/furigana', json=payload)
+        warm.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"请求失败: {response.status_code} {response.get_data(as_text=True)[:200]}")
+    
+    return {
+        "lines": len(lines),
+        "chars": len(text),
+        "tokens": tokens,
+        "service_cold": summarize(cold, tokens),
+        "api_warm": summarize(warm, tokens),
+    }
+
+
+def run(iterations: int = 30, startup_runs: int = 3, corpus_dir: str = CORPUS_DIR) -> Dict[str, Any]:
+    """
+    运行全部基准
+    
+    Args:
+        iterations: 每篇语料每种方式的运行次数
+        startup_runs: 冷启动测量次数（0表示跳过）
+        corpus_dir: 语料目录
+    
+    Returns:
+        基准结果
+    """
+    # 禁用持久行缓存（冷启动子进程继承此环境变量；须在导入 config 之前设置）
+    os.environ['PERSISTENT_CACHE'] = ''
+    
+    results: Dict[str, Any] = {"meta": _meta(iterations)}
+    if startup_runs > 0:
+        results["startup"] = measure_startup(startup_runs)
+    
+    from app import create_app
+    client = create_app().test_client()
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    results["corpus"] = {
+        name: bench_document(client, text, iterations)
+        for name, text in load_corpus(corpus_dir).items()
+    }
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+def _meta(iterations: int) -> Dict[str, Any]:
+    """运行环境信息"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": iterations,
+    }
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    """将结果展开为 {指标路径: 数值}（忽略meta）"""
+    flat = {}
+    
+    def walk(prefix: str, node: Any) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(f"{prefix}.{key}" if prefix else key, value)
+        elif isinstance(node, (int, float)) and not isinstance(node, bool):
+            flat[prefix] = float(node)
+    
+    for key, value in results.items():
+        if key != "meta":
+            walk(key, value)
+    return flat
+
+
+def _direction(metric: str) -> int:
+    """指标方向: 1 越大越好，-1 越小越好，0 不参与比较"""
+    leaf = metric.rsplit('.', 1)[-1]
+    if leaf == "tokens_per_sec":
+        return 1
+    if leaf.endswith('_ms') or leaf.endswith('_s') or leaf.endswith('rss_kb'):
+        return -1
+    return 0
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[Tuple[str, float, float, float]]:
+    """
+    与基线比较，找出超出容差的退化
+    
+    Args:
+        current: 本次结果
+        baseline: 基线结果
+        tolerance: 允许的相对退化（如0.15表示15%）
+    
+    Returns:
+        [(指标, 基线值, 本次值, 相对变化), ...]，相对变化为正表示退化
+    """
+    regressions = []
+    cur = flatten(current)
+    for metric, base_value in flatten(baseline).items():
+        direction = _direction(metric)
+        if direction == 0 or metric not in cur or base_value <= 0:
+            continue
+        change = (cur[metric] - base_value) / base_value * -direction
+        if change > tolerance:
+            regressions.append((metric, base_value, cur[metric], change))
+    return regressions
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    """打印结果表"""
+    startup = results.get("startup")
+    if startup:
+        print("startup: " + ", ".join(f"{k}={v}" for k, v in startup.items()))
+    print(f"{'corpus':<16}{'mode':<14}{'p50 ms':>10}{'p99 ms':>10}{'tokens/s':>12}")
+    for name, doc in results["corpus"].items():
+        for mode in ("service_cold", "api_warm"):
+            stats = doc[mode]
+            print(f"{name:<16}{mode:<14}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+                  f"{stats['tokens_per_sec']:>12.1f}")
+    print(f"peak_rss_kb: {results.get('peak_rss_kb')}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="注音流水线端到端基准")
+    parser.add_argument('--iterations', type=int, default=30, help="每篇语料每种方式的运行次数")
+    parser.add_argument('--startup-runs', type=int, default=3, help="冷启动测量次数（0跳过）")
+    parser.add_argument('--corpus', default=CORPUS_DIR, help="语料目录")
+    parser.add_argument('--output', help="结果JSON输出路径")
+    parser.add_argument('--compare', help="基线结果JSON，超出容差的退化会被标记并返回非零退出码")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="允许的相对退化（默认0.15）")
+    args = parser.parse_args(argv)
+    
+    results = run(args.iterations, args.startup_runs, args.corpus)
+    print_report(results)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存: {args.output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"✗ {len(regressions)}项指标退化超过{args.tolerance:.0%}:")
+            for metric, base_value, value, change in regressions:
+                print(f"  {metric}: {base_value:g} -> {value:g} ({change:+.1%})")
+            return 1
+        print(f"✓ 与基线相比无超过{args.tolerance:.0%}的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
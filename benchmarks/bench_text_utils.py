@@ -0,0 +1,166 @@
+"""
+文本工具微基准
+对比表驱动实现与原逐字符实现（保留在本文件中作为基线）的耗时，并校验两者结果一致
+
+用法:
+    python -m benchmarks.bench_text_utils [--number N] [--repeat R]
+"""
+import argparse
+import re
+import sys
+import timeit
+from typing import Callable, List, Optional, Tuple
+
+from utils import kana_converter, text_processor
+
+
+# ---- 原实现（基线） ----
+
+def legacy_katakana_to_hiragana(katakana_string: str) -> str:
+    hiragana_string = ""
+    for char in katakana_string:
+        if 'ァ' <= char <= 'ヶ':
+            hiragana_char = chr(ord(char) - 96)
+            hiragana_string += hiragana_char
+        else:
+            hiragana_string += char
+    return hiragana_string
+
+
+def legacy_is_all_katakana(text: str) -> bool:
+    if not text:
+        return False
+    for char in text:
+        if not ('ァ' <= char <= 'ヶ' or char == 'ー'):
+            return False
+    return True
+
+
+def legacy_is_hiragana_text(text: str) -> bool:
+    if not text:
+        return False
+    for ch in text:
+        if not ('\u3040' <= ch <= '\u309f'):
+            return False
+    return True
+
+
+def legacy_contains_kanji(text: str) -> bool:
+    for char in text:
+        if ('\u4e00' <= char <= '\u9fff' or
+            '\u3400' <= char <= '\u4dbf' or
+            '\uf900' <= char <= '\ufaff'):
+            return True
+    return False
+
+
+def legacy_extract_trailing_hiragana(text: str) -> str:
+    if not text:
+        return ""
+    i = len(text) - 1
+    while i >= 0 and ('\u3040' <= text[i] <= '\u309f'):
+        i -= 1
+    return text[i+1:]
+
+
+def legacy_classify_line(surfaces: List[str], readings: List[str]) -> list:
+    """原注音循环中每个token的字符判断与读音转换"""
+    result = []
+    for surface, reading in zip(surfaces, readings):
+        result.append((
+            legacy_is_all_katakana(surface),
+            bool(re.fullmatch(r"[A-Za-z\s]+", surface or "")),
+            legacy_contains_kanji(surface),
+            legacy_katakana_to_hiragana(reading),
+        ))
+    return result
+
+
+def table_classify_line(surfaces: List[str], readings: List[str]) -> list:
+    """表驱动实现：整行一次分类和转换"""
+    tp = text_processor
+    flags_list = tp.classify_tokens(surfaces)
+    converted = kana_converter.katakana_to_hiragana_batch(readings)
+    return [
+        (
+            tp.only_classes(flags, tp.CHAR_KATAKANA | tp.CHAR_PROLONGED),
+            tp.only_classes(flags, tp.CHAR_LATIN | tp.CHAR_SPACE),
+            bool(flags & tp.CHAR_KANJI),
+            hira,
+        )
+        for flags, hira in zip(flags_list, converted)
+    ]
+
+
+# ---- 样本 ----
+
+# 一行歌词分词后的典型token（表面形式, 读音）
+SAMPLE_TOKENS: List[Tuple[str, str]] = [
+    ("君", "キミ"), ("の", "ノ"), ("名前", "ナマエ"), ("を", "ヲ"),
+    ("呼ん", "ヨン"), ("だ", "ダ"), ("夜空", "ヨゾラ"), ("に", "ニ"),
+    ("キラキラ", "キラキラ"), ("光る", "ヒカル"), ("スター", "スター"),
+    ("　", "　"), ("Hello", "ハロー"), ("世界", "セカイ"), ("、", "、"),
+    ("明日", "アシタ"), ("も", "モ"), ("きっと", "キット"), ("会える", "アエル"),
+    ("ヴァイオリン", "ヴァイオリン"),
+]
+SAMPLE_SURFACES = [s for s, _ in SAMPLE_TOKENS]
+SAMPLE_READINGS = [r for _, r in SAMPLE_TOKENS]
+
+# (名称, 原实现, 新实现, 参数)
+CASES: List[Tuple[str, Callable, Callable, tuple]] = [
+    ("katakana_to_hiragana", legacy_katakana_to_hiragana,
+     kana_converter.katakana_to_hiragana, ("ヨゾラニキラキラヒカルスター",)),
+    ("is_all_katakana", legacy_is_all_katakana,
+     kana_converter.is_all_katakana, ("ヴァイオリンコンサート",)),
+    ("is_hiragana_text", legacy_is_hiragana_text,
+     kana_converter.is_hiragana_text, ("きっとあえるよね",)),
+    ("contains_kanji", legacy_contains_kanji,
+     text_processor.contains_kanji, ("キラキラひかるよぞら星",)),
+    ("extract_trailing_hiragana", legacy_extract_trailing_hiragana,
+     text_processor.extract_trailing_hiragana, ("呼びかけられる",)),
+    ("line (20 tokens)", legacy_classify_line,
+     table_classify_line, (SAMPLE_SURFACES, SAMPLE_READINGS)),
+]
+
+
+def _best(func: Callable, args: tuple, number: int, repeat: int) -> float:
+    """返回单次调用的最佳耗时（微秒）"""
+    timer = timeit.Timer(lambda: func(*args))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run(number: int = 20000, repeat: int = 5) -> int:
+    """
+    运行全部微基准并打印结果
+    
+    Args:
+        number: 每轮调用次数
+        repeat: 轮数（取最佳一轮）
+    
+    Returns:
+        结果不一致的用例数
+    """
+    mismatches = 0
+    print(f"{'case':<28}{'legacy µs':>12}{'table µs':>12}{'speedup':>10}")
+    for name, legacy, table, args in CASES:
+        if legacy(*args) != table(*args):
+            mismatches += 1
+            print(f"{name:<28}  ✗ 结果不一致")
+            continue
+        t_legacy = _best(legacy, args, number, repeat)
+        t_table = _best(table, args, number, repeat)
+        print(f"{name:<28}{t_legacy:>12.3f}{t_table:>12.3f}{t_legacy / t_table:>9.1f}x")
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="文本工具微基准")
+    parser.add_argument('--number', type=int, default=20000, help="每轮调用次数")
+    parser.add_argument('--repeat', type=int, default=5, help="轮数")
+    args = parser.parse_args(argv)
+    return 1 if run(args.number, args.repeat) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+本地负载测试
+在本机以不同worker数启动gunicorn，按设定的请求规模配比和并发度压测 /api/furigana，
+输出吞吐、延迟分位数和内存随并发变化的曲线（仅依赖标准库，无需外部服务）
+
+每个 worker 数启动一次 gunicorn（使用仓库的 gunicorn.conf.py，即 --preload 模式），
+依次在各并发度下运行固定时长的闭环压测（每个客户端线程收到响应后立即发下一个请求）。
+内存为 gunicorn 主进程及全部工作进程的RSS之和（读取 /proc，仅Linux）。
+每次启动使用新的临时持久行缓存，各 worker 数和重复运行都从空缓存开始。
+
+用法:
+    python -m benchmarks.loadtest [--workers 1,2,4] [--concurrency 1,2,4,8,16]
+                                  [--duration 10] [--mix short:4,long:1,...]
+                                  [--unique-ratio 0.2] [--output FILE]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.bench_pipeline import REPO_DIR, load_corpus, percentile
+
+
+DEFAULT_MIX = "short:4,repetitive:2,katakana_heavy:2,kanji_heavy:2,long:1"
+
+
+def parse_mix(spec: str, corpus: Dict[str, str]) -> List[Tuple[str, float]]:
+    """
+    解析请求配比，如 "short:4,long:1"
+    
+    Args:
+        spec: 配比字符串（语料名:权重）
+        corpus: 可用语料
+    
+    Returns:
+        [(语料名, 权重), ...]
+    
+    Raises:
+        ValueError: 语料不存在或权重无效
+    """
+    mix = []
+    for item in spec.split(','):
+        name, _, weight = item.strip().partition(':')
+        if name not in corpus:
+            raise ValueError(f"未知语料: {name}（可选: {', '.join(corpus)}）")
+        value = float(weight or 1)
+        if value <= 0:
+            raise ValueError(f"权重必须大于0: {item}")
+        mix.append((name, value))
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _tree_rss_kb(root_pid: int) -> Optional[int]:
+    """进程及其全部子孙进程的RSS之和（KB），非Linux返回None"""
+    if not os.path.isdir('/proc'):
+        return None
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status', 'r') as f:
+                status = f.read()
+        except OSError:
+            continue
+        fields = dict(
+            line.split(':', 1) for line in status.splitlines() if ':' in line
+        )
+        pid = int(entry)
+        children.setdefault(int(fields.get('PPid', '0').strip()), []).append(pid)
+        rss[pid] = int(fields.get('VmRSS', '0 kB').split()[0])
+    
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+class GunicornServer:
+    """在子进程中运行的gunicorn服务"""
+    
+    def __init__(self, workers: int, env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            workers: 工作进程数
+            env: 额外的环境变量（未指定 PERSISTENT_CACHE 时使用本次启动独有的临时文件）
+        """
+        self.workers = workers
+        self.port = _free_port()
+        self.cache_dir = tempfile.TemporaryDirectory(prefix='furigana-loadtest-')
+        self.env = dict(os.environ)
+        self.env['PERSISTENT_CACHE'] = os.path.join(self.cache_dir.name, 'line_cache.sqlite3')
+        self.env.update(env or {})
+        self.proc: Optional[subprocess.Popen] = None
+        self.log = tempfile.TemporaryFile()
+    
+    def start(self, timeout: float = 120.0) -> None:
+        """启动并等待 /health 可用"""
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '-c', 'gunicorn.conf.py',
+                '-w', str(self.workers),
+                '-b', f'127.0.0.1:{self.port}',
+            ],
+            cwd=REPO_DIR,
+            env=self.env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"gunicorn启动失败:\n{self.output()[-2000:]}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                conn.request('GET', '/health')
+                if conn.getresponse().status == 200:
+                    conn.close()
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("gunicorn启动超时")
+    
+    def rss_kb(self) -> Optional[int]:
+        """主进程与工作进程的RSS之和"""
+        return _tree_rss_kb(self.proc.pid) if self.proc else None
+    
+    def output(self) -> str:
+        """gunicorn日志输出"""
+        self.log.seek(0)
+        return self.log.read().decode('utf-8', errors='replace')
+    
+    def stop(self) -> None:
+        """停止服务并删除临时持久缓存"""
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.cache_dir.cleanup()
+
+
+class RequestMix:
+    """按权重随机生成请求体"""
+    
+    def __init__(self, corpus: Dict[str, str], mix: List[Tuple[str, float]], unique_ratio: float):
+        """
+        Args:
+            corpus: 语料
+            mix: [(语料名, 权重), ...]
+            unique_ratio: 末尾追加唯一行（绕过行缓存）的请求比例
+        """
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.bodies = {name: corpus[name] for name in self.names}
+        self.unique_ratio = unique_ratio
+        self._counter = 0
+        self._lock = threading.Lock()
+    
+    def next(self, rng: random.Random) -> Tuple[str, bytes]:
+        """生成下一个请求 (语料名, JSON请求体)"""
+        name = rng.choices(self.names, self.weights)[0]
+        text = self.bodies[name]
+        if rng.random() < self.unique_ratio:
+            with self._lock:
+                self._counter += 1
+                text += f"\n第{self._counter}回目の夜"
+        return name, json.dumps({"lyrics": text}, ensure_ascii=False).encode('utf-8')
+
+
+def run_level(port: int, mix: RequestMix, concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+    """
+    在一个并发度下运行闭环压测
+    
+    Args:
+        port: 服务端口
+        mix: 请求配比
+        concurrency: 客户端线程数
+        duration: 计量时长（秒）
+        warmup: 预热时长（秒，不计入统计）
+    
+    Returns:
+        吞吐、延迟、错误统计
+    """
+    latencies: List[float] = []
+    by_size: Dict[str, List[float]] = {}
+    errors = [0]
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    
+    def client(seed: int) -> None:
+        rng = random.Random(seed)
+        conn = None
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            name, body = mix.next(rng)
+            started = time.perf_counter()
+            ok = False
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                conn.request('POST', '/api/furigana', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    conn.close()
+                conn = None
+            elapsed = time.perf_counter() - started
+            if now < measure_from:
+                continue
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                    by_size.setdefault(name, []).append(elapsed)
+                else:
+                    errors[0] += 1
+        if conn is not None:
+            conn.close()
+    
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "p50_ms_by_size": {
+            name: round(percentile(values, 50) * 1000, 3)
+            for name, values in sorted(by_size.items())
+        },
+    }
+
+
+def find_knee(points: List[Dict[str, Any]], gain: float = 0.1) -> Optional[int]:
+    """
+    吞吐拐点：第一个使吞吐增幅低于 gain 而延迟仍上升的并发度
+    
+    Args:
+        points: 同一worker数下按并发度升序的测量点
+        gain: 视为仍有收益的最小相对吞吐增幅
+    
+    Returns:
+        拐点并发度，未出现时返回None
+    """
+    for prev, cur in zip(points, points[1:]):
+        if cur["rps"] < prev["rps"] * (1 + gain) and cur["p50_ms"] > prev["p50_ms"]:
+            return cur["concurrency"]
+    return None
+
+
+def run(
+    workers_list: List[int],
+    concurrency_list: List[int],
+    duration: float,
+    warmup: float,
+    mix_spec: str,
+    unique_ratio: float
+) -> Dict[str, Any]:
+    """
+    运行全部组合
+    
+    Returns:
+        {"meta": ..., "runs": [{"workers": N, "startup_rss_kb": ..., "points": [...], "knee": ...}]}
+    """
+    corpus = load_corpus()
+    mix = RequestMix(corpus, parse_mix(mix_spec, corpus), unique_ratio)
+    results: Dict[str, Any] = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cpu_count": os.cpu_count(),
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "mix": mix_spec,
+            "unique_ratio": unique_ratio,
+        },
+        "runs": [],
+    }
+    
+    for workers in workers_list:
+        server = GunicornServer(workers)
+        server.start()
+        try:
+            run_result = {"workers": workers, "startup_rss_kb": server.rss_kb(), "points": []}
+            for concurrency in concurrency_list:
+                point = run_level(server.port, mix, concurrency, duration, warmup)
+                point["rss_kb"] = server.rss_kb()
+                run_result["points"].append(point)
+                print(
+                    f"workers={workers:<3} c={concurrency:<4} rps={point['rps']:>9.1f} "
+                    f"p50={point['p50_ms']:>8.2f}ms p90={point['p90_ms']:>8.2f}ms "
+                    f"p99={point['p99_ms']:>8.2f}ms errors={point['errors']:<4} "
+                    f"rss={point['rss_kb']}KB",
+                    flush=True
+                )
+            run_result["knee"] = find_knee(run_result["points"])
+            run_result["peak_rps"] = max((p["rps"] for p in run_result["points"]), default=0)
+            results["runs"].append(run_result)
+        finally:
+            server.stop()
+    return results
+
+
+def print_summary(results: Dict[str, Any]) -> None:
+    """打印各worker数的峰值吞吐、拐点与内存"""
+    print(f"\n{'workers':<10}{'peak rps':>10}{'knee c':>8}{'rss start KB':>14}{'rss end KB':>12}")
+    for run_result in results["runs"]:
+        end_rss = run_result["points"][-1]["rss_kb"] if run_result["points"] else None
+        print(f"{run_result['workers']:<10}{run_result['peak_rps']:>10.1f}"
+              f"{str(run_result['knee'] or '-'):>8}"
+              f"{str(run_result['startup_rss_kb']):>14}{str(end_rss):>12}")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地gunicorn负载测试")
+    parser.add_argument('--workers', type=_int_list, default=[1, 2, 4], help="worker数列表，如 1,2,4")
+    parser.add_argument('--concurrency', type=_int_list, default=[1, 2, 4, 8, 16], help="并发度列表")
+    parser.add_argument('--duration', type=float, default=10.0, help="每个并发度的计量时长（秒）")
+    parser.add_argument('--warmup', type=float, default=2.0, help="每个并发度的预热时长（秒）")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="请求配比（语料名:权重，逗号分隔）")
+    parser.add_argument('--unique-ratio', type=float, default=0.2,
+                        help="追加唯一行以绕过行缓存的请求比例（0~1）")
+    parser.add_argument('--output', help="结果JSON输出路径")
+    args = parser.parse_args(argv)
+    
+    if not 0 <= args.unique_ratio <= 1:
+        parser.error("--unique-ratio 必须在0到1之间")
+    
+    try:
+        results = run(
+            args.workers, args.concurrency, args.duration, args.warmup,
+            args.mix, args.unique_ratio
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    
+    print_summary(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,14 @@ class Config:
     # 词典路径配置
     BASE_DIR: str = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR: str = os.path.join(BASE_DIR, 'data')
+    # 运行时写入的文件（慢请求日志、持久缓存）所在目录，必须在静态文件根目录之外
+    RUNTIME_DIR: str = os.getenv(
+        'FURIGANA_RUNTIME_DIR',
+        os.path.join(
+            os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+            'furigana'
+        )
+    )
     
     # 外部词典文件路径
     JMDICT_PATH: str = os.getenv(
@@ -34,10 +42,127 @@ class Config:
         os.path.join(BASE_DIR, 'modern_overrides.json')
     )
     
+    # 特殊词读音规则文件
+    SPECIAL_RULES_PATH: str = os.getenv(
+        'SPECIAL_RULES',
+        os.path.join(BASE_DIR, 'special_rules.json')
+    )
+    
+    # 编译词典（mmap）路径，由 python -m tools.build_dictionaries 生成
+    USE_COMPILED_DICTIONARIES: bool = os.getenv('USE_COMPILED_DICTIONARIES', 'True').lower() == 'true'
+    COMPILED_JMDICT_PATH: str = os.getenv(
+        'COMPILED_JMDICT',
+        os.path.join(DATA_DIR, 'jmdict_readings.bin')
+    )
+    COMPILED_KANJIDIC2_PATH: str = os.getenv(
+        'COMPILED_KANJIDIC2',
+        os.path.join(DATA_DIR, 'kanjidic2_readings.bin')
+    )
+    COMPILED_OVERRIDES_PATH: str = os.getenv(
+        'COMPILED_OVERRIDES',
+        os.path.join(DATA_DIR, 'modern_overrides.bin')
+    )
+    
+    # 离线候选读音索引路径，由 python -m tools.build_reading_index 生成
+    USE_READING_INDEX: bool = os.getenv('USE_READING_INDEX', 'True').lower() == 'true'
+    READING_INDEX_PATH: str = os.getenv(
+        'READING_INDEX',
+        os.path.join(DATA_DIR, 'reading_index.bin')
+    )
+    
     # 业务配置
     MAX_TEXT_LENGTH: int = int(os.getenv('MAX_TEXT_LENGTH', '10000'))
+    MAX_BATCH_DOCUMENTS: int = int(os.getenv('MAX_BATCH_DOCUMENTS', '1000'))
+    MAX_BATCH_TEXT_LENGTH: int = int(os.getenv('MAX_BATCH_TEXT_LENGTH', '1000000'))
     DEFAULT_TOKENIZER_MODE: str = 'B'  # A, B, or C
     
+    # 缓存配置
+    CANDIDATE_CACHE_SIZE: int = int(os.getenv('CANDIDATE_CACHE_SIZE', '20000'))
+    CANDIDATE_CACHE_MAX_BYTES: int = int(
+        os.getenv('CANDIDATE_CACHE_MAX_BYTES', str(32 * 1024 * 1024))
+    )
+    # 词表面的上下文无关候选（单独分词等），与上下文无关，比候选读音缓存的命中率高
+    SURFACE_CACHE_SIZE: int = int(os.getenv('SURFACE_CACHE_SIZE', '20000'))
+    SURFACE_CACHE_MAX_BYTES: int = int(
+        os.getenv('SURFACE_CACHE_MAX_BYTES', str(16 * 1024 * 1024))
+    )
+    LINE_CACHE_SIZE: int = int(os.getenv('LINE_CACHE_SIZE', '50000'))
+    LINE_CACHE_MAX_BYTES: int = int(
+        os.getenv('LINE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+    )
+    
+    # 持久行缓存配置（SQLite WAL，同一主机的工作进程共享；路径为空表示禁用）
+    # 库中保存所有注音过的行，因此不能放在静态文件根目录内
+    PERSISTENT_CACHE_PATH: str = os.getenv(
+        'PERSISTENT_CACHE',
+        os.path.join(RUNTIME_DIR, 'line_cache.sqlite3')
+    )
+    PERSISTENT_CACHE_MAX_BYTES: int = int(
+        os.getenv('PERSISTENT_CACHE_MAX_BYTES', str(256 * 1024 * 1024))
+    )
+    
+    # 可缓存GET配置（按哈希保存POST过的文本，DOCUMENT_STORE_SIZE=0 表示禁用）
+    DOCUMENT_STORE_SIZE: int = int(os.getenv('DOCUMENT_STORE_SIZE', '10000'))
+    DOCUMENT_STORE_MAX_BYTES: int = int(
+        os.getenv('DOCUMENT_STORE_MAX_BYTES', str(64 * 1024 * 1024))
+    )
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv('HTTP_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+    
+    # SVG导出配置（/api/export，EXPORT_CACHE_SIZE=0 表示不缓存导出结果）
+    EXPORT_SVG_WIDTH: int = int(os.getenv('EXPORT_SVG_WIDTH', '900'))
+    EXPORT_MAX_TITLE_LENGTH: int = int(os.getenv('EXPORT_MAX_TITLE_LENGTH', '200'))
+    EXPORT_CACHE_SIZE: int = int(os.getenv('EXPORT_CACHE_SIZE', '256'))
+    EXPORT_CACHE_MAX_BYTES: int = int(
+        os.getenv('EXPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+    )
+    
+    # 服务生命周期配置
+    PRELOAD_SERVICES: bool = os.getenv('PRELOAD_SERVICES', 'True').lower() == 'true'
+    GC_FREEZE: bool = os.getenv('GC_FREEZE', 'True').lower() == 'true'
+    
+    # 并行注音配置（进程池，PARALLEL_WORKERS<=1 表示禁用）
+    PARALLEL_WORKERS: int = int(os.getenv('PARALLEL_WORKERS', '0'))
+    PARALLEL_MIN_CHARS: int = int(os.getenv('PARALLEL_MIN_CHARS', '3000'))
+    PARALLEL_CHUNK_CHARS: int = int(os.getenv('PARALLEL_CHUNK_CHARS', '1000'))
+    
+    # Sudachi词典配置（small/core/full；对应的sudachidict包未安装时回退到其他已安装的词典）
+    SUDACHI_DICT_TYPE: str = os.getenv('SUDACHI_DICT_TYPE', 'full').lower()
+    # 分层模式：主分词使用 SUDACHI_DICT_TYPE（如core），未登录词或含生僻字的词收集候选读音时
+    # 再查询该词典（如full，首次需要时才加载）；为空表示不分层
+    SUDACHI_CANDIDATE_DICT_TYPE: str = os.getenv('SUDACHI_CANDIDATE_DICT_TYPE', '').lower()
+    
+    # 分词器池配置（每个进程最多创建的Sudachi分词器数，应不小于进程内并发线程数）
+    TOKENIZER_POOL_SIZE: int = int(os.getenv('TOKENIZER_POOL_SIZE', str(os.cpu_count() or 1)))
+    
+    # 响应压缩配置（客户端接受gzip且响应体不小于 GZIP_MIN_BYTES 时压缩）
+    RESPONSE_GZIP: bool = os.getenv('RESPONSE_GZIP', 'True').lower() == 'true'
+    GZIP_MIN_BYTES: int = int(os.getenv('GZIP_MIN_BYTES', '1024'))
+    GZIP_LEVEL: int = int(os.getenv('GZIP_LEVEL', '6'))
+    
+    # ASGI配置（asgi.py，注音在有界线程池中执行，默认线程数为CPU核数）
+    ASGI_THREADS: int = int(os.getenv('ASGI_THREADS', str(os.cpu_count() or 1)))
+    
+    # 指标配置（METRICS_DIR 为多进程快照目录，为空时只统计本进程）
+    METRICS_ENABLED: bool = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR: str = os.getenv('METRICS_DIR', '')
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+    
+    # 请求剖析配置（SLOW_REQUEST_MS<=0 关闭慢请求捕获）
+    # X-Furigana-Profile 请求头可由任何客户端发送（触发逐token剖析并写日志），默认关闭，只在调试时开启；
+    # 慢请求日志默认只记录输入哈希，SLOW_REQUEST_LOG_INPUT 开启后才记录原文
+    PROFILE_HEADER_ENABLED: bool = os.getenv('PROFILE_HEADER_ENABLED', 'False').lower() == 'true'
+    PROFILE_ALL_REQUESTS: bool = os.getenv('PROFILE_ALL_REQUESTS', 'False').lower() == 'true'
+    SLOW_REQUEST_MS: float = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+    SLOW_REQUEST_LOG_PATH: str = os.getenv(
+        'SLOW_REQUEST_LOG',
+        os.path.join(RUNTIME_DIR, 'slow_requests.log')
+    )
+    SLOW_REQUEST_LOG_MAX_BYTES: int = int(
+        os.getenv('SLOW_REQUEST_LOG_MAX_BYTES', str(10 * 1024 * 1024))
+    )
+    SLOW_REQUEST_LOG_BACKUPS: int = int(os.getenv('SLOW_REQUEST_LOG_BACKUPS', '5'))
+    SLOW_REQUEST_LOG_INPUT: bool = os.getenv('SLOW_REQUEST_LOG_INPUT', 'False').lower() == 'true'
+    
     # CORS配置
     CORS_ORIGINS: str = os.getenv('CORS_ORIGINS', '*')
     
@@ -58,8 +183,82 @@ class Config:
         if self.MAX_TEXT_LENGTH <= 0:
             raise ValueError(f"最大文本长度必须大于0: {self.MAX_TEXT_LENGTH}")
         
+        if self.MAX_BATCH_DOCUMENTS <= 0 or self.MAX_BATCH_TEXT_LENGTH <= 0:
+            raise ValueError("批量请求的文档数和总长度上限必须大于0")
+        
         if self.DEFAULT_TOKENIZER_MODE not in ['A', 'B', 'C']:
             raise ValueError(f"无效的分词模式: {self.DEFAULT_TOKENIZER_MODE}")
+        
+        if self.CANDIDATE_CACHE_SIZE < 0 or self.CANDIDATE_CACHE_MAX_BYTES < 0:
+            raise ValueError("候选读音缓存容量不能为负数")
+        
+        if self.SURFACE_CACHE_SIZE < 0 or self.SURFACE_CACHE_MAX_BYTES < 0:
+            raise ValueError("上下文无关候选缓存容量不能为负数")
+        
+        if self.LINE_CACHE_SIZE < 0 or self.LINE_CACHE_MAX_BYTES < 0:
+            raise ValueError("行结果缓存容量不能为负数")
+        
+        if self.PERSISTENT_CACHE_MAX_BYTES < 0:
+            raise ValueError(f"持久缓存容量不能为负数: {self.PERSISTENT_CACHE_MAX_BYTES}")
+        
+        if self.is_served_path(self.PERSISTENT_CACHE_PATH):
+            raise ValueError(f"持久缓存不能放在静态文件目录内（会被直接下载）: {self.PERSISTENT_CACHE_PATH}")
+        
+        if self.DOCUMENT_STORE_SIZE < 0 or self.DOCUMENT_STORE_MAX_BYTES < 0 or self.HTTP_CACHE_MAX_AGE < 0:
+            raise ValueError("可缓存GET配置不能为负数")
+        
+        if self.EXPORT_SVG_WIDTH < 320 or self.EXPORT_MAX_TITLE_LENGTH < 0:
+            raise ValueError(f"SVG导出配置无效（EXPORT_SVG_WIDTH至少为320）: {self.EXPORT_SVG_WIDTH}")
+        
+        if self.EXPORT_CACHE_SIZE < 0 or self.EXPORT_CACHE_MAX_BYTES < 0:
+            raise ValueError("导出缓存容量不能为负数")
+        
+        if self.PARALLEL_WORKERS < 0 or self.PARALLEL_MIN_CHARS < 0 or self.PARALLEL_CHUNK_CHARS <= 0:
+            raise ValueError("并行注音配置无效")
+        
+        if self.SUDACHI_DICT_TYPE not in ('small', 'core', 'full'):
+            raise ValueError(f"Sudachi词典类型无效: {self.SUDACHI_DICT_TYPE}（应为 small/core/full）")
+        
+        if self.SUDACHI_CANDIDATE_DICT_TYPE not in ('', 'small', 'core', 'full'):
+            raise ValueError(f"Sudachi候选词典类型无效: {self.SUDACHI_CANDIDATE_DICT_TYPE}（应为 small/core/full 或留空）")
+        
+        if self.TOKENIZER_POOL_SIZE < 1:
+            raise ValueError(f"分词器池大小必须大于0: {self.TOKENIZER_POOL_SIZE}")
+        
+        if self.GZIP_MIN_BYTES < 0 or not 1 <= self.GZIP_LEVEL <= 9:
+            raise ValueError("响应压缩配置无效（GZIP_LEVEL应为1-9）")
+        
+        if self.ASGI_THREADS < 1:
+            raise ValueError(f"ASGI线程池大小必须大于0: {self.ASGI_THREADS}")
+        
+        if self.METRICS_FLUSH_INTERVAL < 0:
+            raise ValueError(f"指标快照写出间隔不能为负数: {self.METRICS_FLUSH_INTERVAL}")
+        
+        if self.SLOW_REQUEST_LOG_MAX_BYTES < 0 or self.SLOW_REQUEST_LOG_BACKUPS < 0:
+            raise ValueError("慢请求日志轮转配置不能为负数")
+        
+        if self.is_served_path(self.SLOW_REQUEST_LOG_PATH):
+            raise ValueError(f"慢请求日志不能放在静态文件目录内（会被直接下载）: {self.SLOW_REQUEST_LOG_PATH}")
+    
+    def is_served_path(self, path: str) -> bool:
+        """
+        判断路径是否位于静态文件根目录内（可通过HTTP直接访问）
+        
+        Args:
+            path: 文件路径
+        
+        Returns:
+            True如果位于静态文件根目录内
+        """
+        if not path:
+            return False
+        root = os.path.realpath(os.path.join(self.BASE_DIR, self.STATIC_FOLDER))
+        target = os.path.realpath(path)
+        try:
+            return os.path.commonpath([root, target]) == root
+        except ValueError:
+            # Windows下位于不同驱动器
+            return False
 
 
 # 全局配置实例
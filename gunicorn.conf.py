@@ -0,0 +1,42 @@
+"""
+gunicorn配置
+默认以 --preload 方式启动：词典在主进程加载一次，工作进程fork后共享，
+非fork安全的Sudachi分词器在 post_fork 钩子中按进程重新创建
+
+用法:
+    gunicorn            # 自动读取当前目录下的 gunicorn.conf.py
+"""
+import os
+
+
+wsgi_app = "app:create_app()"
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('PORT', os.getenv('FLASK_PORT', '5000'))}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# 每个工作进程的线程数，大于1时使用gthread，线程间共享词典并从分词器池借用分词器
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+
+def on_starting(server):
+    """主进程启动时清理上次运行留下的多进程指标快照"""
+    from services.metrics_service import registry
+    registry.clear_directory()
+
+
+def worker_exit(server, worker):
+    """工作进程退出前写出最后一次指标快照"""
+    from services.metrics_service import registry
+    registry.flush()
+
+
+def child_exit(server, worker):
+    """工作进程退出后（主进程中）把已退出进程的指标快照累加进汇总文件并删除"""
+    from services.metrics_service import registry
+    registry.retire_dead()
+
+
+def post_fork(server, worker):
+    """工作进程fork后重建非fork安全的资源"""
+    from services.lifecycle import post_fork_init
+    post_fork_init()
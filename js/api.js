@@ -4,6 +4,150 @@
 
 import { CONFIG } from './config.js';
 
+const COMPACT_MIMETYPE = 'application/vnd.furigana.compact+json';
+const COMPACT_VERSION = 1;
+const FORMAT_HEADER = 'X-Furigana-Format';
+const SAME_AS_SURFACE = -1;
+
+const VERSION_HEADER = 'X-Furigana-Version';
+const VERSION_STORAGE_KEY = 'furigana.contentVersion';
+
+const FNV_OFFSET = 0x811c9dc5;
+const FNV_PRIME = 0x01000193;
+const utf8Encoder = new TextEncoder();
+
+/**
+ * 计算行哈希（UTF-8字节上的32位FNV-1a，与服务端 utils/wire_format.line_hash 一致）
+ * @param {string} text - 行文本
+ * @returns {string} 8位十六进制哈希
+ */
+export function hashLine(text) {
+    let h = FNV_OFFSET;
+    for (const byte of utf8Encoder.encode(text)) {
+        h = Math.imul(h ^ byte, FNV_PRIME);
+    }
+    return (h >>> 0).toString(16).padStart(8, '0');
+}
+
+/**
+ * 紧凑格式解码器（流式响应内累积字符串表和候选表），格式说明见 utils/wire_format.py
+ */
+class CompactDecoder {
+    constructor(strings = [''], alts = [[]]) {
+        this.strings = strings;
+        this.alts = alts.map(ids => ids.map(i => strings[i]));
+    }
+    
+    /**
+     * 追加流式记录中新增的字符串和候选列表
+     */
+    extend(newStrings, newAlts) {
+        for (const s of newStrings) this.strings.push(s);
+        for (const ids of newAlts) this.alts.push(ids.map(i => this.strings[i]));
+    }
+    
+    /**
+     * 解码一行为token对象数组
+     */
+    decodeLine(line) {
+        if (!line || line.length === 0) return [];
+        const [surfaces, readings, alts] = line;
+        return surfaces.map((s, i) => {
+            const surface = this.strings[s];
+            const alternatives = alts ? this.alts[alts[i]].slice() : [];
+            const r = readings[i];
+            return {
+                surface,
+                reading: r === SAME_AS_SURFACE ? surface : this.strings[r],
+                alternatives,
+                has_alternatives: alternatives.length > 1
+            };
+        });
+    }
+}
+
+/**
+ * 解码完整的紧凑格式响应
+ * @param {Object} payload - {v, strings, alts, lines}
+ * @returns {Array} 处理后的行数据
+ */
+function decodeCompactResponse(payload) {
+    if (payload?.v !== COMPACT_VERSION) {
+        throw new Error(payload?.error || '响应格式异常：不支持的紧凑格式版本');
+    }
+    const decoder = new CompactDecoder(payload.strings, payload.alts);
+    return payload.lines.map(line => decoder.decodeLine(line));
+}
+
+/**
+ * 服务端内容版本（词典+规则），由POST响应头得到，用于拼接可缓存GET的URL
+ */
+let contentVersion = (() => {
+    try {
+        return localStorage.getItem(VERSION_STORAGE_KEY);
+    } catch {
+        return null;
+    }
+})();
+
+function rememberContentVersion(response) {
+    const version = response.headers.get(VERSION_HEADER);
+    if (!version || version === contentVersion) return;
+    contentVersion = version;
+    try {
+        localStorage.setItem(VERSION_STORAGE_KEY, version);
+    } catch {
+        // 隐私模式等不可写时只保留在内存中
+    }
+}
+
+/**
+ * 计算文本的SHA-256（与服务端 services/document_service.text_hash 一致）
+ * @returns {Promise<string|null>} 64位十六进制哈希，非安全上下文中不可用时返回null
+ */
+async function sha256Hex(text) {
+    if (typeof crypto === 'undefined' || !crypto.subtle) return null;
+    const digest = await crypto.subtle.digest('SHA-256', utf8Encoder.encode(text));
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function acceptHeader() {
+    return CONFIG.COMPACT_FORMAT ? `${COMPACT_MIMETYPE}, application/json;q=0.9` : 'application/json';
+}
+
+/**
+ * 读取非流式注音响应（普通JSON或紧凑格式）
+ */
+async function readLines(response) {
+    const data = await response.json();
+    const lines = response.headers.get(FORMAT_HEADER) === 'compact'
+        ? decodeCompactResponse(data)
+        : data;
+    
+    if (!Array.isArray(lines)) {
+        throw new Error('响应格式异常：期望数组');
+    }
+    
+    return lines;
+}
+
+/**
+ * 以可缓存的GET请求获取注音（URL只由内容版本、文本哈希和选项决定，可由浏览器缓存/CDN直接返回）
+ * @returns {Promise<Array|null>} 行数据；服务端没有该文本或无法计算哈希时返回null
+ */
+async function fetchCachedFurigana(text, katakana, signal) {
+    const digest = await sha256Hex(text);
+    if (!digest) return null;
+    
+    const url = `${CONFIG.API_URL}/doc/${encodeURIComponent(contentVersion)}/${digest}?katakana=${katakana ? 1 : 0}`;
+    const response = await fetch(url, { headers: { 'Accept': acceptHeader() }, signal });
+    if (!response.ok) {
+        // 404：未缓存或版本已更新，由POST响应带回新版本
+        return null;
+    }
+    return readLines(response);
+}
+
 /**
  * 调用注音API
  * @param {string} text - 输入文本
@@ -11,9 +155,19 @@ import { CONFIG } from './config.js';
  * @returns {Promise<Array>} 处理后的行数据
  */
 export async function fetchFurigana(text, katakana = true, signal) {
+    if (CONFIG.HTTP_CACHE_ENABLED && contentVersion) {
+        const cached = await fetchCachedFurigana(text, katakana, signal);
+        if (cached) {
+            return cached;
+        }
+    }
+    
     const response = await fetch(CONFIG.API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': acceptHeader()
+        },
         body: JSON.stringify({ 
             lyrics: text,
             katakana: katakana
@@ -25,12 +179,124 @@ export async function fetchFurigana(text, katakana = true, signal) {
         throw new Error(`服务器错误: ${response.statusText}`);
     }
     
-    const lines = await response.json();
+    rememberContentVersion(response);
+    return readLines(response);
+}
+
+
+/**
+ * 增量注音：只发送客户端尚无结果的行
+ * @param {string[]} hashes - 编辑后文档每行的哈希
+ * @param {Object} lines - 需要注音的行 {哈希: 行文本}
+ * @param {boolean} katakana - 是否转换片假名
+ * @param {AbortSignal} signal - 取消信号
+ * @returns {Promise<Object>} {哈希: 行token数组}
+ */
+export async function fetchFuriganaDiff(hashes, lines, katakana = true, signal) {
+    const response = await fetch(`${CONFIG.API_URL}/diff`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ hashes, lines, katakana }),
+        signal
+    });
     
-    if (!Array.isArray(lines)) {
-        throw new Error('响应格式异常：期望数组');
+    if (!response.ok) {
+        throw new Error(`服务器错误: ${response.statusText}`);
     }
     
-    return lines;
+    const data = await response.json();
+    if (!data || typeof data.results !== 'object') {
+        throw new Error('响应格式异常：期望results对象');
+    }
+    
+    return data.results;
 }
 
+
+/**
+ * 服务端导出SVG图片（/api/export）
+ * @param {Object} payload - {lyrics, katakana, title, theme, readings}
+ * @returns {Promise<Blob>} SVG图片
+ */
+export async function fetchExportSvg(payload) {
+    const response = await fetch(CONFIG.API_URL.replace(/\/furigana$/, '/export'), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    });
+    
+    if (!response.ok) {
+        throw new Error(`服务器错误: ${response.statusText}`);
+    }
+    
+    return response.blob();
+}
+
+
+/**
+ * 以NDJSON流式调用注音API，每收到一行结果即回调
+ * @param {string} text - 输入文本
+ * @param {boolean} katakana - 是否转换片假名
+ * @param {AbortSignal} signal - 取消信号
+ * @param {Function} onLine - 回调 (lineTokens, index)
+ * @returns {Promise<number>} 收到的行数
+ */
+export async function fetchFuriganaStream(text, katakana = true, signal, onLine) {
+    const response = await fetch(CONFIG.API_URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'application/x-ndjson'
+        },
+        body: JSON.stringify({
+            lyrics: text,
+            katakana: katakana,
+            stream: true,
+            ...(CONFIG.COMPACT_FORMAT ? { format: 'compact' } : {})
+        }),
+        signal
+    });
+    
+    if (!response.ok) {
+        throw new Error(`服务器错误: ${response.statusText}`);
+    }
+    
+    rememberContentVersion(response);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    const compact = response.headers.get(FORMAT_HEADER) === 'compact' ? new CompactDecoder() : null;
+    let buffer = '';
+    let index = 0;
+    
+    const handleRecord = (record) => {
+        if (!record.trim()) return;
+        const parsed = JSON.parse(record);
+        if (!Array.isArray(parsed)) {
+            throw new Error(parsed?.error || '响应格式异常：期望数组');
+        }
+        if (compact) {
+            const [newStrings, newAlts, line] = parsed;
+            compact.extend(newStrings, newAlts);
+            onLine(compact.decodeLine(line), index++);
+        } else {
+            onLine(parsed, index++);
+        }
+    };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let newlineIndex;
+        while ((newlineIndex = buffer.indexOf('\n')) !== -1) {
+            handleRecord(buffer.slice(0, newlineIndex));
+            buffer = buffer.slice(newlineIndex + 1);
+        }
+    }
+    
+    buffer += decoder.decode();
+    handleRecord(buffer);
+    
+    return index;
+}
@@ -7,10 +7,18 @@ import { isKatakana, katakanaToHiragana } from '../utils/kana-utils.js';
 
 export class KatakanaToggleManager {
     /**
-     * 切换片假名显示
+     * 切换片假名显示（遍历整个文档）
      */
     static toggleKatakanaDisplay(showKatakanaReading) {
-        const allWordUnits = document.querySelectorAll('.word-unit');
+        KatakanaToggleManager.applyToLine(document, showKatakanaReading);
+    }
+    
+    /**
+     * 切换一行（或任意容器）内片假名单词的注音显示
+     * 虚拟化输出只对已挂载的行调用，其余行在挂载时按当前设置处理
+     */
+    static applyToLine(root, showKatakanaReading) {
+        const allWordUnits = root.querySelectorAll('.word-unit');
         
         allWordUnits.forEach(wordUnit => {
             const surface = wordUnit.querySelector('rb')?.textContent || '';
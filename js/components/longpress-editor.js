@@ -13,82 +13,92 @@ export class LongpressEditorManager {
     
     /**
      * 设置长按编辑交互
+     * 事件委托到输出容器（只绑定一次），行的挂载、卸载和增量替换都无需重新绑定
      */
     setupLongpressEditInteraction() {
         if (!this.state.settings.longpressEdit) return;
         
-        const readingElements = document.querySelectorAll('.reading-text');
+        const container = this.state.elements.lyricsOutput;
+        if (!container || container.dataset.longpressBound) return;
+        container.dataset.longpressBound = 'true';
         
-        readingElements.forEach(element => {
-            let longPressTimer;
-            let isLongPress = false;
-            let touchMoved = false;
+        // 同一时间只有一次长按
+        let longPressTimer;
+        let isLongPress = false;
+        let touchMoved = false;
+        let activeElement = null;
 
-            const isEnabled = () => this.state.settings.longpressEdit;
-            
-            // 开始长按（鼠标或触摸）
-            const startLongPress = (e) => {
-                if (!isEnabled()) return;
-                
-                isLongPress = false;
-                touchMoved = false;
-                
-                longPressTimer = setTimeout(() => {
-                    if (!isEnabled() || touchMoved) {
-                        return;
-                    }
-                    isLongPress = true;
-                    this.enterEditMode(element);
-                }, CONFIG.LONG_PRESS_DURATION);
-                
-                // 阻止默认行为（文本选择、上下文菜单）
-                e.preventDefault();
-            };
-            
-            // 结束长按
-            const endLongPress = () => {
-                if (!isEnabled()) return;
-                clearTimeout(longPressTimer);
-            };
+        const isEnabled = () => this.state.settings.longpressEdit;
+        const readingTarget = (e) => e.target.closest?.('.reading-text') || null;
+        
+        // 开始长按（鼠标或触摸）
+        const startLongPress = (e, element) => {
+            if (!isEnabled()) return;
             
-            // 触摸移动时取消长按
-            const handleTouchMove = () => {
-                touchMoved = true;
-                clearTimeout(longPressTimer);
-            };
+            clearTimeout(longPressTimer);
+            isLongPress = false;
+            touchMoved = false;
+            activeElement = element;
             
-            // 防止点击事件与长按冲突
-            const handleClick = (e) => {
-                if (!isEnabled()) return;
-                if (isLongPress) {
-                    e.preventDefault();
-                    e.stopPropagation();
+            longPressTimer = setTimeout(() => {
+                if (!isEnabled() || touchMoved || !element.isConnected) {
+                    return;
                 }
-            };
+                isLongPress = true;
+                this.enterEditMode(element);
+            }, CONFIG.LONG_PRESS_DURATION);
             
-            // 阻止移动端上下文菜单
-            const preventContextMenu = (e) => {
-                if (!isEnabled()) return;
+            // 阻止默认行为（文本选择、上下文菜单）
+            e.preventDefault();
+        };
+        
+        // 结束长按
+        const endLongPress = () => {
+            if (!isEnabled() || !activeElement) return;
+            clearTimeout(longPressTimer);
+            activeElement = null;
+        };
+        
+        // 触摸移动时取消长按
+        const handleTouchMove = () => {
+            if (!activeElement) return;
+            touchMoved = true;
+            clearTimeout(longPressTimer);
+        };
+        
+        // 鼠标事件（桌面端）
+        container.addEventListener('mousedown', (e) => {
+            const element = readingTarget(e);
+            if (element && e.button === 0) startLongPress(e, element);
+        });
+        container.addEventListener('mouseup', endLongPress);
+        container.addEventListener('mouseout', (e) => {
+            // 离开正在长按的元素（等同于该元素的 mouseleave）
+            if (activeElement && !activeElement.contains(e.relatedTarget)) endLongPress();
+        });
+        
+        // 触摸事件（移动端）
+        container.addEventListener('touchstart', (e) => {
+            const element = readingTarget(e);
+            if (element) startLongPress(e, element);
+        }, { passive: false });
+        container.addEventListener('touchend', endLongPress);
+        container.addEventListener('touchcancel', endLongPress);
+        container.addEventListener('touchmove', handleTouchMove, { passive: true });
+        
+        // 防止点击事件与长按冲突
+        container.addEventListener('click', (e) => {
+            if (!isEnabled() || !readingTarget(e)) return;
+            if (isLongPress) {
                 e.preventDefault();
-                return false;
-            };
-            
-            // 鼠标事件（桌面端）
-            element.addEventListener('mousedown', (e) => {
-                if (e.button === 0) startLongPress(e);
-            });
-            element.addEventListener('mouseup', endLongPress);
-            element.addEventListener('mouseleave', endLongPress);
-            
-            // 触摸事件（移动端）
-            element.addEventListener('touchstart', startLongPress, { passive: false });
-            element.addEventListener('touchend', endLongPress);
-            element.addEventListener('touchcancel', endLongPress);
-            element.addEventListener('touchmove', handleTouchMove, { passive: false });
-            
-            // 通用事件
-            element.addEventListener('click', handleClick);
-            element.addEventListener('contextmenu', preventContextMenu);
+                e.stopPropagation();
+            }
+        });
+        
+        // 阻止移动端上下文菜单
+        container.addEventListener('contextmenu', (e) => {
+            if (!isEnabled() || !readingTarget(e)) return;
+            e.preventDefault();
         });
     }
     
@@ -129,6 +139,8 @@ export class LongpressEditorManager {
                 if (wordUnit) {
                     wordUnit.dataset.currentReading = newText;
                 }
+                // 通知输出视图记录修改（行重新挂载时恢复）
+                readingElement.dispatchEvent(new CustomEvent('reading-change', { bubbles: true }));
                 console.log(`用户修改注音: ${originalText} -> ${newText}`);
             } else if (!newText) {
                 console.log(`用户取消修改注音，保持原注音: ${originalText}`);
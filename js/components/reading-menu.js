@@ -15,31 +15,42 @@ export class ReadingMenuManager {
     
     /**
      * 设置多音字交互
+     * 事件委托到输出容器（只绑定一次），行的挂载、卸载和增量替换都无需重新绑定
      */
     setupMultiReadingInteraction() {
-        const multiReadingElements = document.querySelectorAll('.multi-reading');
-        
-        multiReadingElements.forEach(element => {
-            let hoverTimeout;
-            
-            // 鼠标悬停事件
-            element.addEventListener('mouseenter', (e) => {
-                clearTimeout(hoverTimeout);
-                hoverTimeout = setTimeout(() => {
-                    this.showReadingMenu(element);
-                }, CONFIG.READING_MENU_HOVER_DELAY);
-            });
-            
-            element.addEventListener('mouseleave', (e) => {
-                clearTimeout(hoverTimeout);
-                // 延迟隐藏菜单，给用户时间移动到菜单上
-                setTimeout(() => {
-                    const menu = this.state.currentMenu;
-                    if (menu && !menu.matches(':hover') && !element.matches(':hover')) {
-                        this.hideReadingMenu();
-                    }
-                }, CONFIG.READING_MENU_HIDE_DELAY);
-            });
+        const container = this.state.elements.lyricsOutput;
+        if (!container || container.dataset.menuBound) return;
+        container.dataset.menuBound = 'true';
+        let hoverTimeout;
+        
+        // 进入/离开多音字单词（mouseover/mouseout 会冒泡，以 relatedTarget 排除单词内部移动）
+        const crossedWord = (e) => {
+            const element = e.target.closest?.('.multi-reading');
+            if (!element || element.contains(e.relatedTarget)) return null;
+            return element;
+        };
+        
+        // 鼠标悬停事件
+        container.addEventListener('mouseover', (e) => {
+            const element = crossedWord(e);
+            if (!element) return;
+            clearTimeout(hoverTimeout);
+            hoverTimeout = setTimeout(() => {
+                this.showReadingMenu(element);
+            }, CONFIG.READING_MENU_HOVER_DELAY);
+        });
+        
+        container.addEventListener('mouseout', (e) => {
+            const element = crossedWord(e);
+            if (!element) return;
+            clearTimeout(hoverTimeout);
+            // 延迟隐藏菜单，给用户时间移动到菜单上
+            setTimeout(() => {
+                const menu = this.state.currentMenu;
+                if (menu && !menu.matches(':hover') && !element.matches(':hover')) {
+                    this.hideReadingMenu();
+                }
+            }, CONFIG.READING_MENU_HIDE_DELAY);
         });
     }
     
@@ -93,13 +104,15 @@ export class ReadingMenuManager {
         // 定位菜单
         this._positionMenu(menu, element);
         
-        // 为菜单选项添加点击事件
-        menu.querySelectorAll('.reading-option').forEach(option => {
-            option.addEventListener('click', () => {
-                let newReading = option.dataset.reading;
-                this.updateWordReading(element, newReading);
-                this.hideReadingMenu();
-            });
+        // 菜单选项点击（委托到菜单）
+        menu.addEventListener('click', (e) => {
+            const option = e.target.closest('.reading-option');
+            if (!option) return;
+            // 单词所在行已滚出视口被卸载时不再修改
+            if (element.isConnected) {
+                this.updateWordReading(element, option.dataset.reading);
+            }
+            this.hideReadingMenu();
         });
         
         // 菜单悬停事件
@@ -170,6 +183,9 @@ export class ReadingMenuManager {
         // 更新数据属性
         element.dataset.currentReading = newReading;
         
+        // 通知输出视图记录修改（行重新挂载时恢复）
+        element.dispatchEvent(new CustomEvent('reading-change', { bubbles: true }));
+        
         console.log(`用户选择了新读音: ${element.querySelector('rb').textContent} -> ${newReading}`);
     }
 }
@@ -23,6 +23,23 @@ export const CONFIG = {
     // 长按编辑配置
     LONG_PRESS_DURATION: 1000, // 毫秒
     
+    // 流式注音配置（长文本逐行渲染）
+    STREAMING_ENABLED: true,
+    STREAM_MIN_LENGTH: 2000, // 字符数超过该值时使用流式请求
+    
+    // HTTP缓存配置（先以可缓存的GET请求结果，未命中时再POST文本）
+    HTTP_CACHE_ENABLED: true,
+    
+    // 增量注音配置（编辑后只请求变更的行并就地替换）
+    INCREMENTAL_ENABLED: true,
+    
+    // 虚拟化渲染配置（长文档只挂载视口附近的行）
+    VIRTUALIZE_MIN_LINES: 200, // 行数达到该值时启用
+    VIRTUAL_OVERSCAN: 30, // 视口上下额外挂载的行数
+    
+    // 传输格式配置（紧凑列式格式，服务端不支持时自动回退为普通JSON）
+    COMPACT_FORMAT: true,
+
     // 输入防抖配置
     INPUT_DEBOUNCE_DELAY: 800, // 毫秒（即时更新延迟，避免频繁请求）
     
@@ -31,6 +48,7 @@ export const CONFIG = {
     READING_MENU_HIDE_DELAY: 200, // 毫秒
     
     // 导出配置
+    SERVER_EXPORT_ENABLED: true, // 优先由服务端排版为SVG，失败时在本地截图
     EXPORT_SCALE: 3, // 导出图片的分辨率倍数
     EXPORT_TARGET_WIDTH: 900, // 目标宽度
     
@@ -8,14 +8,16 @@ import { ConverterService } from './services/converter.js';
 import { ExporterService } from './services/exporter.js';
 import { ReadingMenuManager } from './components/reading-menu.js';
 import { LongpressEditorManager } from './components/longpress-editor.js';
-import { KatakanaToggleManager } from './components/katakana-toggle.js';
 import { CONFIG } from './config.js';
 
 class App {
     constructor() {
         this.state = appState;
         this.converter = new ConverterService();
-        this.exporter = new ExporterService();
+        this.exporter = new ExporterService(
+            () => this.converter.getOutputHtml(),
+            () => this.converter.getExportRequest()
+        );
         this.readingMenu = new ReadingMenuManager();
         this.longpressEditor = new LongpressEditorManager();
         this.themeMediaQuery = null;
@@ -150,9 +152,9 @@ class App {
         // 片假名转换选项
         this.state.elements.toggleKatakana.addEventListener('change', (e) => {
             this.state.updateSetting('katakanaConversion', e.target.checked);
-            // 如果已有输出，使用即时切换
+            // 如果已有输出，使用即时切换（只处理已挂载的行）
             if (this._hasValidOutput()) {
-                KatakanaToggleManager.toggleKatakanaDisplay(e.target.checked);
+                this.converter.setKatakanaDisplay(e.target.checked);
             }
         });
         
@@ -1,17 +1,68 @@
 /**
  * 注音转换服务
  * 负责调用API并渲染结果
+ * 
+ * 已渲染的每行结果按行哈希缓存；再次转换时只请求哈希未命中的行，
+ * 并只替换输出中首尾未变部分之间的行。
+ * 
+ * 输出由 VirtualLineList 渲染：长文档只挂载视口附近的行。用户修改的读音记在行状态中，
+ * 片假名显示按行切换（只处理已挂载的行，其余行在挂载时按当前设置处理）。
  */
 
 import { appState } from '../state.js';
-import { fetchFurigana } from '../api.js';
+import { CONFIG } from '../config.js';
+import { fetchFurigana, fetchFuriganaDiff, fetchFuriganaStream, hashLine } from '../api.js';
 import { generateWordHtml } from '../utils/ruby-generator.js';
-import { batchUpdateDOM } from '../utils/dom-utils.js';
+import { isKatakana } from '../utils/kana-utils.js';
+import { VirtualLineList } from '../utils/virtual-lines.js';
+import { KatakanaToggleManager } from '../components/katakana-toggle.js';
 
 export class ConverterService {
     constructor() {
         this.state = appState;
         this.currentAbortController = null;
+        
+        // 增量注音状态：行哈希 -> 行token，输出中每行对应的哈希，结果对应的片假名设置
+        this.lineResults = new Map();
+        this.renderedHashes = null;
+        this.resultsKatakana = null;
+        
+        // 当前输出的每行token、行token -> {html, hasKatakana}、片假名显示设置
+        this.lines = [];
+        this.lineHtml = new WeakMap();
+        this.linesKatakana = null;
+        this.katakanaDisplay = null;
+        this.view = null;
+    }
+    
+    /**
+     * 输出视图（首次使用时创建，DOM元素在应用初始化后才可用）
+     */
+    _getView() {
+        if (!this.view) {
+            const output = this.state.elements.lyricsOutput;
+            this.view = new VirtualLineList(
+                output,
+                index => this._lineEntry(index).html,
+                (line, index) => this._restoreLine(line, index)
+            );
+            // 菜单选择和长按编辑修改读音后记入行状态，行重新挂载时恢复
+            output.addEventListener('reading-change', (e) => this._recordEdit(e.target));
+        }
+        return this.view;
+    }
+    
+    /**
+     * 显示提示信息或清空输出（替换全部行）
+     */
+    _showMessage(text, asHtml = false) {
+        this._getView().reset(0);
+        this.lines = [];
+        if (asHtml) {
+            this.state.elements.lyricsOutput.innerHTML = text;
+        } else {
+            this.state.elements.lyricsOutput.textContent = text;
+        }
     }
     
     /**
@@ -21,7 +72,8 @@ export class ConverterService {
         const inputText = this.state.elements.lyricsInput.value;
         
         if (inputText.trim() === '') {
-            this.state.elements.lyricsOutput.innerHTML = '';
+            this._showMessage('');
+            this._resetLineState();
             return;
         }
         
@@ -31,15 +83,30 @@ export class ConverterService {
 
         const abortController = new AbortController();
         this.currentAbortController = abortController;
+        
+        const katakana = this.state.settings.katakanaConversion;
+        const hashes = inputText.split('\n').map(hashLine);
 
         // 设置加载状态
         this._setLoadingState(true);
-        this.state.elements.lyricsOutput.innerHTML = '<span class="loading-hint">正在连接Render...</span>';
         
         try {
+            if (this._canPatch(katakana)) {
+                const patched = await this._convertIncremental(inputText, hashes, katakana, abortController);
+                if (patched !== null) {
+                    return patched;
+                }
+            }
+            
+            this._showMessage('<span class="loading-hint">正在连接Render...</span>', true);
+            
+            if (this._shouldStream(inputText)) {
+                return await this._convertStreaming(inputText, hashes, katakana, abortController);
+            }
+            
             const lines = await fetchFurigana(
                 inputText,
-                this.state.settings.katakanaConversion,
+                katakana,
                 abortController.signal
             );
 
@@ -47,13 +114,14 @@ export class ConverterService {
                 return false;
             }
             
-            this._renderLines(lines);
+            this._renderLines(lines, katakana);
+            this._rememberLines(hashes, lines, katakana);
             
             return true;
         } catch (error) {
             console.error("请求失败:", error);
-            this.state.elements.lyricsOutput.textContent = 
-                `处理失败，请确保后端服务器正在运行。错误: ${error.message}`;
+            this._resetLineState();
+            this._showMessage(`处理失败，请确保后端服务器正在运行。错误: ${error.message}`);
             return false;
         } finally {
             if (this.currentAbortController === abortController) {
@@ -64,20 +132,287 @@ export class ConverterService {
     }
     
     /**
-     * 渲染行数据（优化版 - 使用批量更新）
+     * 是否使用流式请求（长文本且浏览器支持ReadableStream）
+     */
+    _shouldStream(inputText) {
+        return CONFIG.STREAMING_ENABLED &&
+            inputText.length >= CONFIG.STREAM_MIN_LENGTH &&
+            typeof ReadableStream !== 'undefined';
+    }
+    
+    /**
+     * 能否在已渲染的输出上增量更新（输出未被清空或替换，且片假名设置未变）
      */
-    _renderLines(lines) {
-        const outputHtmlArray = lines.map(lineTokens => {
-            if (!Array.isArray(lineTokens) || lineTokens.length === 0) {
-                return '';
+    _canPatch(katakana) {
+        return CONFIG.INCREMENTAL_ENABLED &&
+            this.renderedHashes !== null &&
+            this.resultsKatakana === katakana &&
+            this.view !== null &&
+            this.view.count === this.renderedHashes.length;
+    }
+    
+    /**
+     * 增量转换：只请求缓存中没有的行，并只替换变更的行
+     * @returns {Promise<boolean|null>} 是否成功；需要回退为完整转换时返回null
+     */
+    async _convertIncremental(inputText, hashes, katakana, abortController) {
+        const lines = inputText.split('\n');
+        const missing = {};
+        hashes.forEach((hash, i) => {
+            if (!this.lineResults.has(hash)) {
+                missing[hash] = lines[i];
             }
-            
-            const lineContent = lineTokens.map(token => generateWordHtml(token)).join('');
-            return lineContent;
         });
         
-        // 使用批量更新提高性能
-        batchUpdateDOM(this.state.elements.lyricsOutput, outputHtmlArray);
+        if (Object.keys(missing).length > 0) {
+            let results;
+            try {
+                results = await fetchFuriganaDiff(hashes, missing, katakana, abortController.signal);
+            } catch (error) {
+                if (abortController.signal.aborted) return false;
+                console.warn("增量注音失败，改为完整注音:", error);
+                this._resetLineState();
+                return null;
+            }
+            
+            if (abortController.signal.aborted) {
+                return false;
+            }
+            for (const [hash, tokens] of Object.entries(results)) {
+                this.lineResults.set(hash, tokens);
+            }
+            // 等待期间输出被清空或替换
+            if (!this._canPatch(katakana) || hashes.some(hash => !this.lineResults.has(hash))) {
+                this._resetLineState();
+                return null;
+            }
+        }
+        
+        // 首尾未变的行保持原样（包括用户手动修改过的读音）
+        const previous = this.renderedHashes;
+        const limit = Math.min(previous.length, hashes.length);
+        let prefix = 0;
+        while (prefix < limit && previous[prefix] === hashes[prefix]) {
+            prefix++;
+        }
+        let suffix = 0;
+        while (suffix < limit - prefix &&
+               previous[previous.length - 1 - suffix] === hashes[hashes.length - 1 - suffix]) {
+            suffix++;
+        }
+        
+        this.lines = hashes.map(hash => this.lineResults.get(hash));
+        this._getView().splice(
+            prefix,
+            previous.length - prefix - suffix,
+            hashes.length - prefix - suffix
+        );
+        this._rememberLines(hashes, null, katakana);
+        return true;
+    }
+    
+    /**
+     * 流式转换：每收到一行结果即渲染
+     */
+    async _convertStreaming(inputText, hashes, katakana, abortController) {
+        const view = this._getView();
+        const results = [];
+        let started = false;
+        
+        const start = () => {
+            this._showMessage('');
+            this.lines = results;
+            this.linesKatakana = this.katakanaDisplay = katakana;
+            started = true;
+        };
+        
+        try {
+            await fetchFuriganaStream(
+                inputText,
+                katakana,
+                abortController.signal,
+                (lineTokens, index) => {
+                    if (abortController.signal.aborted) return;
+                    if (!started) {
+                        start();
+                    }
+                    results[index] = lineTokens;
+                    view.append(1);
+                }
+            );
+        } catch (error) {
+            view.cancelScheduled();
+            throw error;
+        }
+        
+        if (abortController.signal.aborted) {
+            view.cancelScheduled();
+            return false;
+        }
+        
+        if (!started) {
+            start();
+        }
+        view.update();
+        this._rememberLines(hashes, results, katakana);
+        return true;
+    }
+    
+    /**
+     * 生成单行HTML
+     */
+    _renderLineHtml(lineTokens) {
+        if (!Array.isArray(lineTokens) || lineTokens.length === 0) {
+            return '';
+        }
+        return lineTokens.map(token => generateWordHtml(token)).join('');
+    }
+    
+    /**
+     * 行HTML和是否含片假名单词（按行token缓存，行重新挂载时不再生成）
+     */
+    _lineEntry(index) {
+        const lineTokens = this.lines[index];
+        if (!Array.isArray(lineTokens)) {
+            return { html: '', hasKatakana: false };
+        }
+        let entry = this.lineHtml.get(lineTokens);
+        if (!entry) {
+            entry = {
+                html: this._renderLineHtml(lineTokens),
+                hasKatakana: lineTokens.some(token => {
+                    const surface = token?.surface || '';
+                    return surface.length > 1 && isKatakana(surface);
+                })
+            };
+            this.lineHtml.set(lineTokens, entry);
+        }
+        return entry;
+    }
+    
+    /**
+     * 行挂载后恢复行状态：用户修改的读音、与结果不同的片假名显示设置
+     */
+    _restoreLine(line, index) {
+        const edits = this.view.states.get(index)?.edits;
+        if (edits) {
+            for (const [position, edit] of edits) {
+                const wordUnit = line.children[position];
+                const readingElement = wordUnit?.querySelector('.reading-text');
+                if (readingElement) {
+                    readingElement.textContent = edit.text;
+                    wordUnit.dataset.currentReading = edit.currentReading;
+                }
+            }
+        }
+        if (this.katakanaDisplay !== this.linesKatakana && this._lineEntry(index).hasKatakana) {
+            KatakanaToggleManager.applyToLine(line, this.katakanaDisplay);
+        }
+    }
+    
+    /**
+     * 记录用户修改的读音（reading-change 事件的目标为单词内的元素）
+     */
+    _recordEdit(target) {
+        const wordUnit = target.closest('.word-unit');
+        const line = wordUnit?.parentElement;
+        if (!line || line.dataset.line === undefined) return;
+        
+        const position = Array.prototype.indexOf.call(line.children, wordUnit);
+        const state = this.view.stateOf(Number(line.dataset.line));
+        if (!state.edits) {
+            state.edits = new Map();
+        }
+        state.edits.set(position, {
+            text: wordUnit.querySelector('.reading-text')?.textContent || '',
+            currentReading: wordUnit.dataset.currentReading || ''
+        });
+    }
+    
+    /**
+     * 切换片假名单词的注音显示（只处理已挂载且含片假名单词的行）
+     */
+    setKatakanaDisplay(show) {
+        if (!this.view || this.view.count === 0) return;
+        this.katakanaDisplay = show;
+        this.view.forEachMounted((line, index) => {
+            if (this._lineEntry(index).hasKatakana) {
+                KatakanaToggleManager.applyToLine(line, show);
+            }
+        });
+    }
+    
+    /**
+     * 服务端导出所需的数据：输出对应的文本、片假名显示设置和用户修改的读音
+     * @returns {Object|null} 没有完整的输出（为空或正在转换）时返回null
+     */
+    getExportRequest() {
+        if (!this.view || this.view.count === 0 || this.state.isConverting) {
+            return null;
+        }
+        // 各token的表面形式拼接即为原行文本
+        const lyrics = this.lines
+            .map(lineTokens => Array.isArray(lineTokens) ? lineTokens.map(token => token?.surface || '').join('') : '')
+            .join('\n');
+        const readings = [];
+        for (const [index, state] of this.view.states) {
+            for (const [position, edit] of state.edits || []) {
+                readings.push([index, position, edit.text]);
+            }
+        }
+        return { lyrics, katakana: this.katakanaDisplay, readings };
+    }
+    
+    /**
+     * 生成全部行的HTML（导出图片时使用，视口外的行也包含在内）
+     */
+    getOutputHtml() {
+        if (!this.view || this.view.count === 0) {
+            return this.state.elements.lyricsOutput.innerHTML;
+        }
+        return this.view.renderAllHtml();
+    }
+    
+    /**
+     * 渲染行数据（只挂载视口附近的行）
+     */
+    _renderLines(lines, katakana) {
+        this.lines = lines;
+        this.linesKatakana = this.katakanaDisplay = katakana;
+        this._getView().reset(lines.length);
+    }
+    
+    /**
+     * 记录已渲染的行（只保留当前文档的行结果）
+     * @param {string[]} hashes - 每行的哈希
+     * @param {Array|null} lines - 每行的token数组，为null时只更新行序
+     * @param {boolean} katakana - 结果对应的片假名设置
+     */
+    _rememberLines(hashes, lines, katakana) {
+        if (lines) {
+            if (lines.length !== hashes.length) {
+                this._resetLineState();
+                return;
+            }
+            lines.forEach((tokens, i) => this.lineResults.set(hashes[i], tokens));
+        }
+        const current = new Set(hashes);
+        for (const hash of this.lineResults.keys()) {
+            if (!current.has(hash)) {
+                this.lineResults.delete(hash);
+            }
+        }
+        this.renderedHashes = hashes;
+        this.resultsKatakana = katakana;
+    }
+    
+    /**
+     * 清除增量注音状态（下次转换走完整流程）
+     */
+    _resetLineState() {
+        this.lineResults.clear();
+        this.renderedHashes = null;
+        this.resultsKatakana = null;
     }
     
     /**
@@ -94,7 +429,8 @@ export class ConverterService {
      */
     clear() {
         this.state.elements.lyricsInput.value = '';
-        this.state.elements.lyricsOutput.innerHTML = '';
+        this._showMessage('');
+        this._resetLineState();
     }
 }
 
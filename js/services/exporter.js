@@ -1,14 +1,21 @@
 /**
  * 图片导出服务
- * 使用html2canvas导出注音结果为图片
+ * 优先由服务端排版为SVG（/api/export），服务端不可用时使用html2canvas导出为PNG
  */
 
 import { appState } from '../state.js';
 import { CONFIG } from '../config.js';
+import { fetchExportSvg } from '../api.js';
 
 export class ExporterService {
-    constructor() {
+    /**
+     * @param {Function|null} getOutputHtml - 返回全部输出行HTML的函数（虚拟化输出只挂载了部分行）
+     * @param {Function|null} getExportRequest - 返回服务端导出所需数据的函数，不可导出时返回null
+     */
+    constructor(getOutputHtml = null, getExportRequest = null) {
         this.state = appState;
+        this.getOutputHtml = getOutputHtml;
+        this.getExportRequest = getExportRequest;
     }
     
     /**
@@ -28,6 +35,9 @@ export class ExporterService {
         
         try {
             const title = titleElement.value || '标题';
+            if (CONFIG.SERVER_EXPORT_ENABLED && await this._exportFromServer(title)) {
+                return true;
+            }
             await this._exportToImage(title, lyricsElement);
             return true;
         } catch (error) {
@@ -39,6 +49,34 @@ export class ExporterService {
         }
     }
     
+    /**
+     * 服务端导出SVG
+     * @returns {Promise<boolean>} 是否成功；失败时改用本地截图
+     */
+    async _exportFromServer(title) {
+        const request = this.getExportRequest ? this.getExportRequest() : null;
+        if (!request) return false;
+        
+        try {
+            const blob = await fetchExportSvg({
+                ...request,
+                title,
+                theme: this.state.settings.theme === 'dark' ? 'dark' : 'light'
+            });
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.download = this._fileName(title, 'svg');
+            link.href = url;
+            link.click();
+            setTimeout(() => URL.revokeObjectURL(url), 0);
+            console.log('图片导出成功（服务端SVG）');
+            return true;
+        } catch (error) {
+            console.warn('服务端导出失败，改用本地截图:', error);
+            return false;
+        }
+    }
+    
     /**
      * 执行图片导出
      */
@@ -95,7 +133,7 @@ export class ExporterService {
         
         // 歌词
         const lyricsDiv = document.createElement('div');
-        lyricsDiv.innerHTML = lyricsElement.innerHTML;
+        lyricsDiv.innerHTML = this.getOutputHtml ? this.getOutputHtml() : lyricsElement.innerHTML;
         lyricsDiv.style.cssText = themeStyles.lyrics;
         this._normalizeRubyMarkup(lyricsDiv);
         
@@ -159,13 +197,20 @@ export class ExporterService {
      */
     _downloadImage(canvas, title) {
         const link = document.createElement('a');
-        const date = new Date();
-        const dateStr = `${date.getFullYear()}${String(date.getMonth() + 1).padStart(2, '0')}${String(date.getDate()).padStart(2, '0')}`;
-        link.download = `${title}_注音歌词_${dateStr}.png`;
+        link.download = this._fileName(title, 'png');
         link.href = canvas.toDataURL('image/png', 1.0);
         link.click();
     }
     
+    /**
+     * 导出文件名：标题_注音歌词_日期.扩展名
+     */
+    _fileName(title, extension) {
+        const date = new Date();
+        const dateStr = `${date.getFullYear()}${String(date.getMonth() + 1).padStart(2, '0')}${String(date.getDate()).padStart(2, '0')}`;
+        return `${title}_注音歌词_${dateStr}.${extension}`;
+    }
+    
     /**
      * 获取导出样式 - 与当前页面样式保持一致
      */
@@ -18,4 +18,3 @@ export function batchUpdateDOM(container, htmlArray) {
     container.innerHTML = '';
     container.appendChild(fragment);
 }
-
@@ -0,0 +1,292 @@
+/**
+ * 虚拟化行列表
+ * 长文档只把视口附近的行挂载到DOM，视口外的行用上下两个占位元素撑开高度
+ *
+ * 输出中每行是一个<p>（white-space: nowrap，行高固定），因此按统一行高计算可见范围；
+ * 行数少于 CONFIG.VIRTUALIZE_MIN_LINES 时全部挂载，DOM结构与不虚拟化时相同。
+ * 行卸载后DOM上的改动随之丢失，需要保留的行状态（如用户修改的读音）存放在 states 中，
+ * 由 onMount 回调在行重新挂载时恢复。
+ */
+
+import { CONFIG } from '../config.js';
+
+export class VirtualLineList {
+    /**
+     * @param {HTMLElement} container - 输出容器
+     * @param {Function} renderLine - (index) => 行HTML
+     * @param {Function|null} onMount - (lineElement, index) => void，行挂载后调用
+     */
+    constructor(container, renderLine, onMount = null) {
+        this.container = container;
+        this.renderLine = renderLine;
+        this.onMount = onMount;
+        
+        this.count = 0;
+        // 行号 -> 已挂载的<p>
+        this.mounted = new Map();
+        // 行号 -> 行状态（随增删行平移）
+        this.states = new Map();
+        
+        this.first = 0;
+        this.last = 0;
+        this.rowHeight = 0;
+        this.measured = false;
+        this.dirty = false;
+        this.frameId = null;
+        this.listening = false;
+        
+        this.topSpacer = this._createSpacer();
+        this.bottomSpacer = this._createSpacer();
+    }
+    
+    /**
+     * 替换全部行（清空容器后按新的行数渲染可见范围）
+     * @param {number} count - 行数
+     */
+    reset(count) {
+        this.cancelScheduled();
+        this.container.innerHTML = '';
+        this.mounted.clear();
+        this.states.clear();
+        this.count = count;
+        this.first = this.last = 0;
+        this.dirty = true;
+        if (count > 0) {
+            this._listen();
+            this.update();
+        }
+    }
+    
+    /**
+     * 替换连续的若干行（增量注音时只重建编辑涉及的行）
+     * @param {number} start - 起始行号
+     * @param {number} deleteCount - 删除的行数
+     * @param {number} insertCount - 插入的行数
+     */
+    splice(start, deleteCount, insertCount) {
+        const delta = insertCount - deleteCount;
+        const shift = (map, onDrop) => {
+            const shifted = new Map();
+            for (const [index, value] of map) {
+                if (index < start) {
+                    shifted.set(index, value);
+                } else if (index >= start + deleteCount) {
+                    shifted.set(index + delta, value);
+                } else if (onDrop) {
+                    onDrop(value);
+                }
+            }
+            return shifted;
+        };
+        
+        this.mounted = shift(this.mounted, line => line.remove());
+        for (const [index, line] of this.mounted) {
+            line.dataset.line = String(index);
+        }
+        this.states = shift(this.states, null);
+        this.count += delta;
+        this.dirty = true;
+        this.update();
+    }
+    
+    /**
+     * 在末尾追加行（流式渲染时使用，每帧合并一次DOM写入）
+     * @param {number} n - 追加的行数
+     */
+    append(n = 1) {
+        if (this.count === 0) {
+            this._listen();
+        }
+        this.count += n;
+        this.dirty = true;
+        this.schedule();
+    }
+    
+    /**
+     * 在下一帧更新可见范围
+     */
+    schedule() {
+        if (this.frameId === null) {
+            this.frameId = requestAnimationFrame(() => {
+                this.frameId = null;
+                this.update();
+            });
+        }
+    }
+    
+    /**
+     * 取消尚未执行的更新
+     */
+    cancelScheduled() {
+        if (this.frameId !== null) {
+            cancelAnimationFrame(this.frameId);
+            this.frameId = null;
+        }
+    }
+    
+    /**
+     * 按当前滚动位置挂载/卸载行
+     */
+    update() {
+        this.cancelScheduled();
+        const [first, last] = this._visibleRange();
+        if (!this.dirty && first === this.first && last === this.last) {
+            return;
+        }
+        this.dirty = false;
+        
+        for (const [index, line] of this.mounted) {
+            if (index < first || index >= last) {
+                line.remove();
+                this.mounted.delete(index);
+            }
+        }
+        
+        // 上方占位
+        let previous = null;
+        if (first > 0) {
+            if (this.topSpacer.parentNode !== this.container) {
+                this.container.insertBefore(this.topSpacer, this.container.firstChild);
+            }
+            this.topSpacer.style.height = `${first * this.rowHeight}px`;
+            previous = this.topSpacer;
+        } else {
+            this.topSpacer.remove();
+        }
+        
+        // 已挂载的行保持原有顺序，缺少的行按行号插入
+        for (let index = first; index < last; index++) {
+            let line = this.mounted.get(index);
+            if (!line) {
+                line = this._createLine(index);
+                this.container.insertBefore(line, previous ? previous.nextSibling : this.container.firstChild);
+                this.mounted.set(index, line);
+            }
+            previous = line;
+        }
+        
+        // 下方占位
+        if (last < this.count) {
+            this.container.insertBefore(this.bottomSpacer, previous ? previous.nextSibling : this.container.firstChild);
+            this.bottomSpacer.style.height = `${(this.count - last) * this.rowHeight}px`;
+        } else {
+            this.bottomSpacer.remove();
+        }
+        
+        this.first = first;
+        this.last = last;
+        
+        // 首次挂载后按实际行高重新计算一次
+        if (!this.measured && this.count >= CONFIG.VIRTUALIZE_MIN_LINES && this.mounted.size > 0) {
+            this.measured = true;
+            if (this._measureRowHeight()) {
+                this.dirty = true;
+                this.schedule();
+            }
+        }
+    }
+    
+    /**
+     * 对已挂载的每一行执行回调
+     * @param {Function} callback - (lineElement, index) => void
+     */
+    forEachMounted(callback) {
+        for (const [index, line] of this.mounted) {
+            callback(line, index);
+        }
+    }
+    
+    /**
+     * 获取行状态（不存在时创建）
+     * @param {number} index - 行号
+     */
+    stateOf(index) {
+        let state = this.states.get(index);
+        if (!state) {
+            state = {};
+            this.states.set(index, state);
+        }
+        return state;
+    }
+    
+    /**
+     * 生成全部行的HTML（含行状态，用于导出）
+     */
+    renderAllHtml() {
+        const parts = [];
+        for (let index = 0; index < this.count; index++) {
+            parts.push(this.mounted.get(index)?.outerHTML || this._createLine(index).outerHTML);
+        }
+        return parts.join('');
+    }
+    
+    _createLine(index) {
+        const line = document.createElement('p');
+        line.innerHTML = this.renderLine(index);
+        line.dataset.line = String(index);
+        if (this.onMount) {
+            this.onMount(line, index);
+        }
+        return line;
+    }
+    
+    _createSpacer() {
+        const spacer = document.createElement('div');
+        spacer.className = 'virtual-spacer';
+        spacer.setAttribute('aria-hidden', 'true');
+        return spacer;
+    }
+    
+    /**
+     * 计算需要挂载的行范围 [first, last)
+     */
+    _visibleRange() {
+        if (this.count < CONFIG.VIRTUALIZE_MIN_LINES) {
+            return [0, this.count];
+        }
+        if (this.rowHeight <= 0 && !this._measureRowHeight()) {
+            // 尚无已挂载的行：按字号估算行高（p 的 line-height 3.2 加 0.5em 下边距）
+            const fontSize = parseFloat(getComputedStyle(this.container).fontSize) || 16;
+            this.rowHeight = fontSize * 3.7;
+        }
+        
+        const rect = this.container.getBoundingClientRect();
+        const paddingTop = parseFloat(getComputedStyle(this.container).paddingTop) || 0;
+        const offset = -rect.top - paddingTop;
+        const overscan = CONFIG.VIRTUAL_OVERSCAN;
+        
+        const clamp = (value, min, max) => Math.min(Math.max(value, min), max);
+        const first = clamp(Math.floor(offset / this.rowHeight) - overscan, 0, this.count);
+        const last = clamp(Math.ceil((offset + window.innerHeight) / this.rowHeight) + overscan, first, this.count);
+        return [first, last];
+    }
+    
+    /**
+     * 以第一个已挂载的行测量行高（含下边距）
+     * @returns {boolean} 行高是否有变化
+     */
+    _measureRowHeight() {
+        const line = this.mounted.values().next().value;
+        if (!line) return false;
+        const height = line.offsetHeight + (parseFloat(getComputedStyle(line).marginBottom) || 0);
+        if (height <= 0 || Math.abs(height - this.rowHeight) < 0.5) return false;
+        this.rowHeight = height;
+        return true;
+    }
+    
+    /**
+     * 监听页面滚动和窗口大小变化（只绑定一次）
+     */
+    _listen() {
+        if (this.listening) return;
+        this.listening = true;
+        window.addEventListener('scroll', () => {
+            if (this.count >= CONFIG.VIRTUALIZE_MIN_LINES) this.schedule();
+        }, { passive: true });
+        window.addEventListener('resize', () => {
+            this.measured = false;
+            this.dirty = true;
+            this.schedule();
+        });
+    }
+}
@@ -0,0 +1,546 @@
+"""
+注音服务模块
+按行生成注音结果，负责行级去重和跨请求的行结果缓存
+
+行结果缓存分两级：进程内LRU缓存，以及同一主机上各工作进程共享、重启后保留的
+SQLite持久缓存(PERSISTENT_CACHE_PATH)。持久缓存的版本由词典、规则、Sudachi词典
+和注音代码共同决定，任一变化都会使旧条目失效。
+"""
+import hashlib
+import json
+import logging
+import sys
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import config
+from utils.kana_converter import katakana_to_hiragana, katakana_to_hiragana_batch
+from utils.text_processor import (
+    CHAR_KANJI, CHAR_KATAKANA, CHAR_LATIN, CHAR_PROLONGED, CHAR_SPACE,
+    classify_tokens, only_classes, collect_next_hiragana,
+    extract_trailing_hiragana, voicing_variants
+)
+from utils.lru_cache import LRUCache
+from utils.persistent_cache import PersistentCache
+from services.dictionary_service import dictionary_service
+from services.tokenizer_service import tokenizer_service, mode_readings
+from services.reading_service import reading_service
+from services.rule_service import rule_service
+from services import metrics_service, profiling_service
+from services.parallel_service import parallel_annotator
+
+
+logger = logging.getLogger(__name__)
+
+LineResult = List[Dict[str, Any]]
+
+# 影响注音结果的模块，源码变化时持久缓存失效
+_PIPELINE_MODULES = (
+    __name__,
+    "services.reading_service",
+    "services.rule_service",
+    "services.tokenizer_service",
+    "utils.text_processor",
+    "utils.kana_converter",
+)
+
+
+class AnnotationService:
+    """注音服务类"""
+    
+    def __init__(self):
+        self.dict_service = dictionary_service
+        self.tokenizer = tokenizer_service
+        self.reading = reading_service
+        self.parallel = parallel_annotator
+        # 行结果缓存: (行文本, 片假名转换开关, 词典版本) -> 行token列表
+        self._line_cache = LRUCache(
+            max_entries=config.LINE_CACHE_SIZE,
+            max_bytes=config.LINE_CACHE_MAX_BYTES
+        )
+        # 持久缓存在首次使用时打开（版本依赖已加载的词典和规则）
+        self._persistent: Optional[PersistentCache] = None
+        self._persistent_detached = not config.PERSISTENT_CACHE_PATH
+        # (词典版本, 规则版本) -> 流水线版本（代码和系统词典在进程内不变，只需按前两者重算）
+        self._pipeline_versions: Dict[Tuple[str, str], str] = {}
+    
+    def annotate_lines(
+        self,
+        lines: List[str],
+        want_katakana_conversion: bool = True,
+        computed: Optional[Dict[Tuple[str, bool], LineResult]] = None
+    ) -> List[LineResult]:
+        """
+        为多行文本生成注音，相同的行在同一请求中只计算一次
+        
+        Args:
+            lines: 文本行列表
+            want_katakana_conversion: 是否为片假名单词注音
+            computed: 请求内共享的行结果表，批量请求中跨文档复用
+        
+        Returns:
+            与输入行一一对应的token列表
+        """
+        return list(self.iter_annotated_lines(
+            lines, want_katakana_conversion, computed
+        ))
+    
+    def iter_annotated_lines(
+        self,
+        lines: List[str],
+        want_katakana_conversion: bool = True,
+        computed: Optional[Dict[Tuple[str, bool], LineResult]] = None
+    ) -> Iterator[LineResult]:
+        """
+        逐行生成注音结果（供流式响应使用），去重规则同 annotate_lines
+        
+        Args:
+            lines: 文本行列表
+            want_katakana_conversion: 是否为片假名单词注音
+            computed: 请求内共享的行结果表
+        
+        Yields:
+            每行的token列表，顺序与输入一致
+        """
+        if computed is None:
+            computed = {}
+        
+        self._prefetch_persistent(lines, want_katakana_conversion, computed)
+        
+        # 大段未缓存文本先分片提交到进程池，按顺序消费结果
+        pending = self._dispatch_parallel(lines, want_katakana_conversion, computed)
+        
+        for line in lines:
+            key = (line, want_katakana_conversion)
+            result = computed.get(key)
+            if result is None and line in pending:
+                self._collect_chunk(pending, line, want_katakana_conversion, computed)
+                result = computed.get(key)
+            if result is None:
+                # 持久缓存已在开头批量查询过
+                result = self._annotate_line(line, want_katakana_conversion, lookup_persistent=False)
+                computed[key] = result
+            yield result
+    
+    def _dispatch_parallel(
+        self,
+        lines: List[str],
+        want_katakana_conversion: bool,
+        computed: Dict[Tuple[str, bool], LineResult]
+    ) -> Dict[str, Tuple[Future, List[str]]]:
+        """
+        将未命中缓存的行分片提交到进程池
+        
+        Returns:
+            行文本 -> (Future, 所在分片) 的映射；不满足并行条件时为空
+        """
+        if not self.parallel.enabled:
+            return {}
+        
+        # 逐token剖析需要在本进程内计算
+        profile = profiling_service.current()
+        if profile is not None and profile.detailed:
+            return {}
+        
+        version = self.dict_service.version
+        missing = []
+        seen = set()
+        for line in lines:
+            if line in seen or not line.strip():
+                continue
+            seen.add(line)
+            if (line, want_katakana_conversion) in computed:
+                continue
+            if (line, want_katakana_conversion, version) in self._line_cache:
+                continue
+            missing.append(line)
+        
+        if not self.parallel.should_parallelize(missing):
+            return {}
+        
+        pending = {}
+        try:
+            for chunk in self.parallel.split_chunks(missing):
+                future = self.parallel.submit(chunk, want_katakana_conversion)
+                for line in chunk:
+                    pending[line] = (future, chunk)
+        except Exception as e:
+            logger.warning(f"⚠ 提交并行注音任务失败，改为串行处理: {e}")
+        return pending
+    
+    def _collect_chunk(
+        self,
+        pending: Dict[str, Tuple[Future, List[str]]],
+        line: str,
+        want_katakana_conversion: bool,
+        computed: Dict[Tuple[str, bool], LineResult]
+    ) -> None:
+        """等待某行所在分片完成，并将整片结果写入请求表和行缓存"""
+        future, chunk = pending[line]
+        for chunk_line in chunk:
+            pending.pop(chunk_line, None)
+        
+        try:
+            results = self.parallel.result(future)
+        except Exception as e:
+            logger.warning(f"⚠ 并行注音分片失败，改为串行处理: {e}")
+            return
+        
+        profile = profiling_service.current()
+        if profile is not None:
+            profile.lines_from_pool(len(chunk))
+        
+        version = self.dict_service.version
+        for chunk_line, result in zip(chunk, results):
+            computed[(chunk_line, want_katakana_conversion)] = result
+            self._line_cache.put((chunk_line, want_katakana_conversion, version), result)
+    
+    def annotate_line(
+        self,
+        line: str,
+        want_katakana_conversion: bool = True
+    ) -> LineResult:
+        """
+        为单行文本生成注音（带进程级LRU缓存和持久缓存）
+        
+        Args:
+            line: 单行文本
+            want_katakana_conversion: 是否为片假名单词注音
+        
+        Returns:
+            token列表，每个token包含surface/reading/alternatives/has_alternatives
+        """
+        return self._annotate_line(line, want_katakana_conversion, lookup_persistent=True)
+    
+    def _annotate_line(self, line: str, want_katakana_conversion: bool, lookup_persistent: bool) -> LineResult:
+        """依次查询进程内缓存、持久缓存（lookup_persistent为真时），均未命中时计算并写回"""
+        if not line.strip():
+            return []
+        
+        key = (line, want_katakana_conversion, self.dict_service.version)
+        cached = self._line_cache.get(key)
+        if cached is None and lookup_persistent:
+            cached = self._persistent_get([line], want_katakana_conversion).get(line)
+            if cached is not None:
+                self._line_cache.put(key, cached)
+        if cached is not None:
+            profile = profiling_service.current()
+            if profile is not None:
+                profile.line_cached()
+            return cached
+        
+        result = self._annotate_line_uncached(line, want_katakana_conversion)
+        self._line_cache.put(key, result)
+        self._persistent_put([(line, result)], want_katakana_conversion)
+        return result
+    
+    @property
+    def persistent_cache(self) -> Optional[PersistentCache]:
+        """持久行缓存（未配置、已停用或本进程已分离时为None）"""
+        if self._persistent_detached:
+            return None
+        if self._persistent is None:
+            self._persistent = PersistentCache(
+                config.PERSISTENT_CACHE_PATH,
+                self.pipeline_version(),
+                config.PERSISTENT_CACHE_MAX_BYTES
+            )
+        return self._persistent if self._persistent.enabled else None
+    
+    def pipeline_version(self) -> str:
+        """
+        注音结果的版本：词典、特殊词规则、Sudachi系统词典和注音流水线代码的组合指纹
+        
+        每个请求都会用到（可缓存GET的内容版本），按词典和规则版本缓存结果。
+        
+        Returns:
+            版本号（短哈希）
+        """
+        rule_service.load()
+        key = (self.dict_service.version, rule_service.version)
+        version = self._pipeline_versions.get(key)
+        if version is not None:
+            return version
+        
+        h = hashlib.sha1()
+        h.update(f"{key[0]}\n{key[1]}\n{self.tokenizer.dictionary_id}\n".encode())
+        for name in _PIPELINE_MODULES:
+            path = getattr(sys.modules.get(name), "__file__", None)
+            try:
+                with open(path, 'rb') as f:
+                    h.update(f.read())
+            except (OSError, TypeError):
+                h.update(f"{name}:missing".encode())
+        version = self._pipeline_versions[key] = h.hexdigest()[:12]
+        return version
+    
+    def _prefetch_persistent(
+        self,
+        lines: List[str],
+        want_katakana_conversion: bool,
+        computed: Dict[Tuple[str, bool], LineResult]
+    ) -> None:
+        """以一次查询从持久缓存取回进程内缓存未命中的行，写入进程内缓存"""
+        if self.persistent_cache is None:
+            return
+        version = self.dict_service.version
+        missing = {
+            line for line in lines
+            if line.strip()
+            and (line, want_katakana_conversion) not in computed
+            and (line, want_katakana_conversion, version) not in self._line_cache
+        }
+        if not missing:
+            return
+        for line, result in self._persistent_get(list(missing), want_katakana_conversion).items():
+            self._line_cache.put((line, want_katakana_conversion, version), result)
+    
+    def _persistent_get(self, lines: List[str], want_katakana_conversion: bool) -> Dict[str, LineResult]:
+        """从持久缓存批量读取行结果"""
+        store = self.persistent_cache
+        if store is None:
+            return {}
+        prefix = "k:" if want_katakana_conversion else "n:"
+        found = store.get_many(prefix + line for line in lines)
+        return {key[2:]: json.loads(value) for key, value in found.items()}
+    
+    def _persistent_put(self, items, want_katakana_conversion: bool) -> None:
+        """将 (行文本, 行结果) 写入持久缓存"""
+        store = self.persistent_cache
+        if store is None:
+            return
+        prefix = "k:" if want_katakana_conversion else "n:"
+        store.put_many(
+            (prefix + line, json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            for line, result in items
+            if line.strip()
+        )
+    
+    def _annotate_line_uncached(
+        self,
+        line: str,
+        want_katakana_conversion: bool
+    ) -> LineResult:
+        """对单行文本执行完整的分词与读音处理"""
+        clock = time.perf_counter
+        started = clock()
+        
+        # 单次多粒度分词（C模式分词后拆分为B模式token）
+        tokens = self.tokenizer.smart_tokenize(line)
+        line_result = []
+        
+        # 各阶段耗时在本地累加，整行结束后记录一次指标
+        tokenize_time = clock() - started
+        candidates_time = special_time = filter_time = 0.0
+        
+        # 请求剖析（逐token明细仅在detailed模式下收集）
+        profile = profiling_service.current()
+        token_details = [] if profile is not None and profile.detailed else None
+        
+        # 整行一次完成字符分类和读音的平假名转换
+        surfaces = [m.surface() for m in tokens]
+        readings = [m.reading_form() for m in tokens]
+        char_flags = classify_tokens(surfaces)
+        readings_hiragana = katakana_to_hiragana_batch(readings)
+        
+        for idx, m in enumerate(tokens):
+            surface = surfaces[idx]
+            reading = readings[idx]
+            flags = char_flags[idx]
+            pos = m.part_of_speech()
+            
+            reading_hiragana = ""
+            alternative_readings = []
+            
+            # 处理空白和符号
+            if surface.isspace() or pos[0] == "補助記号":
+                reading_hiragana = surface
+            else:
+                # 检查是否为片假名单词
+                if only_classes(flags, CHAR_KATAKANA | CHAR_PROLONGED) and len(surface) > 1:
+                    if want_katakana_conversion:
+                        reading_hiragana = katakana_to_hiragana(surface)
+                    else:
+                        reading_hiragana = ""
+                # 非片假名单词
+                else:
+                    if reading and reading != "*":
+                        reading_hiragana = readings_hiragana[idx]
+                        
+                        # 英文不注音
+                        if only_classes(flags, CHAR_LATIN | CHAR_SPACE):
+                            reading_hiragana = ""
+                        
+                        # 助词/助动词/符号/纯假名不出多音菜单
+                        if self.reading.should_skip_alternatives(pos[0], surface):
+                            alternative_readings = []
+                        # 为汉字单词获取多音字选项
+                        elif flags & CHAR_KANJI:
+                            # 候选收集、词典融合、白名单与裁剪（带缓存）
+                            t0 = clock()
+                            alternative_readings = self.reading.get_candidate_readings(
+                                surface,
+                                reading_hiragana,
+                                line,
+                                m.end(),
+                                mode_readings(m)
+                            )
+                            
+                            # 特殊词汇处理
+                            t1 = clock()
+                            alternative_readings, reading_hiragana = _handle_special_words(
+                                surface, tokens, idx, reading_hiragana, alternative_readings
+                            )
+                            
+                            # 过滤候选
+                            t2 = clock()
+                            alternative_readings = _filter_with_context(
+                                tokens, idx, reading, reading_hiragana,
+                                surface, alternative_readings
+                            )
+                            t3 = clock()
+                            candidates_time += t1 - t0
+                            special_time += t2 - t1
+                            filter_time += t3 - t2
+                            if token_details is not None:
+                                token_details.append({
+                                    "index": idx,
+                                    "surface": surface,
+                                    "reading": reading_hiragana,
+                                    "candidates_ms": round((t1 - t0) * 1000, 3),
+                                    "special_ms": round((t2 - t1) * 1000, 3),
+                                    "filter_ms": round((t3 - t2) * 1000, 3),
+                                })
+                    else:
+                        reading_hiragana = ""
+            
+            line_result.append({
+                "surface": surface,
+                "reading": reading_hiragana,
+                "alternatives": alternative_readings,
+                "has_alternatives": len(alternative_readings) > 1
+            })
+        
+        metrics_service.record_line(
+            len(tokens), tokenize_time, candidates_time, special_time, filter_time
+        )
+        if profile is not None:
+            profile.record_line(
+                line,
+                len(tokens),
+                clock() - started,
+                {
+                    "tokenize": tokenize_time,
+                    "candidates": candidates_time,
+                    "special": special_time,
+                    "filter": filter_time,
+                },
+                token_details
+            )
+        return line_result
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回行结果缓存的命中统计"""
+        return self._line_cache.stats()
+    
+    def persistent_cache_stats(self) -> Dict[str, Any]:
+        """返回持久行缓存的命中统计（未启用时各项为0）"""
+        store = self._persistent
+        if store is None:
+            return {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        return store.stats()
+    
+    def clear_caches(self) -> None:
+        """
+        清空行结果缓存和候选读音缓存（离线重放、基准测试时模拟冷缓存）
+        
+        持久缓存由同一主机上的其他进程共享，不清空，只在本进程中停用
+        """
+        self._line_cache.clear()
+        self.reading.clear_cache()
+        self._persistent_detached = True
+
+
+def _handle_special_words(
+    surface: str,
+    tokens: List,
+    idx: int,
+    reading_hiragana: str,
+    alternative_readings: List[str]
+) -> tuple:
+    """
+    处理特殊词汇的读音
+    返回: (alternative_readings, reading_hiragana)
+    """
+    # 1. 送假名内部容错过滤
+    surf_tail = extract_trailing_hiragana(surface)
+    if surf_tail and reading_hiragana and reading_hiragana.endswith(surf_tail):
+        base = reading_hiragana[:-len(surf_tail)] if len(surf_tail) <= len(reading_hiragana) else reading_hiragana
+        vset = voicing_variants(surf_tail[0])
+        bad_forms = set()
+        for v in vset:
+            if v == surf_tail[0]:
+                continue
+            bad_forms.add(base + v)
+            bad_forms.add(base + v + surf_tail[1:])
+        if bad_forms:
+            alternative_readings = [r for r in alternative_readings if r not in bad_forms]
+    
+    # 2. 特殊词规则（规则表special阶段，如"明"、"何"）
+    alternative_readings, reading_hiragana = rule_service.apply_special_rules(
+        surface, tokens, idx, reading_hiragana, alternative_readings
+    )
+    
+    return alternative_readings, reading_hiragana
+
+
+def _filter_with_context(
+    tokens: List,
+    idx: int,
+    reading: str,
+    reading_hiragana: str,
+    surface: str,
+    alternative_readings: List[str]
+) -> List[str]:
+    """基于上下文过滤候选读音"""
+    # 收集后续平假名
+    next_hira = collect_next_hiragana(tokens, idx, max_chars=2)
+    
+    # 始终保留的读音（规则表filter阶段，如"皆"）
+    keep_always = rule_service.keep_always(surface)
+    
+    # 通用防误拼
+    if next_hira:
+        bad_suffixes = {next_hira, next_hira[:1]}
+        
+        # 浊音变体
+        first = next_hira[0]
+        variants = voicing_variants(first)
+        for v in variants:
+            bad_suffixes.add(v)
+            if len(next_hira) > 1:
+                bad_suffixes.add(v + next_hira[1:])
+        
+        alternative_readings = [
+            r for r in alternative_readings 
+            if r in keep_always or not any(r.endswith(suf) for suf in bad_suffixes if suf)
+        ]
+        
+        # 进一步过滤：默认读音 + 变体
+        if reading_hiragana:
+            ban_heads = {reading_hiragana + v for v in variants}
+            alternative_readings = [
+                r for r in alternative_readings
+                if r in keep_always or r not in ban_heads
+            ]
+    
+    return alternative_readings
+
+
+# 全局注音服务实例
+annotation_service = AnnotationService()
+metrics_service.register_cache("line", annotation_service.cache_stats)
+metrics_service.register_cache("line_persistent", annotation_service.persistent_cache_stats)
+metrics_service.register_cache("candidate", reading_service.cache_stats)
+metrics_service.register_cache("surface", reading_service.surface_cache_stats)
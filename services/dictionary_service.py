@@ -1,48 +1,178 @@
 """
 词典服务模块
 负责加载和管理外部词典数据
+
+JMdict和Kanjidic2的读音在加载时统一为平假名（编译词典在编译时已转换），
+JSON词典整理为共享读音元组的 ReadingTable；Kanjidic2条目少、查询频繁，
+总是展开为 ReadingTable，每个汉字的读音集合在首次查询时构造并缓存。
 """
+import hashlib
 import json
 import logging
-from typing import Dict, List, Optional
+import os
+import threading
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Sequence, Union
 from config import config
+from utils.compiled_dict import CompiledDict, CompiledDictError, file_fingerprint
+from utils.reading_table import EMPTY_READINGS, ReadingTable
 
 
 logger = logging.getLogger(__name__)
 
 
 class DictionaryService:
-    """词典服务类，管理所有外部词典"""
+    """
+    词典服务类，管理所有外部词典
+    
+    词典在首次使用或显式调用 load() 时加载；在gunicorn --preload 下
+    由主进程加载一次，工作进程fork后共享只读页面。
+    """
     
     def __init__(self):
-        self.jmdict_readings: Dict[str, List[str]] = {}
-        self.kanjidic2_readings: Dict = {}
+        self.jmdict_readings: Union[ReadingTable, CompiledDict] = ReadingTable(())
+        self.kanjidic2_readings: ReadingTable = ReadingTable(())
         self.kanji_readings: Dict[str, List[str]] = {}
         self.phrase_override_readings: Dict[str, List[str]] = {}
-        self._initialize_dictionaries()
+        self._compiled_overrides: Optional[CompiledDict] = None
+        self._fingerprints: Dict[str, Optional[str]] = {}
+        self._version: str = ""
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        """词典是否已加载"""
+        return self._loaded
+    
+    @property
+    def version(self) -> str:
+        """词典版本号（按需触发加载）"""
+        if not self._loaded:
+            self.load()
+        return self._version
+    
+    def load(self) -> None:
+        """加载所有词典（幂等，线程安全）"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._initialize_dictionaries()
+            self._loaded = True
     
     def _initialize_dictionaries(self) -> None:
         """初始化所有词典"""
         self.jmdict_readings = self._load_dictionary(
-            config.JMDICT_PATH, "JMdict"
+            config.JMDICT_PATH, "JMdict", config.COMPILED_JMDICT_PATH
         )
         self.kanjidic2_readings = self._load_dictionary(
-            config.KANJIDIC2_PATH, "Kanjidic2"
+            config.KANJIDIC2_PATH, "Kanjidic2", config.COMPILED_KANJIDIC2_PATH, materialize=True
         )
         # kanji_readings 已合并到 kanjidic2_readings 中，不再单独加载
         self._load_phrase_overrides()
+        self._version = self._compute_version()
         
         logger.info(f"词典加载完成: JMdict={len(self.jmdict_readings)}, "
-                   f"Kanjidic2={len(self.kanjidic2_readings)}")
+                   f"Kanjidic2={len(self.kanjidic2_readings)}, "
+                   f"version={self._version}")
     
-    def _load_dictionary(self, path: str, name: str) -> Dict:
+    def _compute_version(self) -> str:
+        """
+        根据实际加载的词典内容指纹计算词典版本号
+        词典文件变化时版本号随之变化，用于缓存键
+        
+        Returns:
+            版本号（短哈希）
+        """
+        h = hashlib.sha1()
+        for name in sorted(self._fingerprints):
+            h.update(f"{name}:{self._fingerprints[name] or 'missing'}\n".encode('utf-8'))
+        return h.hexdigest()[:12]
+    
+    def _open_compiled(
+        self,
+        source_path: str,
+        compiled_path: Optional[str],
+        name: str,
+        normalized: Optional[str] = None
+    ) -> Optional[CompiledDict]:
+        """
+        打开编译词典，源JSON已变化（指纹不一致）或读音未按要求规范化时视为过期
+        
+        Args:
+            source_path: 源JSON路径
+            compiled_path: 编译词典路径
+            name: 词典名称（用于日志）
+            normalized: 要求的读音规范化方式（编译词典元数据 normalized），None表示不检查
+        
+        Returns:
+            可用的编译词典，不可用时返回None
+        """
+        if not config.USE_COMPILED_DICTIONARIES or not compiled_path:
+            return None
+        if not os.path.exists(compiled_path):
+            logger.debug(f"{name}编译词典不存在: {compiled_path}")
+            return None
+        
+        try:
+            compiled = CompiledDict(compiled_path)
+        except (OSError, CompiledDictError) as e:
+            logger.warning(f"⚠ {name}编译词典无法读取，回退到JSON: {e}")
+            return None
+        
+        source_fp = file_fingerprint(source_path)
+        if source_fp is not None and source_fp != compiled.meta.get("source_fingerprint"):
+            logger.warning(f"⚠ {name}编译词典已过期，回退到JSON（请重新运行 python -m tools.build_dictionaries）")
+            compiled.close()
+            return None
+        if normalized is not None and compiled.meta.get("normalized") != normalized:
+            logger.warning(f"⚠ {name}编译词典的读音未规范化为{normalized}，回退到JSON（请重新运行 python -m tools.build_dictionaries）")
+            compiled.close()
+            return None
+        
+        self._fingerprints[name] = compiled.meta.get("source_fingerprint")
+        logger.info(f"✓ {name}编译词典映射成功: {len(compiled)}条")
+        return compiled
+    
+    def _load_dictionary(
+        self,
+        path: str,
+        name: str,
+        compiled_path: Optional[str] = None,
+        materialize: bool = False
+    ) -> Union[ReadingTable, CompiledDict]:
+        """
+        加载词典（读音为平假名），优先使用mmap编译词典，否则解析JSON
+        
+        Args:
+            path: JSON词典文件路径
+            name: 词典名称（用于日志）
+            compiled_path: 编译词典路径
+            materialize: 编译词典也展开为 ReadingTable（条目少、需要读音集合时使用）
+        
+        Returns:
+            词典数据（ReadingTable 或 CompiledDict）
+        """
+        compiled = self._open_compiled(path, compiled_path, name, normalized="hiragana")
+        if compiled is not None:
+            if not materialize:
+                return compiled
+            table = ReadingTable(compiled.items(), to_hiragana=False)
+            compiled.close()
+            return table
+        
+        self._fingerprints[name] = file_fingerprint(path)
+        return ReadingTable(self._load_json_dictionary(path, name).items())
+    
+    def _load_json_dictionary(self, path: str, name: str) -> Dict:
         """
         加载JSON词典文件
         
         Args:
             path: 词典文件路径
             name: 词典名称（用于日志）
-            
+        
         Returns:
             词典数据字典
         """
@@ -75,7 +205,15 @@ class DictionaryService:
             "明後日": ["あさって", "みょうごにち"],
         }
         
+        # 优先使用编译后的覆盖词典
+        self._compiled_overrides = self._open_compiled(
+            config.MODERN_OVERRIDES_PATH, config.COMPILED_OVERRIDES_PATH, "ModernOverrides"
+        )
+        if self._compiled_overrides is not None:
+            return
+        
         # 尝试加载外部覆盖文件
+        self._fingerprints["ModernOverrides"] = file_fingerprint(config.MODERN_OVERRIDES_PATH)
         try:
             with open(config.MODERN_OVERRIDES_PATH, 'r', encoding='utf-8') as f:
                 modern_ext = json.load(f)
@@ -89,14 +227,24 @@ class DictionaryService:
         except Exception as e:
             logger.warning(f"现代覆盖词典加载失败: {e}")
     
-    def get_jmdict_readings(self, surface: str) -> List[str]:
-        """获取JMdict中的读音"""
-        return self.jmdict_readings.get(surface, [])
+    def get_jmdict_readings(self, surface: str) -> Sequence[str]:
+        """获取JMdict中的读音（平假名，已去重）"""
+        if not self._loaded:
+            self.load()
+        return self.jmdict_readings.get(surface, EMPTY_READINGS)
     
-    def get_kanjidic2_readings(self, kanji: str) -> Optional[Dict]:
-        """获取Kanjidic2中单字的读音"""
+    def get_kanjidic2_readings(self, kanji: str) -> Sequence[str]:
+        """获取Kanjidic2中单字的读音（平假名，已去重）"""
+        if not self._loaded:
+            self.load()
         return self.kanjidic2_readings.get(kanji)
     
+    def get_kanjidic2_reading_set(self, kanji: str) -> FrozenSet[str]:
+        """获取Kanjidic2中单字的读音集合（首次查询时构造并缓存，读音相同的汉字共享同一集合）"""
+        if not self._loaded:
+            self.load()
+        return self.kanjidic2_readings.reading_set(kanji)
+    
     def get_kanji_readings(self, kanji: str) -> List[str]:
         """
         获取单字的多音读音
@@ -106,7 +254,40 @@ class DictionaryService:
     
     def get_phrase_override(self, surface: str) -> Optional[List[str]]:
         """获取短语的优先读音"""
+        if not self._loaded:
+            self.load()
+        if self._compiled_overrides is not None:
+            compiled = self._compiled_overrides.get(surface)
+            if compiled:
+                return compiled
         return self.phrase_override_readings.get(surface)
+    
+    def iter_surfaces(self) -> Iterator[str]:
+        """遍历所有词典收录的词表面（可能重复，供离线索引构建使用）"""
+        if not self._loaded:
+            self.load()
+        yield from self.jmdict_readings.keys()
+        yield from self.kanjidic2_readings.keys()
+        yield from self.phrase_override_readings.keys()
+        if self._compiled_overrides is not None:
+            yield from self._compiled_overrides.keys()
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        已加载词典的内存占用（mmap编译词典不占Python堆，只报告条目数）
+        
+        Returns:
+            {词典名: {"entries", "backend", 以及 ReadingTable 的共享统计和 "bytes"}}
+        """
+        if not self._loaded:
+            self.load()
+        report: Dict[str, Any] = {}
+        for name, table in (("JMdict", self.jmdict_readings), ("Kanjidic2", self.kanjidic2_readings)):
+            if isinstance(table, ReadingTable):
+                report[name] = {"backend": "table", **table.stats(), "bytes": table.footprint()}
+            else:
+                report[name] = {"backend": "mmap", "entries": len(table)}
+        return report
 
 
 # 全局词典服务实例
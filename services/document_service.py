@@ -0,0 +1,158 @@
+"""
+文档服务模块
+为可缓存的GET接口（/api/furigana/doc/<版本>/<文本哈希>）按内容寻址保存请求文本
+
+URL只由 (内容版本, 文本SHA-256, 选项) 决定，同一URL的响应永远不变，
+因此可以返回强ETag和长期 Cache-Control，由浏览器缓存或CDN直接命中。
+文本哈希无法反推文本：POST /api/furigana 时记下文本，之后的GET按哈希取回；
+文本写入同一主机各工作进程共享的SQLite持久缓存（与持久行缓存同一个库），
+GET落到其他工作进程也能取回，进程内LRU只作前端缓存。
+取不到（未记录、已淘汰、持久缓存不可用时的其他工作进程）时返回404，客户端改用POST。
+"""
+import hashlib
+import re
+from typing import Any, Dict, Optional
+
+from config import config
+from utils.lru_cache import LRUCache
+from utils.persistent_cache import PersistentCache
+from services.annotation_service import annotation_service
+from services import metrics_service
+
+
+# 响应头：当前内容版本（客户端据此拼接GET的URL）
+VERSION_HEADER = 'X-Furigana-Version'
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# 持久缓存中文本条目的键前缀（与行结果条目区分）
+_PERSISTENT_PREFIX = "doc\0"
+
+
+def text_hash(text: str) -> str:
+    """
+    计算文本哈希（UTF-8字节的SHA-256，与前端 crypto.subtle 计算结果一致）
+    
+    Args:
+        text: 完整请求文本
+    
+    Returns:
+        64位十六进制哈希
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def is_valid_hash(value: str) -> bool:
+    """是否为合法的文本哈希"""
+    return bool(_HASH_PATTERN.match(value))
+
+
+def content_version() -> str:
+    """
+    内容版本：即注音流水线版本（词典、特殊词规则、Sudachi系统词典和流水线代码），
+    任一变化都会改变GET的URL和ETag
+    
+    按需加载词典和规则，懒加载模式下首个请求与之后的请求得到同一版本。
+    
+    Returns:
+        版本字符串（十六进制短哈希）
+    """
+    return annotation_service.pipeline_version()
+
+
+def document_etag(version: str, digest: str, katakana: bool, compact: bool) -> str:
+    """
+    生成GET响应的强ETag（不含引号）
+    
+    Args:
+        version: 内容版本
+        digest: 文本哈希
+        katakana: 是否为片假名单词注音
+        compact: 是否为紧凑格式
+    """
+    return f"{version}-{digest[:32]}-{'k' if katakana else 'n'}-{'c' if compact else 'j'}"
+
+
+class DocumentStore:
+    """按文本哈希保存请求文本（跨进程共享的持久缓存 + 进程内LRU前端缓存）"""
+    
+    def __init__(self, persistent: Optional[PersistentCache] = None):
+        """
+        Args:
+            persistent: 共享的持久缓存，为None时使用注音服务的持久行缓存（未配置时只用进程内缓存）
+        """
+        self._texts = LRUCache(
+            max_entries=config.DOCUMENT_STORE_SIZE,
+            max_bytes=config.DOCUMENT_STORE_MAX_BYTES,
+            sizeof=lambda text: len(text) * 4
+        )
+        self._persistent = persistent
+    
+    def _shared(self) -> Optional[PersistentCache]:
+        """当前可用的持久缓存"""
+        if self._persistent is not None:
+            return self._persistent if self._persistent.enabled else None
+        return annotation_service.persistent_cache
+    
+    @property
+    def enabled(self) -> bool:
+        """是否启用（DOCUMENT_STORE_SIZE 为0时禁用可缓存GET）"""
+        return self._texts.enabled
+    
+    def remember(self, text: str) -> str:
+        """
+        记录一段请求文本
+        
+        Args:
+            text: 完整请求文本
+        
+        Returns:
+            文本哈希
+        """
+        digest = text_hash(text)
+        if not self.enabled:
+            return digest
+        # 本进程已记录过的文本已写入持久缓存，不再重复写入
+        if digest not in self._texts:
+            shared = self._shared()
+            if shared is not None:
+                shared.put(_PERSISTENT_PREFIX + digest, text.encode('utf-8'))
+        self._texts.put(digest, text)
+        return digest
+    
+    def lookup(self, digest: str) -> Optional[str]:
+        """
+        按哈希取回文本
+        
+        Args:
+            digest: 文本哈希
+        
+        Returns:
+            文本；未记录或已淘汰时返回None
+        """
+        text = self._texts.get(digest)
+        if text is not None or not self.enabled:
+            return text
+        
+        # 由其他工作进程记录的文本
+        shared = self._shared()
+        if shared is None:
+            return None
+        value = shared.get(_PERSISTENT_PREFIX + digest)
+        if value is None:
+            return None
+        text = value.decode('utf-8')
+        if text_hash(text) != digest:
+            return None
+        self._texts.put(digest, text)
+        return text
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回文本缓存的命中统计"""
+        return self._texts.stats()
+
+
+# 创建全局单例
+document_store = DocumentStore()
+
+metrics_service.register_cache("document", document_store.cache_stats)
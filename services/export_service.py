@@ -0,0 +1,332 @@
+"""
+导出服务模块
+把注音结果直接排版为SVG图片（/api/export），替代前端 html2canvas 截图
+
+版式与前端导出图片一致：标题、每行居中、读音位于汉字上方、送假名不注音
+（拆分规则同 js/utils/ruby-generator.js 的 generateAdvancedRuby）。
+服务端没有字体度量，按字符宽度估算（全角1em、半角0.5em）。
+画布宽度固定(EXPORT_SVG_WIDTH)，高度只由行数决定，因此注音前即可输出SVG头部，
+之后每注音一行输出一行；超出画布宽度的行单独按比例缩小。
+
+完整的SVG按 (内容版本, 文本哈希, 选项) 缓存，同一内容再次导出时直接返回。
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from html import escape
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import config
+from utils.kana_converter import is_hiragana, is_katakana
+from utils.lru_cache import LRUCache
+from services.document_service import content_version, text_hash
+from services import metrics_service
+
+
+SVG_MIMETYPE = 'image/svg+xml'
+
+# 版式（单位px，与 js/services/exporter.js 的导出样式对应）
+_PADDING = 48               # 画布内边距
+_TITLE_SIZE = 24            # 标题字号
+_TITLE_HEIGHT = 93          # 标题区（含下边距和分隔线）
+_TITLE_GAP = 32             # 分隔线到歌词区的距离
+_BOX_PADDING = 32           # 歌词区内边距
+_FONT_SIZE = 25.6           # 歌词字号（1.6em）
+_ROW_HEIGHT = 3.2           # 行高（em）
+_ROW_GAP = 0.5              # 行间距（em）
+_WORD_MARGIN = 0.3          # 单词左右外边距（em）
+_RUBY_SCALE = 0.7           # 读音字号（em）
+_BASELINE = 1.95            # 行顶到正文基线（em）
+_RUBY_RAISE = 1.05          # 正文基线到读音基线（em）
+_MIN_HEIGHT = 400
+
+_FONT_FAMILY = "'Noto Sans JP', 'Hiragino Sans', 'Yu Gothic', 'Inter', sans-serif"
+
+THEMES: Dict[str, Dict[str, str]] = {
+    "light": {
+        "background": (
+            '<linearGradient id="bg" x1="0" y1="0" x2="0" y2="1">'
+            '<stop offset="0" stop-color="#fefdfb"/><stop offset="0.15" stop-color="#f9f8fb"/>'
+            '<stop offset="0.35" stop-color="#f3f2f8"/><stop offset="0.55" stop-color="#ebe9f5"/>'
+            '<stop offset="0.75" stop-color="#e3e0f2"/><stop offset="1" stop-color="#d8d5ed"/>'
+            '</linearGradient>'
+        ),
+        "box": '#ffffff',
+        "box_stroke": 'rgba(24,32,56,0.12)',
+        "rule": 'rgba(24,32,56,0.12)',
+        "text": '#1d1d1f',
+        "ruby": '#ff6b6b',
+    },
+    "dark": {
+        "background": (
+            '<radialGradient id="bg" cx="0.2" cy="0.2" r="1">'
+            '<stop offset="0" stop-color="#111529"/><stop offset="0.55" stop-color="#0a0f22"/>'
+            '<stop offset="1" stop-color="#060916"/>'
+            '</radialGradient>'
+        ),
+        "box": 'rgba(18,23,46,0.97)',
+        "box_stroke": 'rgba(90,110,190,0.45)',
+        "rule": 'rgba(110,120,200,0.25)',
+        "text": '#e6e9ff',
+        "ruby": '#ff8a8a',
+    },
+}
+
+# XML 1.0 不允许的控制字符
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+@dataclass(frozen=True)
+class ExportOptions:
+    """导出选项（全部参与缓存键）"""
+    title: str = ""
+    theme: str = "light"
+    katakana: bool = True
+    # 用户修改的读音：(行号, token序号, 读音文本)，按行号和序号排序
+    readings: Tuple[Tuple[int, int, str], ...] = ()
+    
+    def reading_map(self) -> Dict[Tuple[int, int], str]:
+        """{(行号, token序号): 读音文本}"""
+        return {(line, token): text for line, token, text in self.readings}
+
+
+def split_ruby(surface: str, reading: str) -> Tuple[str, str, Optional[str]]:
+    """
+    拆分送假名（与 js/utils/ruby-generator.js 的 generateAdvancedRuby 一致）
+    
+    Args:
+        surface: 表面形式
+        reading: 平假名读音
+    
+    Returns:
+        (注音部分, 送假名, 读音)；不需要注音时读音为None
+    """
+    if surface == reading or not reading:
+        return surface, "", None
+    if is_katakana(surface):
+        return surface, "", reading
+    
+    common = 0
+    for i in range(1, min(len(surface), len(reading)) + 1):
+        char = surface[-i]
+        if char == reading[-i] and is_hiragana(char):
+            common += 1
+        else:
+            break
+    if common == 0:
+        return surface, "", reading
+    
+    base = surface[:-common]
+    reading_base = reading[:-common]
+    if not base or base == reading_base:
+        return surface, "", None
+    return base, surface[-common:], reading_base
+
+
+def text_width(text: str) -> float:
+    """
+    估算文本宽度（em）：全角和宽字符1em，其余0.5em
+    
+    Args:
+        text: 文本
+    
+    Returns:
+        宽度（以字号为单位）
+    """
+    return sum(1.0 if unicodedata.east_asian_width(c) in ('F', 'W', 'A') else 0.5 for c in text)
+
+
+def _xml(text: str) -> str:
+    return escape(_INVALID_XML.sub('', text), quote=True)
+
+
+def _num(value: float) -> str:
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+class SvgLayout:
+    """SVG版式（画布尺寸由行数决定，与行内容无关）"""
+    
+    def __init__(self, line_count: int, options: ExportOptions, width: int = 0):
+        """
+        Args:
+            line_count: 行数
+            options: 导出选项
+            width: 画布宽度，<=0 时使用 EXPORT_SVG_WIDTH
+        """
+        self.options = options
+        self.colors = THEMES.get(options.theme, THEMES["light"])
+        self.width = width if width > 0 else config.EXPORT_SVG_WIDTH
+        self.line_count = max(line_count, 1)
+        
+        self.box_top = _PADDING + _TITLE_HEIGHT + _TITLE_GAP
+        rows = self.line_count * _ROW_HEIGHT + (self.line_count - 1) * _ROW_GAP
+        self.box_height = rows * _FONT_SIZE + 2 * _BOX_PADDING
+        self.height = max(self.box_top + self.box_height + _PADDING, _MIN_HEIGHT)
+        # 行内容可用宽度
+        self.content_width = self.width - 2 * (_PADDING + _BOX_PADDING)
+    
+    def header(self) -> str:
+        """SVG开头：样式、背景、标题和歌词区"""
+        colors = self.colors
+        width, height = self.width, _num(self.height)
+        box_width = self.width - 2 * _PADDING
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n'
+            f'<defs>{colors["background"]}</defs>\n'
+            f'<style>text{{font-family:{_FONT_FAMILY};white-space:pre}}'
+            f'.t{{font-size:{_TITLE_SIZE}px;font-weight:600;fill:{colors["text"]}}}'
+            f'.b{{font-size:{_num(_FONT_SIZE)}px;fill:{colors["text"]}}}'
+            f'.r{{font-size:{_num(_FONT_SIZE * _RUBY_SCALE)}px;font-weight:500;fill:{colors["ruby"]}}}'
+            '</style>\n'
+            f'<rect width="{width}" height="{height}" fill="url(#bg)"/>\n'
+            f'<text class="t" x="{_num(width / 2)}" y="{_PADDING + _TITLE_SIZE - 4}" text-anchor="middle">'
+            f'{_xml(self.options.title)}</text>\n'
+            f'<line x1="{_PADDING}" y1="{_PADDING + _TITLE_HEIGHT}" x2="{width - _PADDING}" '
+            f'y2="{_PADDING + _TITLE_HEIGHT}" stroke="{colors["rule"]}"/>\n'
+            f'<rect x="{_PADDING}" y="{self.box_top}" width="{box_width}" height="{_num(self.box_height)}" '
+            f'rx="12" fill="{colors["box"]}" stroke="{colors["box_stroke"]}"/>\n'
+        )
+    
+    def line(self, index: int, tokens: List[Dict[str, Any]], readings: Dict[Tuple[int, int], str]) -> str:
+        """
+        一行的SVG（以行中心为原点的 <g>，超宽时缩小）
+        
+        Args:
+            index: 行号
+            tokens: 行token列表
+            readings: 用户修改的读音 {(行号, token序号): 读音文本}
+        
+        Returns:
+            SVG片段；空行返回空字符串
+        """
+        words = []
+        total = 0.0
+        for position, token in enumerate(tokens):
+            surface = token.get("surface") or ""
+            reading = token.get("reading") or ""
+            base, suffix, ruby = split_ruby(surface, "" if reading == "*" else reading)
+            if ruby is not None:
+                ruby = readings.get((index, position), ruby)
+            base_width = text_width(base)
+            ruby_width = text_width(ruby) * _RUBY_SCALE if ruby else 0.0
+            slot = max(base_width, ruby_width)
+            width = 2 * _WORD_MARGIN + slot + text_width(suffix)
+            words.append((base, suffix, ruby, slot))
+            total += width
+        if not words or not any(base.strip() or suffix.strip() for base, suffix, _, _ in words):
+            return ""
+        
+        parts = []
+        x = -total / 2 + _WORD_MARGIN
+        for base, suffix, ruby, slot in words:
+            center = x + slot / 2
+            if base.strip():
+                parts.append(f'<text class="b" x="{_num(center * _FONT_SIZE)}" text-anchor="middle">{_xml(base)}</text>')
+            if ruby:
+                parts.append(
+                    f'<text class="r" x="{_num(center * _FONT_SIZE)}" y="{_num(-_RUBY_RAISE * _FONT_SIZE)}" '
+                    f'text-anchor="middle">{_xml(ruby)}</text>'
+                )
+            x += slot
+            if suffix:
+                parts.append(f'<text class="b" x="{_num(x * _FONT_SIZE)}">{_xml(suffix)}</text>')
+                x += text_width(suffix)
+            x += 2 * _WORD_MARGIN
+        
+        top = self.box_top + _BOX_PADDING + index * (_ROW_HEIGHT + _ROW_GAP) * _FONT_SIZE
+        transform = f"translate({_num(self.width / 2)},{_num(top + _BASELINE * _FONT_SIZE)})"
+        line_width = total * _FONT_SIZE
+        if line_width > self.content_width:
+            transform += f" scale({self.content_width / line_width:.4f})"
+        return f'<g transform="{transform}">{"".join(parts)}</g>\n'
+    
+    @staticmethod
+    def footer() -> str:
+        return '</svg>\n'
+
+
+class ExportService:
+    """SVG导出服务（按内容缓存完整结果）"""
+    
+    def __init__(self):
+        self._cache = LRUCache(
+            max_entries=config.EXPORT_CACHE_SIZE,
+            max_bytes=config.EXPORT_CACHE_MAX_BYTES,
+            sizeof=len
+        )
+    
+    def cache_key(self, lyrics_text: str, options: ExportOptions) -> str:
+        """
+        缓存键：内容版本、文本哈希和选项的哈希
+        
+        Args:
+            lyrics_text: 完整文本
+            options: 导出选项
+        """
+        spec = json.dumps(
+            [content_version(), text_hash(lyrics_text), options.title, options.theme,
+             options.katakana, options.readings],
+            ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(spec.encode('utf-8')).hexdigest()
+    
+    def cached(self, key: str) -> Optional[bytes]:
+        """
+        取已缓存的SVG
+        
+        Returns:
+            SVG字节；未缓存时返回None
+        """
+        return self._cache.get(key)
+    
+    def remember(self, key: str, svg: bytes) -> None:
+        """缓存完整的SVG"""
+        self._cache.put(key, svg)
+    
+    def iter_svg(
+        self,
+        line_count: int,
+        annotated_lines: Iterable[List[Dict[str, Any]]],
+        options: ExportOptions,
+        key: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """
+        逐行输出SVG（每注音完一行输出一行），完整输出后按 key 缓存
+        
+        Args:
+            line_count: 行数
+            annotated_lines: 按行序的token列表（可以是逐行注音的迭代器）
+            options: 导出选项
+            key: 缓存键，为None时不缓存
+        
+        Yields:
+            UTF-8编码的SVG片段
+        """
+        layout = SvgLayout(line_count, options)
+        readings = options.reading_map()
+        chunks = [layout.header().encode('utf-8')]
+        yield chunks[0]
+        for index, tokens in enumerate(annotated_lines):
+            chunk = layout.line(index, tokens, readings).encode('utf-8')
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+        chunks.append(layout.footer().encode('utf-8'))
+        yield chunks[-1]
+        if key is not None:
+            self.remember(key, b"".join(chunks))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回SVG缓存的命中统计"""
+        return self._cache.stats()
+
+
+# 创建全局单例
+export_service = ExportService()
+
+metrics_service.register_cache("export", export_service.cache_stats)
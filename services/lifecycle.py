@@ -0,0 +1,63 @@
+"""
+服务生命周期模块
+统一管理服务的加载、冻结和fork后初始化
+
+在gunicorn --preload 下的调用顺序:
+    主进程  create_app() -> init_services() -> freeze_shared_state()
+    子进程  post_fork 钩子 -> post_fork_init()
+"""
+import gc
+import logging
+import os
+
+from config import config
+from services.dictionary_service import dictionary_service
+from services.reading_service import reading_service
+from services.rule_service import rule_service
+from services.tokenizer_service import tokenizer_service
+
+
+logger = logging.getLogger(__name__)
+
+_frozen = False
+
+
+def init_services() -> None:
+    """
+    加载只读共享数据（幂等）
+    
+    词典数据、特殊词规则、Sudachi系统词典和离线候选索引在此加载；若在gunicorn主进程中调用，
+    工作进程fork后通过写时复制共享这些页面。
+    """
+    dictionary_service.load()
+    rule_service.load()
+    tokenizer_service.load_dictionary()
+    tokenizer_service.log_memory_report()
+    reading_service.load_index()
+    logger.info(f"✓ 服务数据加载完成 (pid={os.getpid()})")
+
+
+def freeze_shared_state() -> None:
+    """
+    冻结当前所有对象，避免工作进程中的垃圾回收遍历共享对象而触发页面复制
+    """
+    global _frozen
+    if _frozen or not hasattr(gc, "freeze"):
+        return
+    gc.collect()
+    gc.freeze()
+    _frozen = True
+    logger.info(f"✓ 共享对象已冻结: {gc.get_freeze_count()}个")
+
+
+def post_fork_init() -> None:
+    """
+    fork后在工作进程内执行的初始化
+    
+    丢弃继承自主进程的非fork安全对象（Sudachi分词器），并预先创建本进程的分词器。
+    """
+    tokenizer_service.reset_after_fork()
+    if config.PRELOAD_SERVICES:
+        # 预热本进程分词器，避免首个请求承担创建开销
+        tokenizer_service.warm_up()
+    logger.info(f"✓ 工作进程初始化完成 (pid={os.getpid()})")
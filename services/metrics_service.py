@@ -0,0 +1,178 @@
+"""
+指标服务模块
+定义注音流水线的各项指标，并提供 /metrics 的Prometheus文本输出
+
+阶段耗时(furigana_stage_seconds):
+    tokenize / candidates / special / filter  按行统计（仅统计实际计算的行）
+    annotate / serialize                      按请求统计
+    export                                    SVG导出（流式排版的总耗时）
+"""
+from typing import Any, Dict, Iterable
+
+from config import config
+from utils.metrics import MetricsRegistry
+
+
+registry = MetricsRegistry(
+    enabled=config.METRICS_ENABLED,
+    directory=config.METRICS_DIR,
+    flush_interval=config.METRICS_FLUSH_INTERVAL
+)
+
+_SIZE_BUCKETS = (10, 50, 100, 500, 1000, 2500, 5000, 10000, 50000, 100000, 1000000)
+_LINE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+REQUEST_SECONDS = registry.histogram(
+    "furigana_request_seconds", "请求处理耗时（秒）", ("endpoint",)
+)
+REQUESTS_TOTAL = registry.counter(
+    "furigana_requests_total", "请求数", ("endpoint", "status")
+)
+STAGE_SECONDS = registry.histogram(
+    "furigana_stage_seconds", "注音流水线各阶段耗时（秒）", ("stage",)
+)
+REQUEST_CHARS = registry.histogram(
+    "furigana_request_chars", "请求文本字符数", ("endpoint",), _SIZE_BUCKETS
+)
+REQUEST_LINES = registry.histogram(
+    "furigana_request_lines", "请求文本行数", ("endpoint",), _LINE_BUCKETS
+)
+TOKENS_TOTAL = registry.counter(
+    "furigana_tokens_total", "实际计算的token数（tokens/sec = rate(furigana_tokens_total)）"
+)
+LINES_TOTAL = registry.counter(
+    "furigana_lines_computed_total", "实际计算（未命中缓存）的行数"
+)
+CACHE_HITS = registry.counter(
+    "furigana_cache_hits_total", "缓存命中次数", ("cache",)
+)
+CACHE_MISSES = registry.counter(
+    "furigana_cache_misses_total", "缓存未命中次数", ("cache",)
+)
+CACHE_EVICTIONS = registry.counter(
+    "furigana_cache_evictions_total", "缓存淘汰次数", ("cache",)
+)
+CACHE_ENTRIES = registry.gauge(
+    "furigana_cache_entries", "缓存条目数（各进程之和）", ("cache",)
+)
+CACHE_BYTES = registry.gauge(
+    "furigana_cache_bytes", "缓存估算字节数（各进程之和）", ("cache",)
+)
+TOKENIZER_POOL = registry.gauge(
+    "furigana_tokenizer_pool", "分词器池状态（各进程之和）: capacity/created/in_use", ("state",)
+)
+TOKENIZER_WAIT_SECONDS = registry.histogram(
+    "furigana_tokenizer_wait_seconds", "等待空闲分词器的耗时（秒，只统计需要等待的借出）"
+)
+
+
+def record_line(
+    tokens: int,
+    tokenize: float,
+    candidates: float,
+    special: float,
+    filtering: float
+) -> None:
+    """
+    记录一行的计算耗时（每行调用一次，行内各token只做本地累加）
+    
+    Args:
+        tokens: token数
+        tokenize: 分词耗时
+        candidates: 候选读音生成耗时
+        special: 特殊词处理耗时
+        filtering: 上下文过滤耗时
+    """
+    if not registry.enabled:
+        return
+    STAGE_SECONDS.observe(tokenize, "tokenize")
+    STAGE_SECONDS.observe(candidates, "candidates")
+    STAGE_SECONDS.observe(special, "special")
+    STAGE_SECONDS.observe(filtering, "filter")
+    TOKENS_TOTAL.inc(tokens)
+    LINES_TOTAL.inc()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """记录请求级阶段耗时（annotate / serialize）"""
+    if registry.enabled:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def record_request_size(endpoint: str, chars: int, lines: int) -> None:
+    """记录请求文本规模"""
+    if registry.enabled:
+        REQUEST_CHARS.observe(chars, endpoint)
+        REQUEST_LINES.observe(lines, endpoint)
+
+
+def record_request(endpoint: str, status: int, seconds: float) -> None:
+    """
+    记录一次请求的总耗时和状态，并按需写出多进程快照
+    
+    Args:
+        endpoint: 端点名称
+        status: HTTP状态码
+        seconds: 耗时
+    """
+    if not registry.enabled:
+        return
+    REQUEST_SECONDS.observe(seconds, endpoint)
+    REQUESTS_TOTAL.inc(1, endpoint, str(status))
+    registry.maybe_flush()
+
+
+def record_tokenizer_wait(seconds: float) -> None:
+    """记录一次等待空闲分词器的耗时"""
+    if registry.enabled:
+        TOKENIZER_WAIT_SECONDS.observe(seconds)
+
+
+def register_tokenizer_pool(stats_func) -> None:
+    """
+    注册分词器池的统计来源，抓取时同步为池状态仪表
+    
+    Args:
+        stats_func: 返回 {"capacity", "created", "in_use"} 的函数
+    """
+    def collect() -> None:
+        stats = stats_func()
+        for state in ("capacity", "created", "in_use"):
+            TOKENIZER_POOL.set(stats[state], state)
+    registry.register_collector(collect)
+
+
+def register_cache(name: str, stats_func) -> None:
+    """
+    注册一个缓存的统计来源，抓取时同步为命中/未命中/淘汰计数和容量仪表
+    
+    Args:
+        name: 缓存名称（标签值）
+        stats_func: 返回 LRUCache.stats() 格式字典的函数
+    """
+    def collect() -> None:
+        stats = stats_func()
+        CACHE_HITS.set_total(stats["hits"], name)
+        CACHE_MISSES.set_total(stats["misses"], name)
+        CACHE_EVICTIONS.set_total(stats["evictions"], name)
+        CACHE_ENTRIES.set(stats["entries"], name)
+        CACHE_BYTES.set(stats["bytes"], name)
+    registry.register_collector(collect)
+
+
+def _derived_metrics(data: Dict[str, Dict[Any, Any]]) -> Iterable[str]:
+    """由汇总结果计算缓存命中率"""
+    hits = data.get(CACHE_HITS.name, {})
+    misses = data.get(CACHE_MISSES.name, {})
+    yield "# HELP furigana_cache_hit_ratio 缓存命中率（各进程汇总）"
+    yield "# TYPE furigana_cache_hit_ratio gauge"
+    for labels in sorted(set(hits) | set(misses)):
+        h = hits.get(labels, 0.0)
+        total = h + misses.get(labels, 0.0)
+        ratio = h / total if total else 0.0
+        yield f'furigana_cache_hit_ratio{{cache="{labels[0]}"}} {ratio:.6f}'
+
+
+def render() -> str:
+    """生成 /metrics 响应内容"""
+    return registry.render(_derived_metrics)
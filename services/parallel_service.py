@@ -0,0 +1,208 @@
+"""
+并行注音服务模块
+将大段文本的行分片后交给进程池并行处理
+
+工作进程意外退出（OOM、段错误）后进程池永久失效，之后每次提交都会抛出
+BrokenProcessPool。提交或取结果时遇到该错误即丢弃旧进程池，下次提交重新创建。
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    """
+    工作进程初始化
+    在本进程内加载独立的Sudachi词典并创建分词器
+    """
+    from services.lifecycle import init_services
+    from services.tokenizer_service import tokenizer_service
+    init_services()
+    tokenizer_service.warm_up()
+    logger.info(f"✓ 并行注音工作进程就绪 (pid={os.getpid()})")
+
+
+def _annotate_chunk(lines: List[str], want_katakana_conversion: bool) -> List[List[Dict[str, Any]]]:
+    """在工作进程内为一组行生成注音"""
+    from services.annotation_service import annotation_service
+    from services.metrics_service import registry
+    results = [
+        annotation_service.annotate_line(line, want_katakana_conversion)
+        for line in lines
+    ]
+    # 工作进程没有请求入口，在此按节流写出指标快照
+    registry.maybe_flush()
+    return results
+
+
+class ParallelAnnotator:
+    """进程池并行注音器"""
+    
+    def __init__(
+        self,
+        workers: int = 0,
+        min_chars: int = 3000,
+        chunk_chars: int = 1000
+    ):
+        """
+        Args:
+            workers: 工作进程数，<=1 表示禁用并行
+            min_chars: 待计算文本总长度达到该值才启用并行
+            chunk_chars: 每个分片的目标字符数
+        """
+        self.workers = workers
+        self.min_chars = min_chars
+        self.chunk_chars = max(1, chunk_chars)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._owner_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # 分片Future -> 提交到的进程池（取结果失败时据此丢弃对应的进程池）
+        self._owners: "weakref.WeakKeyDictionary[Future, ProcessPoolExecutor]" = weakref.WeakKeyDictionary()
+    
+    @property
+    def enabled(self) -> bool:
+        """是否启用并行"""
+        return self.workers > 1
+    
+    def should_parallelize(self, lines: List[str]) -> bool:
+        """
+        判断这批待计算的行是否值得并行（小请求不承担进程间通信开销）
+        
+        Args:
+            lines: 待计算的行
+        
+        Returns:
+            True如果应当并行处理
+        """
+        if not self.enabled or len(lines) < 2:
+            return False
+        return sum(len(line) for line in lines) >= self.min_chars
+    
+    def split_chunks(self, lines: List[str]) -> List[List[str]]:
+        """
+        按字符数将行切分为分片，保持原有顺序
+        
+        Args:
+            lines: 待计算的行
+        
+        Returns:
+            分片列表
+        """
+        # 分片数至少与工作进程数相当，避免单个分片拖慢整体
+        total = sum(len(line) for line in lines)
+        target = min(self.chunk_chars, max(1, total // self.workers))
+        
+        chunks = []
+        current = []
+        current_size = 0
+        for line in lines:
+            current.append(line)
+            current_size += len(line)
+            if current_size >= target:
+                chunks.append(current)
+                current = []
+                current_size = 0
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def submit(self, lines: List[str], want_katakana_conversion: bool) -> Future:
+        """
+        提交一个分片
+        
+        Args:
+            lines: 分片内的行
+            want_katakana_conversion: 是否为片假名单词注音
+        
+        Returns:
+            结果为行token列表的Future
+        
+        Raises:
+            BrokenProcessPool: 新建的进程池同样不可用
+        """
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_annotate_chunk, lines, want_katakana_conversion)
+        except BrokenProcessPool as e:
+            # 之前的工作进程已退出：换一个新进程池重试一次
+            self._discard(executor, e)
+            executor = self._get_executor()
+            future = executor.submit(_annotate_chunk, lines, want_katakana_conversion)
+        with self._lock:
+            self._owners[future] = executor
+        return future
+    
+    def result(self, future: Future) -> List[List[Dict[str, Any]]]:
+        """
+        等待分片结果，进程池已失效时将其丢弃
+        
+        Args:
+            future: submit() 返回的Future
+        
+        Returns:
+            行token列表
+        
+        Raises:
+            BrokenProcessPool: 分片执行期间工作进程退出
+        """
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            with self._lock:
+                executor = self._owners.get(future)
+            if executor is not None:
+                self._discard(executor, e)
+            raise
+    
+    def _discard(self, executor: ProcessPoolExecutor, error: Exception) -> None:
+        """丢弃已失效的进程池（若已被其他线程替换则不处理）"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._owner_pid = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"⚠ 并行注音进程池已失效（工作进程意外退出），下次提交时重新创建: {error}")
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """按需创建进程池（fork后的子进程会重新创建自己的进程池）"""
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._owner_pid != pid:
+                # spawn方式启动，避免fork继承分词器和锁状态
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+                self._owner_pid = pid
+                logger.info(f"✓ 并行注音进程池已创建 (workers={self.workers})")
+            return self._executor
+    
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None and self._owner_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._owner_pid = None
+
+
+# 全局并行注音器实例
+parallel_annotator = ParallelAnnotator(
+    workers=config.PARALLEL_WORKERS,
+    min_chars=config.PARALLEL_MIN_CHARS,
+    chunk_chars=config.PARALLEL_CHUNK_CHARS
+)
+atexit.register(parallel_annotator.shutdown)
@@ -0,0 +1,327 @@
+"""
+请求剖析服务模块
+按请求记录注音流水线的分阶段、分行、分token耗时，并捕获慢请求
+
+剖析数据挂在当前请求的上下文变量上，流水线各处只需一次查找；未开启剖析时
+所有记录函数立即返回。两种粒度:
+    逐行    每个实际计算的行: 各阶段耗时、token数、触发三模式重新分词的词、命中的特殊词规则
+    逐token 在逐行基础上记录每个汉字token的各阶段耗时（X-Furigana-Profile 请求头或
+            PROFILE_ALL_REQUESTS 开启）
+
+超过 SLOW_REQUEST_MS 的请求连同输入哈希和剖析明细写入轮转的慢请求日志，
+可用 python -m tools.replay_slow_requests 离线重放。
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import config
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Furigana-Profile"
+
+# 慢请求日志中保留的最慢行数
+MAX_LOGGED_LINES = 50
+
+_current: contextvars.ContextVar[Optional['RequestProfile']] = contextvars.ContextVar(
+    "furigana_profile", default=None
+)
+
+
+class RequestProfile:
+    """单个请求的剖析记录"""
+    
+    def __init__(self, text: str, detailed: bool = False, requested: bool = False):
+        """
+        Args:
+            text: 请求文本
+            detailed: 是否记录逐token明细
+            requested: 是否由请求头显式要求（显式要求的剖析无论快慢都写入日志）
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.text = text
+        self.detailed = detailed
+        self.requested = requested
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.stages: Dict[str, float] = {}
+        self.lines: List[Dict[str, Any]] = []
+        self.lines_cached = 0
+        self.lines_parallel = 0
+        self._notes: Dict[str, List[str]] = {}
+    
+    @property
+    def input_hash(self) -> str:
+        """请求文本的SHA-256"""
+        return hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+    
+    def note(self, kind: str, value: str) -> None:
+        """记录当前行内发生的事件（如重新分词、规则命中），在行结束时归入该行"""
+        values = self._notes.setdefault(kind, [])
+        if value not in values:
+            values.append(value)
+    
+    def add_stage(self, stage: str, seconds: float) -> None:
+        """累加请求级阶段耗时"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    def record_line(
+        self,
+        line: str,
+        tokens: int,
+        elapsed: float,
+        stages: Dict[str, float],
+        token_details: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        记录一个实际计算的行
+        
+        Args:
+            line: 行文本
+            tokens: token数
+            elapsed: 整行耗时（秒）
+            stages: 行内各阶段耗时（秒）
+            token_details: 逐token明细（仅detailed模式）
+        """
+        for stage, seconds in stages.items():
+            self.add_stage(stage, seconds)
+        
+        entry = {
+            "line": line,
+            "ms": _ms(elapsed),
+            "tokens": tokens,
+            "stages_ms": {stage: _ms(seconds) for stage, seconds in stages.items()},
+        }
+        entry.update(self._notes)
+        if token_details is not None:
+            entry["token_details"] = token_details
+        self._notes = {}
+        self.lines.append(entry)
+    
+    def line_cached(self) -> None:
+        """记录一次行缓存命中"""
+        self.lines_cached += 1
+    
+    def lines_from_pool(self, count: int) -> None:
+        """记录由并行进程池计算的行数（这些行没有行内明细）"""
+        self.lines_parallel += count
+    
+    def finish(self) -> None:
+        """结束计时"""
+        self.total = time.perf_counter() - self.started
+    
+    def counts(self) -> Dict[str, int]:
+        """汇总计数"""
+        retokenized = set()
+        rules = 0
+        tokens = 0
+        for entry in self.lines:
+            retokenized.update(entry.get("retokenize", ()))
+            rules += len(entry.get("rule", ()))
+            tokens += entry["tokens"]
+        return {
+            "lines_computed": len(self.lines),
+            "lines_cached": self.lines_cached,
+            "lines_parallel": self.lines_parallel,
+            "tokens": tokens,
+            "retokenized": len(retokenized),
+            "rule_hits": rules,
+        }
+    
+    def summary_header(self) -> str:
+        """
+        响应头中的剖析摘要
+        
+        Returns:
+            如 "id=...; total=12.3ms; tokenize=1.2ms; ...; lines_computed=3; retokenized=1"
+        """
+        parts = [f"id={self.id}", f"total={_ms(self.total)}ms"]
+        parts += [f"{stage}={_ms(seconds)}ms" for stage, seconds in self.stages.items()]
+        parts += [f"{k}={v}" for k, v in self.counts().items()]
+        return "; ".join(parts)
+    
+    def server_timing(self) -> str:
+        """Server-Timing 响应头（浏览器开发者工具可直接展示各阶段耗时）"""
+        entries = [f"{stage};dur={_ms(seconds)}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={_ms(self.total)}")
+        return ", ".join(entries)
+    
+    def to_record(self, reason: str) -> Dict[str, Any]:
+        """
+        生成日志记录
+        
+        Args:
+            reason: 记录原因（"slow" 或 "requested"）
+        
+        Returns:
+            可JSON序列化的字典，行明细按耗时降序保留 MAX_LOGGED_LINES 行；
+            未开启 SLOW_REQUEST_LOG_INPUT 时不含原文（行文本换成哈希，事件只记次数，不含逐token明细）
+        """
+        record = {
+            "id": self.id,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+            "reason": reason,
+            "input_sha256": self.input_hash,
+            "chars": len(self.text),
+            "total_ms": _ms(self.total),
+            "stages_ms": {stage: _ms(seconds) for stage, seconds in self.stages.items()},
+            "counts": self.counts(),
+            "lines": sorted(self.lines, key=lambda e: e["ms"], reverse=True)[:MAX_LOGGED_LINES],
+        }
+        if config.SLOW_REQUEST_LOG_INPUT:
+            record["input"] = self.text
+        else:
+            record["lines"] = [_redact_line(entry) for entry in record["lines"]]
+        return record
+
+
+def _redact_line(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉行明细中的原文：行文本换成SHA-256和字符数，事件中的词换成次数"""
+    redacted = {
+        "line_sha256": hashlib.sha256(entry["line"].encode('utf-8')).hexdigest(),
+        "chars": len(entry["line"]),
+    }
+    for key, value in entry.items():
+        if key in ("line", "token_details"):
+            continue
+        redacted[key] = len(value) if isinstance(value, list) else value
+    return redacted
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def current() -> Optional[RequestProfile]:
+    """当前请求的剖析记录，未开启剖析时为None"""
+    return _current.get()
+
+
+def note(kind: str, value: str) -> None:
+    """
+    在当前剖析记录中登记事件（未开启剖析时不做任何事）
+    
+    Args:
+        kind: 事件类型，如 "retokenize"、"rule"
+        value: 事件内容，如词表面或 "special:明"
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.note(kind, value)
+
+
+@contextmanager
+def activate(profile: Optional[RequestProfile]) -> Iterator[Optional[RequestProfile]]:
+    """在代码块内将 profile 设为当前剖析记录"""
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # 流式响应的生成器可能在其他上下文中被关闭
+            _current.set(None)
+
+
+def start_profile(text: str, header_value: Optional[str]) -> Optional[RequestProfile]:
+    """
+    根据请求头和配置决定是否剖析本次请求
+    
+    Args:
+        text: 请求文本
+        header_value: X-Furigana-Profile 请求头的值
+    
+    Returns:
+        剖析记录；既未要求剖析又未开启慢请求捕获时为None
+    """
+    requested = (
+        config.PROFILE_HEADER_ENABLED
+        and header_value is not None
+        and header_value.strip().lower() in ("1", "true", "yes", "on")
+    )
+    if requested or config.PROFILE_ALL_REQUESTS:
+        return RequestProfile(text, detailed=True, requested=requested)
+    if config.SLOW_REQUEST_MS > 0:
+        return RequestProfile(text)
+    return None
+
+
+class SlowRequestLog:
+    """慢请求日志（每行一条JSON，按大小轮转），首次写入时才创建文件"""
+    
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        """
+        Args:
+            path: 日志文件路径
+            max_bytes: 单个文件上限
+            backup_count: 保留的轮转文件数
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+    
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    handler = RotatingFileHandler(
+                        self.path,
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                        encoding='utf-8'
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    slow_logger = logging.getLogger("furigana.slow_requests")
+                    slow_logger.setLevel(logging.INFO)
+                    slow_logger.propagate = False
+                    slow_logger.addHandler(handler)
+                    self._logger = slow_logger
+        return self._logger
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        """追加一条记录"""
+        try:
+            self._get_logger().info(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠ 慢请求日志写入失败: {e}")
+
+
+slow_request_log = SlowRequestLog(
+    config.SLOW_REQUEST_LOG_PATH,
+    config.SLOW_REQUEST_LOG_MAX_BYTES,
+    config.SLOW_REQUEST_LOG_BACKUPS
+)
+
+
+def finish_profile(profile: RequestProfile) -> None:
+    """
+    结束剖析：超过慢请求阈值或显式要求剖析时写入慢请求日志
+    
+    Args:
+        profile: 剖析记录
+    """
+    profile.finish()
+    slow = config.SLOW_REQUEST_MS > 0 and profile.total * 1000 >= config.SLOW_REQUEST_MS
+    if slow:
+        logger.warning(
+            f"⚠ 慢请求: {_ms(profile.total)}ms (id={profile.id}, "
+            f"sha256={profile.input_hash[:12]}, {len(profile.text)}字符)"
+        )
+    if slow or profile.requested:
+        slow_request_log.write(profile.to_record("slow" if slow else "requested"))
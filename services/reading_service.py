@@ -2,28 +2,114 @@
 读音处理服务模块
 处理日语文本的读音生成、多音字处理等核心业务逻辑
 """
+import hashlib
+import json
 import logging
-from typing import List, Dict, Optional, Tuple, Set
+import os
+import threading
+from typing import List, Dict, FrozenSet, Iterable, Optional, Sequence, Tuple, Set
 from sudachipy import tokenizer
 
+from config import config
 from utils.kana_converter import katakana_to_hiragana, is_hiragana_text
 from utils.text_processor import (
-    contains_kanji, extract_trailing_hiragana, 
+    contains_kanji, contains_rare_kanji, extract_trailing_hiragana, 
     collect_next_hiragana, voicing_variants
 )
+from utils.lru_cache import LRUCache
+from utils.compiled_dict import CompiledDict, CompiledDictError
 from services.dictionary_service import dictionary_service
 from services.tokenizer_service import tokenizer_service
+from services.rule_service import rule_service
+from services import profiling_service
 
 
 logger = logging.getLogger(__name__)
 
 
+# 内置常见多音字字典
+COMMON_MULTIREADINGS: Dict[str, List[str]] = {
+    "生": ["せい", "なま", "き", "う"],
+    "上": ["うえ", "じょう", "あ", "のぼ"],
+    "下": ["した", "げ", "か", "お", "さ", "くだ"],
+    "中": ["なか", "ちゅう", "じゅう"],
+    "大": ["おお", "だい", "たい"],
+    "小": ["ちい", "こ", "しょう"],
+    "人": ["ひと", "じん", "にん"],
+    "日": ["ひ", "にち", "か"],
+    "月": ["つき", "げつ", "がつ"],
+    "年": ["とし", "ねん"],
+    "時": ["とき", "じ"],
+    "分": ["ぶん", "ふん", "わ"],
+    "間": ["あいだ", "かん", "ま"],
+    "手": ["て", "しゅ"],
+    "口": ["くち", "こう", "ぐち"],
+    "目": ["め", "ま", "もく", "ぼく"],
+    "心": ["こころ", "しん"],
+    "気": ["き", "け"],
+    "僕": ["ぼく", "しもべ", "やつがれ"],
+    "皆": ["みんな", "みな"],
+    # ... 更多多音字
+}
+
+# 高频汉字的有效读音白名单（按优先级）
+READING_WHITELIST: Dict[str, List[str]] = {
+    "東": ["とう", "ひがし", "あずま"],
+    "西": ["せい", "さい", "にし"],
+    "南": ["なん", "みなみ"],
+    "北": ["ほく", "きた"],
+    "行": ["こう", "ぎょう", "い", "ゆ"],
+    "僕": ["ぼく", "しもべ", "やつがれ"],
+    "皆": ["みんな", "みな", "みんなさん"],
+    "何": ["なに", "なん"],
+    # ... 更多白名单
+}
+
+# 白名单的读音集合（裁剪时直接做成员判断）
+_WHITELIST_SETS: Dict[str, FrozenSet[str]] = {
+    surface: frozenset(readings) for surface, readings in READING_WHITELIST.items()
+}
+
+
+def rules_fingerprint() -> str:
+    """
+    内置多音字表与白名单的指纹
+    规则调整后离线候选索引随之失效
+    
+    Returns:
+        指纹字符串（短哈希）
+    """
+    payload = json.dumps(
+        [COMMON_MULTIREADINGS, READING_WHITELIST],
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
 class ReadingService:
     """读音处理服务类"""
     
     def __init__(self):
         self.dict_service = dictionary_service
         self.tokenizer = tokenizer_service
+        self.rules = rule_service
+        # 候选读音缓存: (surface, 首选读音, 上下文修正读音, 词典版本) -> 候选元组
+        self._candidate_cache = LRUCache(
+            max_entries=config.CANDIDATE_CACHE_SIZE,
+            max_bytes=config.CANDIDATE_CACHE_MAX_BYTES
+        )
+        # 上下文无关候选缓存: (surface, 词典版本) -> (候选池, 外部词典读音, 允许读音)
+        # 候选读音缓存的键含首选读音和各粒度读音，同一词在新的上下文中仍会未命中，
+        # 此时不必再单独分词
+        self._surface_cache = LRUCache(
+            max_entries=config.SURFACE_CACHE_SIZE,
+            max_bytes=config.SURFACE_CACHE_MAX_BYTES
+        )
+        # 离线候选读音索引（python -m tools.build_reading_index 生成），首次使用时加载
+        self._index: Optional[CompiledDict] = None
+        self._index_checked = False
+        self._index_lock = threading.Lock()
     
     def get_common_multireadings(self, surface: str) -> List[str]:
         """
@@ -31,38 +117,13 @@ class ReadingService:
         
         Args:
             surface: 词表面形式
-            
+        
         Returns:
             读音列表
         """
-        # 内置常见多音字字典
-        multireadings_dict = {
-            "生": ["せい", "なま", "き", "う"],
-            "上": ["うえ", "じょう", "あ", "のぼ"],
-            "下": ["した", "げ", "か", "お", "さ", "くだ"],
-            "中": ["なか", "ちゅう", "じゅう"],
-            "大": ["おお", "だい", "たい"],
-            "小": ["ちい", "こ", "しょう"],
-            "人": ["ひと", "じん", "にん"],
-            "日": ["ひ", "にち", "か"],
-            "月": ["つき", "げつ", "がつ"],
-            "年": ["とし", "ねん"],
-            "時": ["とき", "じ"],
-            "分": ["ぶん", "ふん", "わ"],
-            "間": ["あいだ", "かん", "ま"],
-            "手": ["て", "しゅ"],
-            "口": ["くち", "こう", "ぐち"],
-            "目": ["め", "ま", "もく", "ぼく"],
-            "心": ["こころ", "しん"],
-            "気": ["き", "け"],
-            "僕": ["ぼく", "しもべ", "やつがれ"],
-            "皆": ["みんな", "みな"],
-            # ... 更多多音字
-        }
-        
         # 优先使用外部词典
         external = self.dict_service.get_kanji_readings(surface)
-        base = multireadings_dict.get(surface, [])
+        base = COMMON_MULTIREADINGS.get(surface, [])
         
         if external:
             seen = set()
@@ -80,22 +141,11 @@ class ReadingService:
         
         Args:
             surface: 词表面形式
-            
+        
         Returns:
             读音白名单列表
         """
-        whitelist = {
-            "東": ["とう", "ひがし", "あずま"],
-            "西": ["せい", "さい", "にし"],
-            "南": ["なん", "みなみ"],
-            "北": ["ほく", "きた"],
-            "行": ["こう", "ぎょう", "い", "ゆ"],
-            "僕": ["ぼく", "しもべ", "やつがれ"],
-            "皆": ["みんな", "みな", "みんなさん"],
-            "何": ["なに", "なん"],
-            # ... 更多白名单
-        }
-        return whitelist.get(surface, [])
+        return READING_WHITELIST.get(surface, [])
     
     def filter_alternative_readings(
         self, 
@@ -108,7 +158,7 @@ class ReadingService:
         Args:
             surface: 词表面形式
             readings: 原始读音列表
-            
+        
         Returns:
             过滤后的读音列表
         """
@@ -118,12 +168,13 @@ class ReadingService:
         seen = set()
         filtered = []
         allow_short = set(self.get_common_multireadings(surface))
+        has_kanji = contains_kanji(surface)
         
         for r in readings:
             if not r:
                 continue
             # 过滤明显无效的单假名候选
-            if (contains_kanji(surface) and is_hiragana_text(r) and 
+            if (has_kanji and is_hiragana_text(r) and 
                 len(r) <= 1 and r not in allow_short):
                 continue
             if r not in seen:
@@ -143,40 +194,44 @@ class ReadingService:
         Args:
             surface: 词表面形式
             candidates: 现有候选列表
-            
+        
         Returns:
             合并后的候选列表
         """
         merged = list(candidates) if candidates else []
         seen = set(merged)
+        for hira in self.external_dictionary_readings(surface):
+            if hira not in seen:
+                seen.add(hira)
+                merged.append(hira)
+        return merged
+    
+    def external_dictionary_readings(self, surface: str) -> List[str]:
+        """
+        外部词典读音（JMdict，单个汉字另加Kanjidic2），平假名并去重
         
-        # JMdict读音
-        jm = self.dict_service.get_jmdict_readings(surface)
-        if jm:
-            for r in jm:
-                hira = katakana_to_hiragana(r)
-                if hira and hira not in seen:
-                    seen.add(hira)
-                    merged.append(hira)
+        词典读音在加载时已转为平假名并去重，这里只做合并。
+        
+        Args:
+            surface: 词表面形式
+        
+        Returns:
+            读音列表（JMdict在前）
+        """
+        readings = list(self.dict_service.get_jmdict_readings(surface))
         
         # Kanjidic2读音（仅单字）
         if len(surface) == 1 and contains_kanji(surface):
-            kj_data = self.dict_service.get_kanjidic2_readings(surface)
-            if kj_data:
-                kj_list = kj_data if isinstance(kj_data, list) else []
-                for r in kj_list:
-                    hira = katakana_to_hiragana(r)
-                    if hira and hira not in seen:
-                        seen.add(hira)
-                        merged.append(hira)
+            readings.extend(self.dict_service.get_kanjidic2_readings(surface))
         
-        return merged
+        return list(dict.fromkeys(readings))
     
     def restrict_to_kanjidic_allowlist(
         self,
         surface: str,
         candidates: List[str],
-        preferred: str
+        preferred: str,
+        allowlist: Optional[Iterable[str]] = None
     ) -> List[str]:
         """
         对单个汉字使用Kanjidic2和白名单进行候选裁剪
@@ -185,7 +240,8 @@ class ReadingService:
             surface: 词表面形式
             candidates: 候选读音列表
             preferred: 首选读音
-            
+            allowlist: 预先计算的允许读音（来自离线索引），为None时现场计算
+        
         Returns:
             裁剪后的候选列表
         """
@@ -194,34 +250,56 @@ class ReadingService:
         if not (len(surface) == 1 and contains_kanji(surface)):
             return candidates
         
-        allow = set()
+        if allowlist is None:
+            allow = self._allowed_reading_set(surface)
+        elif isinstance(allowlist, (set, frozenset)):
+            allow = allowlist
+        else:
+            allow = frozenset(allowlist)
         
-        # 从Kanjidic2获取允许的读音
-        kj_data = self.dict_service.get_kanjidic2_readings(surface)
-        if kj_data:
-            kj_list = kj_data if isinstance(kj_data, list) else []
-            allow.update(katakana_to_hiragana(r) for r in kj_list if r)
+        if not allow and not preferred:
+            return candidates
         
-        # 添加白名单
-        wl = self.get_reading_whitelist(surface) or []
-        allow.update(wl)
+        # 按原顺序过滤（保留首选读音）
+        filtered = [r for r in candidates if r in allow or r == preferred]
+        return filtered or candidates
+    
+    def get_kanjidic_allowlist(self, surface: str) -> List[str]:
+        """
+        获取单个汉字的允许读音（Kanjidic2读音 + 白名单），不含首选读音
         
-        # 保留首选读音
-        if preferred:
-            allow.add(preferred)
+        Args:
+            surface: 词表面形式
         
-        if not allow:
-            return candidates
+        Returns:
+            允许读音列表（排序后），非单个汉字返回空列表
+        """
+        if not (len(surface) == 1 and contains_kanji(surface)):
+            return []
+        return sorted(self._allowed_reading_set(surface))
+    
+    def _allowed_reading_set(self, surface: str) -> FrozenSet[str]:
+        """
+        单个汉字的允许读音集合（Kanjidic2读音 + 白名单）
         
-        # 按原顺序过滤
-        filtered = [r for r in candidates if r in allow]
-        return filtered or candidates
+        没有白名单时直接返回词典缓存的集合，不复制。
+        
+        Args:
+            surface: 单个汉字
+        
+        Returns:
+            允许读音集合
+        """
+        allow = self.dict_service.get_kanjidic2_reading_set(surface)
+        white = _WHITELIST_SETS.get(surface)
+        return allow | white if white else allow
     
     def get_alternative_readings_with_primary(
         self,
         surface: str,
         primary_reading: str,
-        context: str
+        context: str,
+        mode_readings: Optional[Sequence[str]] = None
     ) -> List[str]:
         """
         获取多音字的所有候选读音（含首选读音）
@@ -230,91 +308,353 @@ class ReadingService:
             surface: 词表面形式
             primary_reading: 主要读音
             context: 上下文文本
-            
+            mode_readings: 行分词结果中该词在各粒度下的读音（片假名），可为None
+        
         Returns:
             候选读音列表（按优先级排序）
         """
-        readings = []
-        best_reading = primary_reading
+        best_reading = self._resolve_primary_reading(surface, primary_reading, context)
+        return self._collect_alternative_readings(surface, best_reading, mode_readings)
+    
+    def _resolve_primary_reading(
+        self,
+        surface: str,
+        primary_reading: str,
+        context: str,
+        end: Optional[int] = None
+    ) -> str:
+        """
+        根据上下文确定首选读音（规则表primary阶段，如"如何"）
         
-        # 特殊处理"如何"这个词
-        if surface == "如何":
-            best_reading = self._handle_nani_reading(surface, context, primary_reading)
+        Args:
+            surface: 词表面形式
+            primary_reading: 分词器给出的读音
+            context: 上下文文本
+            end: 词在上下文中的结束位置
         
-        # 添加最佳读音
-        if best_reading:
-            readings.append(best_reading)
+        Returns:
+            首选读音
+        """
+        return self.rules.resolve_primary(surface, primary_reading, context, end)
+    
+    def _collect_alternative_readings(
+        self,
+        surface: str,
+        best_reading: str,
+        mode_readings: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """
+        收集候选读音（短语覆盖、常见多音字、不同分词粒度）
+        
+        Args:
+            surface: 词表面形式
+            best_reading: 已确定的首选读音
+            mode_readings: 行分词结果中该词在各粒度下的读音（片假名），可为None
+        
+        Returns:
+            候选读音列表（首选读音在前）
+        """
+        pool = self.collect_reading_pool(surface, mode_readings)
+        merged = [best_reading] + [r for r in pool if r != best_reading]
+        return self.filter_alternative_readings(surface, merged)
+    
+    def collect_reading_pool(
+        self,
+        surface: str,
+        mode_readings: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """
+        收集与首选读音无关的候选池（上下文无关候选池 + 行分词结果中各粒度下的读音）
+        
+        Args:
+            surface: 词表面形式
+            mode_readings: 行分词结果中该词在A/B/C粒度下的读音（片假名），可为None
+        
+        Returns:
+            按(长度, 字典序)排序的读音列表（未过滤）
+        """
+        pool = set(self.context_free_pool(surface))
+        if mode_readings:
+            pool.update(katakana_to_hiragana(r) for r in mode_readings)
+        return sorted(pool, key=lambda x: (len(x), x))
+    
+    def context_free_pool(self, surface: str) -> List[str]:
+        """
+        上下文无关的候选池（短语覆盖、常见多音字、词表面单独分词时三种粒度下的读音）
+        
+        单独分词只做一次（C模式分词后拆分），可得到句中上下文掩盖的读音（如"如何"的いかが）。
+        分层词典模式下，主词典不认识该词（未登录词）或词中含生僻字时，
+        再用候选词典分词补充读音。
+        
+        Args:
+            surface: 词表面形式
+        
+        Returns:
+            按(长度, 字典序)排序的读音列表（未过滤）
+        """
+        pool = set()
         
         # 短语级覆盖
         phrase = self.dict_service.get_phrase_override(surface)
         if phrase:
-            for r in phrase:
-                if r not in readings:
-                    readings.append(r)
-            # 置顶短语首选
-            readings = [phrase[0]] + [r for r in readings if r != phrase[0]]
+            pool.update(phrase)
         
         # 添加常见多音字读音
-        common_multireadings = self.get_common_multireadings(surface)
-        if common_multireadings:
-            for alt_reading in common_multireadings:
-                if alt_reading not in readings:
-                    readings.append(alt_reading)
+        pool.update(self.get_common_multireadings(surface))
         
-        # 通用候选收集（不同分词模式）
+        # 通用候选收集（不同分词粒度）
+        profiling_service.note("retokenize", surface)
         try:
-            alt_set = set(readings)
-            for mode in ['A', 'B', 'C']:
-                tokens = self.tokenizer.tokenize(surface, mode)
-                for token in tokens:
-                    if token.surface() == surface:
-                        r = token.reading_form()
-                        if r and r != "*":
-                            alt_set.add(katakana_to_hiragana(r))
+            readings, known = self.tokenizer.surface_readings(surface)
+            pool.update(katakana_to_hiragana(r) for r in readings)
             
-            # 重新排序
-            merged = [best_reading] + [
-                r for r in sorted(alt_set, key=lambda x: (len(x), x)) 
-                if r != best_reading
-            ]
+            # 分层词典：未登录词或含生僻字时查询候选词典
+            if self.tokenizer.tiered and (not known or contains_rare_kanji(surface)):
+                profiling_service.note("candidate_tier", surface)
+                readings, _ = self.tokenizer.candidate_tier.surface_readings(surface)
+                pool.update(katakana_to_hiragana(r) for r in readings)
         except Exception as e:
             logger.warning(f"收集候选读音时出错: {e}")
-            merged = readings if readings else [best_reading] if best_reading else []
         
-        return self.filter_alternative_readings(surface, merged)
+        return sorted(pool, key=lambda x: (len(x), x))
     
-    def _handle_nani_reading(
-        self, 
-        surface: str, 
-        context: str, 
-        primary_reading: str
-    ) -> str:
+    def build_context_free_candidates(self, surface: str) -> Tuple[List[str], List[str], List[str]]:
         """
-        特殊处理"如何"的读音选择
+        计算词表面的上下文无关候选（离线索引与现场计算共用）
+        
+        运行时将行分词结果中的各粒度读音并入候选池后过滤、追加外部词典读音，
+        再置顶首选读音、合并白名单并按允许读音裁剪，结果与逐步现场计算一致。
         
         Args:
             surface: 词表面形式
-            context: 上下文
-            primary_reading: 原始读音
-            
+        
         Returns:
-            优化后的读音
+            (上下文无关候选池, 外部词典读音, Kanjidic2裁剪允许读音列表)
         """
-        word_pos = context.find(surface)
-        if word_pos == -1:
-            return primary_reading
+        return (
+            self.context_free_pool(surface),
+            self.external_dictionary_readings(surface),
+            self.get_kanjidic_allowlist(surface),
+        )
+    
+    def merge_with_whitelist(
+        self,
+        reading_hiragana: str,
+        white: List[str],
+        alternative_readings: List[str]
+    ) -> List[str]:
+        """
+        合并白名单和候选读音
+        
+        Args:
+            reading_hiragana: 当前上下文读音
+            white: 白名单读音
+            alternative_readings: 通用候选
+        
+        Returns:
+            合并后的候选列表（上下文读音 → 白名单 → 通用候选）
+        """
+        merged = []
+        seen = set()
         
-        after_word = context[word_pos + len(surface):word_pos + len(surface) + 6]
+        # 1) 先放当前上下文读音
+        if reading_hiragana:
+            merged.append(reading_hiragana)
+            seen.add(reading_hiragana)
         
-        # 在特定上下文中，"如何"读作"どう"
-        if (after_word.startswith("か") or after_word.startswith("し") or
-            after_word.startswith("だ") or after_word.startswith("考え") or
-            after_word.startswith("思") or "思う" in context or "考え" in context):
-            return "どう"
-        elif after_word.startswith("です"):
-            return "いかが"
+        # 2) 再放白名单
+        for r in white:
+            if r and r not in seen:
+                seen.add(r)
+                merged.append(r)
+        
+        # 3) 最后放通用候选
+        for r in alternative_readings:
+            if r and r not in seen:
+                seen.add(r)
+                merged.append(r)
         
-        return primary_reading
+        return merged
+    
+    def get_candidate_readings(
+        self,
+        surface: str,
+        reading_hiragana: str,
+        context: str,
+        end: Optional[int] = None,
+        mode_readings: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """
+        获取汉字词的完整候选读音（带LRU缓存）
+        
+        依次执行多音字候选收集、外部词典融合、白名单合并、
+        特殊字裁剪和Kanjidic2裁剪。与上下文相关的首选读音（如"如何"）
+        在查缓存前确定并计入缓存键，其余步骤只依赖词表面、读音和各粒度读音；
+        其中与上下文无关的部分优先取自离线候选索引。
+        
+        Args:
+            surface: 词表面形式
+            reading_hiragana: 分词器给出的平假名读音
+            context: 上下文文本
+            end: 词在上下文中的结束位置（用于首选读音规则）
+            mode_readings: 行分词结果中该词在A/B/C粒度下的读音（片假名）
+        
+        Returns:
+            候选读音列表
+        """
+        best_reading = self._resolve_primary_reading(surface, reading_hiragana, context, end)
+        if mode_readings is not None:
+            mode_readings = tuple(mode_readings)
+        key = (surface, reading_hiragana, best_reading, mode_readings, self.dict_service.version)
+        cached = self._candidate_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        candidates = self._build_candidate_readings(
+            surface, reading_hiragana, best_reading, mode_readings
+        )
+        self._candidate_cache.put(key, tuple(candidates))
+        return candidates
+    
+    def _build_candidate_readings(
+        self,
+        surface: str,
+        reading_hiragana: str,
+        best_reading: str,
+        mode_readings: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """生成完整候选读音（缓存未命中时调用）"""
+        pool, external, allowlist = self._context_free_candidates(surface)
+        
+        # 并入行分词结果中的各粒度读音后过滤，再融合外部词典
+        if mode_readings:
+            extra = {katakana_to_hiragana(r) for r in mode_readings}.difference(pool)
+            if extra:
+                pool = sorted(extra.union(pool), key=lambda x: (len(x), x))
+        base = self.filter_alternative_readings(surface, pool)
+        seen = set(base)
+        base += [r for r in external if r not in seen]
+        
+        # 首选读音置顶（等价于对[首选]+候选池过滤后再融合外部词典）
+        alternative_readings = self.filter_alternative_readings(surface, [best_reading])
+        if alternative_readings:
+            alternative_readings += [r for r in base if r != best_reading]
+        else:
+            alternative_readings = list(base)
+        
+        # 白名单合并
+        white = self.get_reading_whitelist(surface)
+        if white:
+            alternative_readings = self.merge_with_whitelist(
+                reading_hiragana,
+                white,
+                alternative_readings
+            )
+        
+        # 特殊字符处理（规则表candidates阶段）
+        alternative_readings = self.rules.apply_candidate_rules(
+            surface,
+            reading_hiragana,
+            alternative_readings
+        )
+        
+        # 全局裁剪
+        return self.restrict_to_kanjidic_allowlist(
+            surface,
+            alternative_readings,
+            reading_hiragana,
+            allowlist
+        )
+    
+    def _context_free_candidates(self, surface: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        优先从离线索引读取上下文无关候选，索引不可用或未收录时现场计算并按词表面缓存
+        
+        返回新的列表，调用方可以修改。
+        """
+        if self.load_index():
+            groups = self._index.get_groups(surface)
+            if groups is not None:
+                groups = groups + [[]] * (3 - len(groups))
+                return groups[0], groups[1], groups[2]
+        
+        key = (surface, self.dict_service.version)
+        cached = self._surface_cache.get(key)
+        if cached is None:
+            cached = tuple(tuple(group) for group in self.build_context_free_candidates(surface))
+            self._surface_cache.put(key, cached)
+        return list(cached[0]), list(cached[1]), list(cached[2])
+    
+    def index_meta(self) -> Dict[str, str]:
+        """
+        当前运行环境对应的索引元数据
+        构建索引时写入文件，加载时逐项比对，任一不一致即视为过期
+        
+        Returns:
+            元数据字典
+        """
+        return {
+            "name": "ReadingIndex",
+            "layout": "pool+external+allowlist",
+            "dictionary_version": self.dict_service.version,
+            "sudachi_dictionary": self.tokenizer.dictionary_id,
+            "rules_fingerprint": rules_fingerprint(),
+        }
+    
+    def load_index(self) -> bool:
+        """
+        加载离线候选读音索引（幂等，线程安全）
+        
+        Returns:
+            True如果索引可用
+        """
+        if not self._index_checked:
+            with self._index_lock:
+                if not self._index_checked:
+                    self._index = self._open_index()
+                    self._index_checked = True
+        return self._index is not None
+    
+    def _open_index(self) -> Optional[CompiledDict]:
+        """打开并校验索引文件，不可用时返回None"""
+        path = config.READING_INDEX_PATH
+        if not config.USE_READING_INDEX or not path:
+            return None
+        if not os.path.exists(path):
+            logger.debug(f"候选读音索引不存在: {path}")
+            return None
+        
+        try:
+            index = CompiledDict(path)
+        except (OSError, CompiledDictError) as e:
+            logger.warning(f"⚠ 候选读音索引无法读取，改为现场计算: {e}")
+            return None
+        
+        expected = self.index_meta()
+        stale = [k for k, v in expected.items() if index.meta.get(k) != v]
+        if stale:
+            logger.warning(
+                f"⚠ 候选读音索引已过期({', '.join(stale)})，改为现场计算"
+                f"（请重新运行 python -m tools.build_reading_index）"
+            )
+            index.close()
+            return None
+        
+        logger.info(f"✓ 候选读音索引映射成功: {len(index)}条")
+        return index
+    
+    def cache_stats(self) -> Dict[str, object]:
+        """返回候选读音缓存的命中统计"""
+        return self._candidate_cache.stats()
+    
+    def surface_cache_stats(self) -> Dict[str, object]:
+        """返回上下文无关候选缓存的命中统计"""
+        return self._surface_cache.stats()
+    
+    def clear_cache(self) -> None:
+        """清空候选读音缓存和上下文无关候选缓存"""
+        self._candidate_cache.clear()
+        self._surface_cache.clear()
     
     def should_skip_alternatives(self, pos0: str, surface: str) -> bool:
         """
@@ -323,7 +663,7 @@ class ReadingService:
         Args:
             pos0: 词性
             surface: 词表面形式
-            
+        
         Returns:
             True如果应该跳过
         """
@@ -0,0 +1,375 @@
+"""
+特殊词规则服务模块
+从规则数据文件(special_rules.json)加载特殊词读音规则，编译为按词表面索引的规则表
+
+规则按处理阶段分组，每个阶段是 {词表面: 规则} 的字典:
+    primary     确定首选读音（如"如何"依后文读作どう/いかが）
+    candidates  候选裁剪（keep_only: 只保留给定读音和当前读音）
+    special     依前后token改写读音和候选（如"明"、"何"）
+    filter      上下文过滤时始终保留的读音（keep_always）
+
+没有规则的词只需一次字典查找；条件(when)在加载时编译为谓词函数。
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from config import config
+from services import profiling_service
+
+
+logger = logging.getLogger(__name__)
+
+# 候选列表中代表当前读音的占位符
+READING_PLACEHOLDER = "$reading"
+
+
+class RuleContext:
+    """规则条件的求值上下文"""
+    
+    __slots__ = ("line", "end", "tokens", "idx", "reading")
+    
+    def __init__(
+        self,
+        line: str = "",
+        end: int = 0,
+        tokens: Optional[List] = None,
+        idx: int = 0,
+        reading: str = ""
+    ):
+        """
+        Args:
+            line: 所在行文本
+            end: 当前词在行内的结束位置
+            tokens: 行内token列表
+            idx: 当前token的索引
+            reading: 当前读音
+        """
+        self.line = line
+        self.end = end
+        self.tokens = tokens
+        self.idx = idx
+        self.reading = reading
+    
+    def next_token(self):
+        """下一个token，不存在时返回None"""
+        if self.tokens is None or self.idx + 1 >= len(self.tokens):
+            return None
+        return self.tokens[self.idx + 1]
+
+
+Predicate = Callable[[RuleContext], bool]
+
+
+def _after_prefix(values: List[str]) -> Predicate:
+    prefixes = tuple(values)
+    return lambda ctx: ctx.line.startswith(prefixes, ctx.end)
+
+
+def _line_contains(values: List[str]) -> Predicate:
+    pattern = re.compile("|".join(re.escape(v) for v in values))
+    return lambda ctx: pattern.search(ctx.line) is not None
+
+
+def _next_surface_in(values: List[str]) -> Predicate:
+    surfaces = frozenset(values)
+    
+    def check(ctx: RuleContext) -> bool:
+        token = ctx.next_token()
+        return token is not None and token.surface() in surfaces
+    return check
+
+
+def _next_pos_in(values: List[str]) -> Predicate:
+    pos_set = frozenset(values)
+    
+    def check(ctx: RuleContext) -> bool:
+        token = ctx.next_token()
+        return token is not None and token.part_of_speech()[0] in pos_set
+    return check
+
+
+def _reading_in(values: List[str]) -> Predicate:
+    readings = frozenset(values)
+    return lambda ctx: ctx.reading in readings
+
+
+# 条件名 -> 谓词构造函数
+PREDICATES: Dict[str, Callable[[List[str]], Predicate]] = {
+    "after_prefix": _after_prefix,
+    "line_contains": _line_contains,
+    "next_surface_in": _next_surface_in,
+    "next_pos_in": _next_pos_in,
+    "reading_in": _reading_in,
+}
+
+
+@dataclass(frozen=True)
+class RuleCase:
+    """编译后的单条规则（条件全部满足时生效）"""
+    predicates: Tuple[Predicate, ...] = ()
+    reading: Optional[str] = None
+    candidates: Optional[Tuple[str, ...]] = None
+    add: Tuple[str, ...] = ()
+    
+    def matches(self, ctx: RuleContext) -> bool:
+        """判断规则条件是否全部满足"""
+        for predicate in self.predicates:
+            if not predicate(ctx):
+                return False
+        return True
+
+
+def compile_case(spec: Dict[str, Any]) -> RuleCase:
+    """
+    编译单条规则
+    
+    Args:
+        spec: 规则数据，如 {"when": {...}, "reading": "...", "candidates": [...]}
+    
+    Returns:
+        编译后的规则
+    
+    Raises:
+        ValueError: 规则格式不正确
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"规则应为对象: {spec!r}")
+    
+    predicates = []
+    for name, values in (spec.get("when") or {}).items():
+        factory = PREDICATES.get(name)
+        if factory is None:
+            raise ValueError(f"未知条件: {name}")
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"条件 {name} 的取值应为非空列表")
+        predicates.append(factory(values))
+    
+    candidates = spec.get("candidates")
+    return RuleCase(
+        predicates=tuple(predicates),
+        reading=spec.get("reading"),
+        candidates=tuple(candidates) if candidates is not None else None,
+        add=tuple(spec.get("add") or ())
+    )
+
+
+def _dedupe(readings: List[str]) -> List[str]:
+    """去重并去掉空读音，保持顺序"""
+    seen = set()
+    return [r for r in readings if r and not (r in seen or seen.add(r))]
+
+
+class RuleService:
+    """特殊词规则服务类"""
+    
+    def __init__(self, path: str):
+        """
+        初始化规则服务（不立即加载）
+        
+        Args:
+            path: 规则数据文件路径
+        """
+        self.path = path
+        self.version = ""
+        self._primary: Dict[str, Tuple[RuleCase, ...]] = {}
+        self._candidates: Dict[str, FrozenSet[str]] = {}
+        self._special: Dict[str, Tuple[RuleCase, ...]] = {}
+        self._keep_always: Dict[str, FrozenSet[str]] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    def load(self) -> None:
+        """加载并编译规则（幂等，线程安全）"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._compile(self._read_rules())
+            self._loaded = True
+    
+    def _read_rules(self) -> Dict[str, Any]:
+        """读取规则数据文件，失败时返回空规则"""
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw.decode('utf-8'))
+        except FileNotFoundError:
+            logger.warning(f"⚠ 特殊词规则文件不存在: {self.path}")
+            return {}
+        except (ValueError, OSError) as e:
+            logger.error(f"✗ 特殊词规则加载失败: {e}")
+            return {}
+        if not isinstance(data, dict):
+            logger.error("✗ 特殊词规则格式不正确，应为字典类型")
+            return {}
+        self.version = hashlib.sha1(raw).hexdigest()[:12]
+        return data
+    
+    def _compile(self, data: Dict[str, Any]) -> None:
+        """将规则数据编译为各阶段的查找表"""
+        self._primary = self._compile_cases(data.get("primary"), "primary")
+        self._special = self._compile_cases(data.get("special"), "special")
+        self._candidates = self._compile_sets(data.get("candidates"), "keep_only")
+        self._keep_always = self._compile_sets(data.get("filter"), "keep_always")
+        
+        total = len(self._primary) + len(self._special) + len(self._candidates) + len(self._keep_always)
+        logger.info(f"✓ 特殊词规则加载成功: {total}条 (version={self.version or 'none'})")
+    
+    def _compile_cases(self, stage: Any, name: str) -> Dict[str, Tuple[RuleCase, ...]]:
+        """编译 {词表面: [规则, ...]} 形式的阶段"""
+        table = {}
+        for surface, specs in (stage or {}).items():
+            try:
+                if not isinstance(specs, list):
+                    raise ValueError("应为规则列表")
+                table[surface] = tuple(compile_case(spec) for spec in specs)
+            except ValueError as e:
+                logger.error(f"✗ 规则 {name}/{surface} 无效，已跳过: {e}")
+        return table
+    
+    def _compile_sets(self, stage: Any, key: str) -> Dict[str, FrozenSet[str]]:
+        """编译 {词表面: {key: [读音, ...]}} 形式的阶段"""
+        table = {}
+        for surface, spec in (stage or {}).items():
+            readings = spec.get(key) if isinstance(spec, dict) else None
+            if not isinstance(readings, list):
+                logger.error(f"✗ 规则 {key}/{surface} 无效，已跳过")
+                continue
+            table[surface] = frozenset(readings)
+        return table
+    
+    def resolve_primary(
+        self,
+        surface: str,
+        reading: str,
+        line: str,
+        end: Optional[int] = None
+    ) -> str:
+        """
+        按primary阶段规则确定首选读音
+        
+        Args:
+            surface: 词表面形式
+            reading: 分词器给出的读音
+            line: 所在行文本
+            end: 词在行内的结束位置，为None时取词在行内首次出现的位置
+        
+        Returns:
+            首选读音
+        """
+        if not self._loaded:
+            self.load()
+        cases = self._primary.get(surface)
+        if not cases:
+            return reading
+        
+        if end is None:
+            pos = line.find(surface)
+            if pos == -1:
+                return reading
+            end = pos + len(surface)
+        
+        ctx = RuleContext(line=line, end=end, reading=reading)
+        for case in cases:
+            if case.matches(ctx):
+                profiling_service.note("rule", f"primary:{surface}")
+                return case.reading if case.reading is not None else reading
+        return reading
+    
+    def apply_candidate_rules(
+        self,
+        surface: str,
+        reading: str,
+        candidates: List[str]
+    ) -> List[str]:
+        """
+        按candidates阶段规则裁剪候选（只保留规则读音和当前读音）
+        
+        Args:
+            surface: 词表面形式
+            reading: 当前读音
+            candidates: 候选读音列表
+        
+        Returns:
+            裁剪后的候选列表
+        """
+        if not self._loaded:
+            self.load()
+        keep = self._candidates.get(surface)
+        if not keep:
+            return candidates
+        profiling_service.note("rule", f"candidates:{surface}")
+        return [r for r in candidates if r in keep or r == reading]
+    
+    def apply_special_rules(
+        self,
+        surface: str,
+        tokens: List,
+        idx: int,
+        reading: str,
+        candidates: List[str]
+    ) -> Tuple[List[str], str]:
+        """
+        按special阶段规则依前后token改写读音和候选（第一条满足条件的规则生效）
+        
+        Args:
+            surface: 词表面形式
+            tokens: 行内token列表
+            idx: 当前token的索引
+            reading: 当前读音
+            candidates: 候选读音列表
+        
+        Returns:
+            (候选读音列表, 读音)
+        """
+        if not self._loaded:
+            self.load()
+        cases = self._special.get(surface)
+        if not cases:
+            return candidates, reading
+        
+        ctx = RuleContext(tokens=tokens, idx=idx, reading=reading)
+        for case in cases:
+            if not case.matches(ctx):
+                continue
+            profiling_service.note("rule", f"special:{surface}")
+            if case.reading is not None:
+                reading = case.reading
+            if case.candidates is not None:
+                candidates = _dedupe([
+                    reading if r == READING_PLACEHOLDER else r
+                    for r in case.candidates
+                ])
+            if case.add:
+                merged = _dedupe(list(candidates) + list(case.add))
+                candidates = _dedupe([reading] + [r for r in merged if r != reading])
+            break
+        return candidates, reading
+    
+    def keep_always(self, surface: str) -> FrozenSet[str]:
+        """
+        filter阶段：上下文过滤时始终保留的读音
+        
+        Args:
+            surface: 词表面形式
+        
+        Returns:
+            读音集合（无规则时为空集合）
+        """
+        if not self._loaded:
+            self.load()
+        keep = self._keep_always.get(surface)
+        if not keep:
+            return frozenset()
+        profiling_service.note("rule", f"filter:{surface}")
+        return keep
+
+
+# 全局规则服务实例（规则按需加载）
+rule_service = RuleService(config.SPECIAL_RULES_PATH)
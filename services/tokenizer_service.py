@@ -1,35 +1,309 @@
 """
 分词服务模块
 封装Sudachi分词器的使用
+
+词典类型由 SUDACHI_DICT_TYPE 配置，对应的sudachidict包未安装时回退到其他已安装的词典。
+分层模式（SUDACHI_CANDIDATE_DICT_TYPE）下主分词使用较小的词典，较大的候选词典
+只在收集未登录词或生僻字的候选读音时按需加载。
 """
+import importlib.util
 import logging
-from typing import List
+import os
+import threading
+import time
+from contextlib import contextmanager
+from importlib import metadata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from sudachipy import tokenizer, dictionary
 
+from config import config
+from services import metrics_service
+
 
 logger = logging.getLogger(__name__)
 
+# 回退顺序（优先使用收录更全的词典）
+_DICT_TYPES = ("full", "core", "small")
+
+
+def resolve_dict_type(dict_type: str, fallback: bool = True) -> Optional[str]:
+    """
+    确定实际可用的词典类型
+    
+    Args:
+        dict_type: 配置的词典类型
+        fallback: 未安装时是否回退到其他已安装的词典
+    
+    Returns:
+        已安装的词典类型；均未安装时返回None
+    """
+    order = [dict_type]
+    if fallback:
+        order += [t for t in _DICT_TYPES if t != dict_type]
+    for candidate in order:
+        if importlib.util.find_spec(f"sudachidict_{candidate}") is not None:
+            if candidate != dict_type:
+                logger.warning(f"⚠ sudachidict_{dict_type} 未安装，改用 sudachidict_{candidate}")
+            return candidate
+    return None
+
+
+def _dictionary_file_bytes(dict_type: str) -> int:
+    """系统词典文件大小（mmap映射，各进程共享页缓存）"""
+    spec = importlib.util.find_spec(f"sudachidict_{dict_type}")
+    if spec is None or not spec.submodule_search_locations:
+        return 0
+    path = os.path.join(list(spec.submodule_search_locations)[0], "resources", "system.dic")
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（仅Linux，其他平台返回None）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mb(size: Optional[int]) -> str:
+    return f"{(size or 0) / 1024 / 1024:.1f}"
+
+
+def _format_memory(memory: Dict[str, Any]) -> str:
+    """格式化词典内存占用（词典文件大小与加载时的常驻内存增量）"""
+    rss = memory.get("rss_bytes")
+    resident = f"常驻内存+{_mb(rss)}MB" if rss is not None else "常驻内存未知"
+    return f"词典文件{_mb(memory.get('file_bytes'))}MB(mmap共享), {resident}"
+
+
+def mode_readings(token) -> Tuple[str, ...]:
+    """
+    B模式token在A/B/C三种粒度下与其表面完全一致的单元的读音（由分词结果拆分得到，不再分词）
+    
+    C单元与B单元表面一致时为同一词条，读音相同；A单元只在B单元未被继续拆分时与表面一致。
+    
+    Args:
+        token: tokenize_granular 返回的token
+    
+    Returns:
+        片假名读音元组（去重，不含"*"）
+    """
+    readings = [token.reading_form()]
+    fine = token.split(tokenizer.Tokenizer.SplitMode.A, add_single=True)
+    if len(fine) == 1:
+        readings.append(fine[0].reading_form())
+    return tuple(dict.fromkeys(r for r in readings if r and r != "*"))
+
 
 class TokenizerService:
-    """分词服务类"""
+    """
+    分词服务类
+    
+    Sudachi词典(Dictionary)以mmap方式映射系统词典，可在gunicorn主进程中加载后
+    由各工作进程共享；分词器(Tokenizer)既不保证fork安全也不能被多个线程同时使用，
+    由本进程内的分词器池管理：每次分词借出一个空闲分词器，用完归还，
+    池中最多 pool_size 个（按需创建），全部借出时等待。
+    gthread工作进程、ASGI线程池下多个线程共用一份词典并发分词。
     
-    def __init__(self, dict_type: str = "full"):
+    分层模式下 candidate_tier 为候选词典的分词服务（独立的词典和分词器池）。
+    """
+    
+    def __init__(
+        self,
+        dict_type: str = config.SUDACHI_DICT_TYPE,
+        pool_size: int = config.TOKENIZER_POOL_SIZE,
+        candidate_dict_type: str = ""
+    ):
         """
-        初始化分词器
+        初始化分词服务（不立即加载词典）
         
         Args:
-            dict_type: 词典类型，可选 "small", "core", "full"
+            dict_type: 词典类型，可选 "small", "core", "full"（未安装时回退）
+            pool_size: 分词器池容量
+            candidate_dict_type: 候选词典类型，为空表示不分层
+        """
+        self.dict_type = resolve_dict_type(dict_type) or dict_type
+        self.pool_size = pool_size
+        self._dictionary: Optional[dictionary.Dictionary] = None
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Optional[int]] = {}
+        self._reset_pool()
+        
+        self.candidate_tier: Optional[TokenizerService] = None
+        if candidate_dict_type:
+            resolved = resolve_dict_type(candidate_dict_type, fallback=False)
+            if resolved is None:
+                logger.warning(f"⚠ 候选词典 sudachidict_{candidate_dict_type} 未安装，不启用分层")
+            elif resolved == self.dict_type:
+                logger.warning(f"⚠ 候选词典与主词典相同({resolved})，不启用分层")
+            else:
+                self.candidate_tier = TokenizerService(resolved, pool_size)
+    
+    @property
+    def tiered(self) -> bool:
+        """是否启用分层词典"""
+        return self.candidate_tier is not None
+    
+    def _reset_pool(self) -> None:
+        """清空分词器池（fork后继承的分词器不可使用）"""
+        self._pool_cond = threading.Condition(threading.Lock())
+        self._idle: List[Any] = []
+        self._created = 0
+        self._in_use = 0
+        self._pool_pid = os.getpid()
+    
+    def load_dictionary(self) -> dictionary.Dictionary:
         """
+        加载Sudachi词典（幂等）
+        
+        Returns:
+            Sudachi词典对象
+        """
+        if self._dictionary is not None:
+            return self._dictionary
+        with self._lock:
+            if self._dictionary is None:
+                before = _rss_bytes()
+                try:
+                    self._dictionary = dictionary.Dictionary(dict_type=self.dict_type)
+                except Exception as e:
+                    logger.error(f"✗ Sudachi词典加载失败 (dict_type={self.dict_type}): {e}")
+                    raise
+                after = _rss_bytes()
+                self._memory = {
+                    "file_bytes": _dictionary_file_bytes(self.dict_type),
+                    "rss_bytes": after - before if before is not None and after is not None else None,
+                }
+                logger.info(f"✓ Sudachi词典加载成功 (dict_type={self.dict_type}, {_format_memory(self._memory)})")
+        return self._dictionary
+    
+    def memory_report(self) -> List[Dict[str, Any]]:
+        """
+        各层词典的内存占用
+        
+        Returns:
+            [{"tier", "dict_type", "loaded", "file_bytes", "rss_bytes"}]，主词典在前；
+            未加载的层 file_bytes 为词典文件大小，rss_bytes 为None
+        """
+        tiers = [("primary", self)]
+        if self.candidate_tier is not None:
+            tiers.append(("candidate", self.candidate_tier))
+        report = []
+        for name, service in tiers:
+            loaded = service._dictionary is not None
+            report.append({
+                "tier": name,
+                "dict_type": service.dict_type,
+                "loaded": loaded,
+                "file_bytes": service._memory.get("file_bytes") if loaded else _dictionary_file_bytes(service.dict_type),
+                "rss_bytes": service._memory.get("rss_bytes") if loaded else None,
+            })
+        return report
+    
+    def log_memory_report(self) -> None:
+        """在日志中报告各层词典的内存占用（启动时调用）"""
+        parts = []
+        for tier in self.memory_report():
+            name = "主词典" if tier["tier"] == "primary" else "候选词典"
+            usage = _format_memory(tier) if tier["loaded"] else f"按需加载, 词典文件{_mb(tier['file_bytes'])}MB"
+            parts.append(f"{name} {tier['dict_type']}: {usage}")
+        logger.info(f"✓ Sudachi词典内存 ({'; '.join(parts)})")
+    
+    @property
+    def dictionary_id(self) -> str:
+        """系统词典标识（类型与sudachidict包版本，分层时含候选词典），用于校验离线生成的数据"""
+        try:
+            version = metadata.version(f"sudachidict_{self.dict_type}")
+        except metadata.PackageNotFoundError:
+            version = "unknown"
+        if self.candidate_tier is not None:
+            return f"{self.dict_type}-{version}+{self.candidate_tier.dictionary_id}"
+        return f"{self.dict_type}-{version}"
+    
+    def _acquire(self):
+        """借出一个分词器：优先复用空闲的，未达容量时新建，否则等待归还"""
+        if self._pool_pid != os.getpid():
+            self.reset_after_fork()
+        
+        cond = self._pool_cond
+        with cond:
+            if self._idle:
+                self._in_use += 1
+                return self._idle.pop()
+            if self._created < self.pool_size:
+                self._created += 1
+                self._in_use += 1
+                created = True
+            else:
+                created = False
+                started = time.perf_counter()
+                while not self._idle:
+                    cond.wait()
+                self._in_use += 1
+                tok = self._idle.pop()
+        
+        if not created:
+            metrics_service.record_tokenizer_wait(time.perf_counter() - started)
+            return tok
         try:
-            self.tokenizer_obj = dictionary.Dictionary(dict_type=dict_type).create()
-            logger.info(f"✓ Sudachi分词器初始化成功 (dict_type={dict_type})")
-        except Exception as e:
-            logger.error(f"✗ Sudachi分词器初始化失败: {e}")
+            tok = self.load_dictionary().create()
+        except Exception:
+            with cond:
+                self._created -= 1
+                self._in_use -= 1
+                cond.notify()
             raise
+        logger.info(
+            f"✓ Sudachi分词器初始化成功 (pid={os.getpid()}, {self._created}/{self.pool_size})"
+        )
+        return tok
+    
+    def _release(self, tok) -> None:
+        """归还分词器并唤醒一个等待者"""
+        cond = self._pool_cond
+        with cond:
+            self._in_use -= 1
+            self._idle.append(tok)
+            cond.notify()
+    
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """
+        借出一个分词器，退出时归还
+        
+        Yields:
+            Sudachi分词器（借出期间只由当前线程使用）
+        """
+        tok = self._acquire()
+        try:
+            yield tok
+        finally:
+            self._release(tok)
+    
+    def warm_up(self) -> None:
+        """预先创建一个分词器，避免首个请求承担创建开销"""
+        with self.checkout():
+            pass
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """返回分词器池的容量、已创建数和借出数"""
+        with self._pool_cond:
+            return {"capacity": self.pool_size, "created": self._created, "in_use": self._in_use}
+    
+    def reset_after_fork(self) -> None:
+        """丢弃从父进程继承的分词器，下次使用时在本进程内重新创建"""
+        self._lock = threading.Lock()
+        self._reset_pool()
+        if self.candidate_tier is not None:
+            self.candidate_tier.reset_after_fork()
     
     def tokenize(
-        self, 
-        text: str, 
+        self,
+        text: str,
         mode: str = 'B'
     ) -> List:
         """
@@ -38,7 +312,7 @@ class TokenizerService:
         Args:
             text: 输入文本
             mode: 分词模式 'A' (短单元), 'B' (中等), 'C' (长单元)
-            
+        
         Returns:
             Token列表
         """
@@ -49,7 +323,29 @@ class TokenizerService:
         }
         
         split_mode = mode_map.get(mode, tokenizer.Tokenizer.SplitMode.B)
-        return self.tokenizer_obj.tokenize(text, split_mode)
+        with self.checkout() as tok:
+            return tok.tokenize(text, split_mode)
+    
+    def tokenize_granular(self, text: str) -> List:
+        """
+        单次多粒度分词：按最粗粒度(C)分词，再拆分为B模式token
+        
+        Sudachi的B/A模式本就是在C模式结果上按词典拆分信息切分，拆分结果与直接按B模式
+        分词一致；各token可再用 mode_readings 取得其他粒度下的读音而无需重新分词。
+        
+        Args:
+            text: 输入文本
+        
+        Returns:
+            B模式Token列表
+        """
+        split_mode = tokenizer.Tokenizer.SplitMode
+        with self.checkout() as tok:
+            coarse = tok.tokenize(text, split_mode.C)
+        tokens = []
+        for unit in coarse:
+            tokens.extend(unit.split(split_mode.B, add_single=True))
+        return tokens
     
     def smart_tokenize(self, text: str) -> List:
         """
@@ -58,13 +354,38 @@ class TokenizerService:
         
         Args:
             text: 输入文本
-            
+        
         Returns:
-            Token列表
+            Token列表（B模式，可用 mode_readings 取得其他粒度的读音）
         """
-        return self.tokenize(text, mode='B')
-
+        return self.tokenize_granular(text)
+    
+    def surface_readings(self, surface: str) -> Tuple[Tuple[str, ...], bool]:
+        """
+        对孤立的词表面单次分词，收集A/B/C粒度下与表面完全一致的单元读音
+        
+        A/B单元由C单元拆分而来，只有整个表面恰为一个C单元时才可能与表面一致。
+        
+        Args:
+            surface: 词表面形式
+        
+        Returns:
+            (片假名读音元组, 词典是否收录该词)
+        """
+        split_mode = tokenizer.Tokenizer.SplitMode
+        with self.checkout() as tok:
+            coarse = tok.tokenize(surface, split_mode.C)
+        if len(coarse) != 1 or coarse[0].surface() != surface:
+            return (), False
+        unit = coarse[0]
+        readings = [unit.reading_form()]
+        middle = unit.split(split_mode.B, add_single=True)
+        if len(middle) == 1:
+            readings.extend(mode_readings(middle[0]))
+        known = not unit.is_oov()
+        return tuple(dict.fromkeys(r for r in readings if r and r != "*")), known
 
-# 全局分词器实例
-tokenizer_service = TokenizerService()
 
+# 全局分词器实例（词典按需加载）
+tokenizer_service = TokenizerService(candidate_dict_type=config.SUDACHI_CANDIDATE_DICT_TYPE)
+metrics_service.register_tokenizer_pool(tokenizer_service.pool_stats)
@@ -0,0 +1,32 @@
+"""
+可缓存GET的文本存储：POST与GET落到不同工作进程时按哈希取回文本
+"""
+from services.document_service import DocumentStore, text_hash
+from utils.persistent_cache import PersistentCache
+
+
+TEXT = "夜空に光る星を見た\n東京へ行く"
+
+
+def test_lookup_finds_text_remembered_by_another_store(tmp_path):
+    """两个进程各自的存储实例共享同一个SQLite库"""
+    path = str(tmp_path / "line_cache.sqlite3")
+    poster = DocumentStore(PersistentCache(path, "v1"))
+    reader = DocumentStore(PersistentCache(path, "v1"))
+    
+    digest = poster.remember(TEXT)
+    
+    assert digest == text_hash(TEXT)
+    assert reader.lookup(digest) == TEXT
+    assert reader.lookup(text_hash("未記録の文")) is None
+
+
+def test_lookup_without_shared_cache_is_process_local():
+    """持久缓存未配置时只能取回本实例记录的文本"""
+    poster = DocumentStore(PersistentCache("", "v1"))
+    reader = DocumentStore(PersistentCache("", "v1"))
+    
+    digest = poster.remember(TEXT)
+    
+    assert poster.lookup(digest) == TEXT
+    assert reader.lookup(digest) is None
@@ -0,0 +1,52 @@
+"""
+并行注音进程池：工作进程意外退出后，下一个大请求重新并行处理
+"""
+import os
+import signal
+import time
+
+import pytest
+
+from services import profiling_service
+from services.annotation_service import annotation_service
+from services.parallel_service import ParallelAnnotator
+
+
+def _lines(tag: str, count: int = 40):
+    """互不相同、不会命中行缓存的行"""
+    return [f"{tag}の{i}番目の夜空に光る星を見た" for i in range(count)]
+
+
+def _annotate(lines):
+    """注音并返回由进程池计算的行数"""
+    profile = profiling_service.RequestProfile("\n".join(lines))
+    with profiling_service.activate(profile):
+        result = annotation_service.annotate_lines(lines)
+    assert len(result) == len(lines)
+    return profile.lines_parallel
+
+
+@pytest.fixture
+def annotator(monkeypatch):
+    # 工作进程继承环境变量：不写共享的持久缓存
+    monkeypatch.setenv("PERSISTENT_CACHE", "")
+    annotator = ParallelAnnotator(workers=2, min_chars=10, chunk_chars=100)
+    monkeypatch.setattr(annotation_service, "parallel", annotator)
+    annotation_service.clear_caches()
+    yield annotator
+    annotator.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="需要SIGKILL")
+def test_next_request_is_parallel_after_worker_dies(annotator):
+    assert _annotate(_lines("一")) > 0
+    
+    executor = annotator._executor
+    os.kill(next(iter(executor._processes)), signal.SIGKILL)
+    deadline = time.monotonic() + 30
+    while not executor._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert executor._broken
+    
+    assert _annotate(_lines("二")) > 0
+    assert annotator._executor is not executor
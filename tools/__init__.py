@@ -0,0 +1,4 @@
+"""
+离线工具模块
+包含词典编译、读音索引构建等构建期脚本
+"""
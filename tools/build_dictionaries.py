@@ -0,0 +1,123 @@
+"""
+词典编译脚本
+将 JMdict / Kanjidic2 / 现代覆盖词典的JSON编译为mmap二进制格式
+
+用法:
+    python -m tools.build_dictionaries [--output-dir DIR]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import config
+from utils.compiled_dict import file_fingerprint, write_compiled_dict
+from utils.kana_converter import katakana_to_hiragana
+
+
+logger = logging.getLogger(__name__)
+
+
+def _load_json(path: str) -> Optional[Dict]:
+    """读取JSON词典，文件不存在或格式错误时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"⚠ 源文件不存在，跳过: {path}")
+        return None
+    if not isinstance(data, dict):
+        logger.error(f"✗ 源文件格式不正确，应为字典类型: {path}")
+        return None
+    return data
+
+
+def _normalized_entries(data: Dict, to_hiragana: bool) -> Iterator[Tuple[str, List[List[str]]]]:
+    """
+    规范化词典条目：只保留字符串读音，按需转为平假名并去重
+    
+    Args:
+        data: 原始词典
+        to_hiragana: 是否将读音转为平假名
+    
+    Yields:
+        (键, [读音列表])
+    """
+    for key, readings in data.items():
+        if not isinstance(key, str) or not isinstance(readings, list):
+            continue
+        seen = set()
+        normalized = []
+        for r in readings:
+            if not isinstance(r, str) or not r:
+                continue
+            if to_hiragana:
+                r = katakana_to_hiragana(r)
+            if r not in seen:
+                seen.add(r)
+                normalized.append(r)
+        if normalized:
+            yield key, [normalized]
+
+
+def build(source_path: str, output_path: str, name: str, to_hiragana: bool) -> bool:
+    """
+    编译单个词典
+    
+    Args:
+        source_path: 源JSON路径
+        output_path: 输出路径
+        name: 词典名称
+        to_hiragana: 是否将读音预先转为平假名
+    
+    Returns:
+        True如果成功生成
+    """
+    data = _load_json(source_path)
+    if data is None:
+        return False
+    
+    meta = {
+        "name": name,
+        "source": os.path.basename(source_path),
+        "source_fingerprint": file_fingerprint(source_path),
+        "normalized": "hiragana" if to_hiragana else "none",
+    }
+    count = write_compiled_dict(output_path, _normalized_entries(data, to_hiragana), meta)
+    size_kb = os.path.getsize(output_path) / 1024
+    logger.info(f"✓ {name}: {count}条 -> {output_path} ({size_kb:.0f} KB)")
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="编译词典JSON为mmap二进制格式")
+    parser.add_argument(
+        '--output-dir',
+        help="输出目录（默认使用配置中的编译词典路径）"
+    )
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    targets = [
+        (config.JMDICT_PATH, config.COMPILED_JMDICT_PATH, "JMdict", True),
+        (config.KANJIDIC2_PATH, config.COMPILED_KANJIDIC2_PATH, "Kanjidic2", True),
+        (config.MODERN_OVERRIDES_PATH, config.COMPILED_OVERRIDES_PATH, "ModernOverrides", False),
+    ]
+    
+    built = 0
+    for source, output, name, to_hiragana in targets:
+        if args.output_dir:
+            output = os.path.join(args.output_dir, os.path.basename(output))
+        if build(source, output, name, to_hiragana):
+            built += 1
+    
+    logger.info(f"编译完成: {built}/{len(targets)}")
+    return 0 if built else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
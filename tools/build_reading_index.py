@@ -0,0 +1,139 @@
+"""
+候选读音索引构建脚本
+为所有已知词表面预先计算与上下文无关的候选读音，写入mmap索引文件
+
+索引收录的词表面来自 JMdict / Kanjidic2 / 短语覆盖词典 / 内置多音字表和白名单，
+可通过 --corpus 追加语料中出现的汉字词。每个条目保存两组读音:
+    第1组  上下文无关候选池（短语覆盖、常见多音字、词表面单独分词的读音）
+    第2组  外部词典读音（JMdict、Kanjidic2）
+    第3组  单个汉字的Kanjidic2裁剪允许读音
+运行时并入请求行分词结果中的各粒度读音后过滤，再置顶首选读音、合并白名单并裁剪，
+不再调用分词器。
+
+词典、Sudachi系统词典或内置规则变化后需重新运行；过期索引会被自动忽略。
+
+用法:
+    python -m tools.build_reading_index [--output PATH] [--corpus FILE ...]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Set
+
+from config import config
+from services.dictionary_service import dictionary_service
+from services.reading_service import (
+    COMMON_MULTIREADINGS, READING_WHITELIST, reading_service
+)
+from services.tokenizer_service import tokenizer_service
+from utils.compiled_dict import write_compiled_dict
+from utils.text_processor import contains_kanji
+
+
+logger = logging.getLogger(__name__)
+
+
+def _corpus_surfaces(paths: List[str]) -> Iterator[str]:
+    """
+    对语料分词，产出其中出现的词表面
+    
+    Args:
+        paths: 语料文件路径（UTF-8纯文本）
+    
+    Yields:
+        词表面
+    """
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    for token in tokenizer_service.smart_tokenize(line):
+                        yield token.surface()
+        except OSError as e:
+            logger.warning(f"⚠ 语料文件无法读取，跳过: {path} ({e})")
+
+
+def collect_surfaces(corpus: Optional[List[str]] = None) -> List[str]:
+    """
+    收集需要建立索引的词表面（仅含汉字的词）
+    
+    Args:
+        corpus: 追加的语料文件
+    
+    Returns:
+        去重后的词表面列表
+    """
+    surfaces: Set[str] = set()
+    sources = [
+        dictionary_service.iter_surfaces(),
+        iter(COMMON_MULTIREADINGS),
+        iter(READING_WHITELIST),
+    ]
+    if corpus:
+        sources.append(_corpus_surfaces(corpus))
+    
+    for source in sources:
+        for surface in source:
+            if isinstance(surface, str) and surface and contains_kanji(surface):
+                surfaces.add(surface)
+    return sorted(surfaces)
+
+
+def build(output_path: str, corpus: Optional[List[str]] = None) -> int:
+    """
+    构建候选读音索引
+    
+    Args:
+        output_path: 输出路径
+        corpus: 追加的语料文件
+    
+    Returns:
+        写入的条目数
+    """
+    surfaces = collect_surfaces(corpus)
+    logger.info(f"待索引词表面: {len(surfaces)}个")
+    
+    def entries():
+        started = time.perf_counter()
+        for i, surface in enumerate(surfaces, 1):
+            yield surface, list(reading_service.build_context_free_candidates(surface))
+            if i % 10000 == 0:
+                elapsed = time.perf_counter() - started
+                logger.info(f"  {i}/{len(surfaces)} ({elapsed:.1f}s)")
+    
+    meta = reading_service.index_meta()
+    count = write_compiled_dict(output_path, entries(), meta)
+    size_kb = os.path.getsize(output_path) / 1024
+    logger.info(f"✓ 候选读音索引: {count}条 -> {output_path} ({size_kb:.0f} KB)")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="预先计算上下文无关的候选读音索引")
+    parser.add_argument(
+        '--output',
+        default=config.READING_INDEX_PATH,
+        help="输出路径（默认使用配置中的索引路径）"
+    )
+    parser.add_argument(
+        '--corpus',
+        nargs='*',
+        default=[],
+        help="追加语料文件，收录其中出现的汉字词"
+    )
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    count = build(args.output, args.corpus)
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
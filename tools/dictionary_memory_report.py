@@ -0,0 +1,121 @@
+"""
+词典内存报告
+对比外部词典原始的 {词: [读音, ...]} 表示与加载时规范化、共享后的 ReadingTable 表示
+
+报告每个词典的内存占用、读音元组/字符串的共享情况，以及Kanjidic2
+允许读音查询（逐次转平假名建集合 vs 缓存的读音集合）的耗时和读音集合的内存占用。
+
+用法:
+    python -m tools.dictionary_memory_report [--lookups N]
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import List, Optional
+
+from config import config
+from utils.kana_converter import katakana_to_hiragana
+from utils.reading_table import ReadingTable, deep_sizeof
+from tools.build_dictionaries import _load_json
+
+
+logger = logging.getLogger(__name__)
+
+
+def _format_bytes(n: int) -> str:
+    """字节数格式化为 MB/KB"""
+    if n >= 1024 * 1024:
+        return f"{n / 1024 / 1024:.1f} MB"
+    return f"{n / 1024:.0f} KB"
+
+
+def report(path: str, name: str) -> Optional[ReadingTable]:
+    """
+    报告单个词典两种表示的内存占用
+    
+    Args:
+        path: 源JSON路径
+        name: 词典名称
+    
+    Returns:
+        ReadingTable，源文件不可用时返回None
+    """
+    data = _load_json(path)
+    if data is None:
+        return None
+    
+    before = deep_sizeof(data)
+    table = ReadingTable(data.items())
+    after = table.footprint()
+    stats = table.stats()
+    
+    logger.info(f"{name}: {stats['entries']}条")
+    logger.info(f"  原始 dict-of-lists : {_format_bytes(before)}")
+    logger.info(f"  ReadingTable       : {_format_bytes(after)} ({after / before:.0%}，读音集合按需构造)")
+    logger.info(
+        f"  读音元组 {stats['distinct_tuples']}/{stats['entries']} 个不同，"
+        f"读音字符串 {stats['distinct_readings']}/{stats['readings']} 个不同"
+    )
+    return table
+
+
+def time_lookups(path: str, table: ReadingTable, lookups: int) -> None:
+    """
+    对比Kanjidic2允许读音集合的两种查询方式，并报告查询后读音集合的内存占用
+    
+    Args:
+        path: Kanjidic2源JSON路径
+        table: 对应的 ReadingTable
+        lookups: 查询次数
+    """
+    data = _load_json(path)
+    keys = list(table.keys())
+    if not data or not keys:
+        return
+    
+    sample = [keys[i % len(keys)] for i in range(lookups)]
+    
+    start = time.perf_counter()
+    for kanji in sample:
+        set(katakana_to_hiragana(r) for r in data.get(kanji, []) if r)
+    legacy = time.perf_counter() - start
+    
+    before = table.footprint()
+    start = time.perf_counter()
+    for kanji in sample:
+        table.reading_set(kanji)
+    current = time.perf_counter() - start
+    
+    logger.info(
+        f"Kanjidic2允许读音查询 x{lookups}: 逐次转换 {legacy * 1000:.1f} ms，"
+        f"缓存集合 {current * 1000:.1f} ms"
+    )
+    logger.info(
+        f"  已构造读音集合 {table.stats()['reading_sets']} 个，"
+        f"占用 {_format_bytes(table.footprint() - before)}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="对比外部词典两种内存表示的占用")
+    parser.add_argument(
+        '--lookups', type=int, default=100000,
+        help="Kanjidic2查询计时的次数（0表示不计时）"
+    )
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    report(config.JMDICT_PATH, "JMdict")
+    kanjidic2 = report(config.KANJIDIC2_PATH, "Kanjidic2")
+    if kanjidic2 is None:
+        return 1
+    if args.lookups > 0:
+        time_lookups(config.KANJIDIC2_PATH, kanjidic2, args.lookups)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+慢请求重放脚本
+读取慢请求日志，在冷缓存下逐条重放并输出逐token剖析，便于离线定位耗时原因
+
+日志记录包含输入文本时重放整段输入，否则重放记录中的最慢行；
+记录不含原文（SLOW_REQUEST_LOG_INPUT 未开启）时无法重放，只能按哈希定位。
+
+用法:
+    python -m tools.replay_slow_requests [--log PATH] [--id ID|--sha256 PREFIX] [--top N] [--warm]
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import config
+from services import profiling_service
+from services.annotation_service import annotation_service
+from services.lifecycle import init_services
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    读取慢请求日志（跳过无法解析的行）
+    
+    Args:
+        path: 日志文件路径
+    
+    Yields:
+        日志记录
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def replay(record: Dict[str, Any], warm: bool = False) -> Optional[profiling_service.RequestProfile]:
+    """
+    重放一条记录
+    
+    Args:
+        record: 慢请求日志记录
+        warm: 是否保留缓存（默认先清空缓存，复现首次计算的耗时）
+    
+    Returns:
+        重放得到的剖析记录，记录不含原文时为None
+    """
+    text = record.get("input")
+    if text is None:
+        lines = [entry["line"] for entry in record.get("lines", []) if "line" in entry]
+        if not lines:
+            return None
+        text = "\n".join(lines)
+    
+    if not warm:
+        annotation_service.clear_caches()
+    
+    profile = profiling_service.RequestProfile(text, detailed=True)
+    with profiling_service.activate(profile):
+        annotation_service.annotate_lines(text.split('\n'))
+    profile.finish()
+    return profile
+
+
+def print_profile(record: Dict[str, Any], profile: profiling_service.RequestProfile, top: int) -> None:
+    """打印重放结果：摘要、最慢的行及其中触发重新分词/规则的词和最慢的token"""
+    print(f"== {record.get('id')} sha256={record.get('input_sha256', '')[:12]} "
+          f"logged={record.get('total_ms')}ms replay={profile.total * 1000:.3f}ms")
+    print(f"   {profile.summary_header()}")
+    for entry in sorted(profile.lines, key=lambda e: e["ms"], reverse=True)[:top]:
+        print(f"   {entry['ms']:>9.3f}ms  {entry['line']}")
+        stages = ", ".join(f"{k}={v}" for k, v in entry["stages_ms"].items())
+        print(f"              {stages}")
+        if entry.get("retokenize"):
+            print(f"              重新分词: {' '.join(entry['retokenize'])}")
+        if entry.get("rule"):
+            print(f"              规则命中: {' '.join(entry['rule'])}")
+        details = sorted(
+            entry.get("token_details", []),
+            key=lambda d: d["candidates_ms"] + d["special_ms"] + d["filter_ms"],
+            reverse=True
+        )
+        for detail in details[:3]:
+            print(f"              {detail['surface']}({detail['reading']}) "
+                  f"candidates={detail['candidates_ms']} special={detail['special_ms']} "
+                  f"filter={detail['filter_ms']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="离线重放慢请求日志")
+    parser.add_argument('--log', default=config.SLOW_REQUEST_LOG_PATH, help="慢请求日志路径")
+    parser.add_argument('--id', help="只重放指定id的记录")
+    parser.add_argument('--sha256', help="只重放输入哈希以此开头的记录")
+    parser.add_argument('--top', type=int, default=5, help="每条记录显示的最慢行数")
+    parser.add_argument('--warm', action='store_true', help="不清空缓存（复现热缓存下的耗时）")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    
+    try:
+        records = [
+            r for r in iter_records(args.log)
+            if (not args.id or r.get("id") == args.id)
+            and (not args.sha256 or r.get("input_sha256", "").startswith(args.sha256))
+        ]
+    except OSError as e:
+        print(f"✗ 无法读取慢请求日志: {e}", file=sys.stderr)
+        return 1
+    
+    if not records:
+        print("没有匹配的记录")
+        return 1
+    
+    init_services()
+    for record in records:
+        profile = replay(record, args.warm)
+        if profile is None:
+            print(f"⚠ {record.get('id')} 不含原文，跳过（需开启 SLOW_REQUEST_LOG_INPUT）")
+            continue
+        print_profile(record, profile, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+编译词典格式模块
+将 {词: [读音, ...]} 形式的词典编译为紧凑的二进制文件，运行时通过mmap只读访问，
+多个工作进程通过操作系统页缓存共享同一份内存
+
+文件布局（小端序）:
+    头部    magic(4s) 格式版本(H) 保留(H) 条目数(I) 元数据长度(I) 索引偏移(I)
+    元数据  UTF-8 JSON（来源文件指纹等）
+    索引    条目数 × (键偏移 I, 键长度 I, 值偏移 I, 值长度 I)，按键的UTF-8字节序排列
+    字符串区 键和值的UTF-8字节；值内各读音以 \\x1f 分隔，多组读音以 \\x1e 分隔
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+MAGIC = b'J26D'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIII')
+_INDEX_ENTRY = struct.Struct('<IIII')
+
+ITEM_SEP = '\x1f'
+GROUP_SEP = '\x1e'
+
+
+class CompiledDictError(Exception):
+    """编译词典文件格式错误"""
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """
+    计算文件内容指纹（SHA-1前16位），用于判断编译产物是否过期
+    
+    Args:
+        path: 文件路径
+    
+    Returns:
+        指纹字符串，文件不存在时返回None
+    """
+    h = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()[:16]
+
+
+def encode_value(groups: Sequence[Sequence[str]]) -> bytes:
+    """
+    将多组读音编码为值字节
+    
+    Args:
+        groups: 读音分组，普通词典只有一组
+    
+    Returns:
+        UTF-8编码的值
+    """
+    return GROUP_SEP.join(ITEM_SEP.join(group) for group in groups).encode('utf-8')
+
+
+def decode_value(raw: bytes) -> List[List[str]]:
+    """将值字节解码为读音分组"""
+    if not raw:
+        return [[]]
+    return [
+        group.split(ITEM_SEP) if group else []
+        for group in raw.decode('utf-8').split(GROUP_SEP)
+    ]
+
+
+def write_compiled_dict(
+    path: str,
+    entries: Iterable[Tuple[str, Sequence[Sequence[str]]]],
+    meta: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    写出编译词典文件（先写临时文件再原子替换）
+    
+    Args:
+        path: 输出路径
+        entries: (键, 读音分组) 序列
+        meta: 写入文件头的元数据
+    
+    Returns:
+        写入的条目数
+    """
+    encoded = sorted(
+        (key.encode('utf-8'), encode_value(groups)) for key, groups in entries
+    )
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    
+    index_offset = _HEADER.size + len(meta_bytes)
+    data_offset = index_offset + _INDEX_ENTRY.size * len(encoded)
+    
+    index = bytearray()
+    data = bytearray()
+    for key_bytes, value_bytes in encoded:
+        key_off = data_offset + len(data)
+        data += key_bytes
+        val_off = data_offset + len(data)
+        data += value_bytes
+        index += _INDEX_ENTRY.pack(key_off, len(key_bytes), val_off, len(value_bytes))
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded), len(meta_bytes), index_offset))
+        f.write(meta_bytes)
+        f.write(index)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(encoded)
+
+
+class CompiledDict:
+    """
+    mmap只读编译词典
+    
+    提供与dict相近的只读接口(get / in / len / keys / items)，
+    查找为基于偏移表的二分查找，不在Python堆上展开整个词典。
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 编译词典文件路径
+        
+        Raises:
+            OSError: 文件无法打开
+            CompiledDictError: 文件格式不正确
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise CompiledDictError(f"文件过短: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, _, count, meta_len, index_offset = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise CompiledDictError(f"文件标识不匹配: {path}")
+        if version != FORMAT_VERSION:
+            raise CompiledDictError(f"不支持的格式版本 {version}: {path}")
+        if index_offset + count * _INDEX_ENTRY.size > size:
+            raise CompiledDictError(f"索引越界: {path}")
+        
+        self._count = count
+        self._index_offset = index_offset
+        self.meta: Dict[str, Any] = json.loads(
+            self._mm[_HEADER.size:_HEADER.size + meta_len].decode('utf-8') or '{}'
+        )
+    
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return _INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * _INDEX_ENTRY.size)
+    
+    def _key_at(self, i: int) -> bytes:
+        key_off, key_len, _, _ = self._entry(i)
+        return self._mm[key_off:key_off + key_len]
+    
+    def _find(self, key: str) -> int:
+        """二分查找键所在的索引位置，不存在返回-1"""
+        target = key.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._key_at(mid)
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return mid
+        return -1
+    
+    def _raw_value(self, i: int) -> bytes:
+        _, _, val_off, val_len = self._entry(i)
+        return self._mm[val_off:val_off + val_len]
+    
+    def get_groups(self, key: str) -> Optional[List[List[str]]]:
+        """
+        获取键对应的全部读音分组
+        
+        Args:
+            key: 词表面形式
+        
+        Returns:
+            读音分组列表，不存在时返回None
+        """
+        i = self._find(key)
+        if i < 0:
+            return None
+        return decode_value(self._raw_value(i))
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取键对应的读音列表（第一组），不存在时返回default"""
+        groups = self.get_groups(key)
+        if groups is None:
+            return default
+        return groups[0]
+    
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def keys(self) -> Iterator[str]:
+        """按字节序遍历所有键"""
+        for i in range(self._count):
+            yield self._key_at(i).decode('utf-8')
+    
+    def items(self) -> Iterator[Tuple[str, List[str]]]:
+        """按字节序遍历 (键, 读音列表)"""
+        for i in range(self._count):
+            yield self._key_at(i).decode('utf-8'), decode_value(self._raw_value(i))[0]
+    
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+    
+    def close(self) -> None:
+        """关闭mmap"""
+        self._mm.close()
@@ -1,8 +1,23 @@
 """
 假名转换工具模块
 处理片假名和平假名之间的转换
+
+转换使用预先生成的 str.translate 映射表，判断使用预编译的正则表达式，
+逐字符循环在C层完成。
 """
-from typing import Optional
+import re
+from typing import Iterable, List, Optional
+
+
+# 片假名(ァ-ヶ) -> 平假名 的映射表（码位相差0x60）
+_KATA_TO_HIRA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+# 批量转换时拼接各字符串的分隔符（不在映射表中，转换后原样保留）
+_BATCH_SEP = '\x00'
+
+_ALL_KATAKANA_RE = re.compile(r'[ァ-ヶー]+')
+_HIRAGANA_TEXT_RE = re.compile(r'[\u3040-\u309f]+')
+_KATAKANA_RE = re.compile(r'[\u30a0-\u30ff]+')
 
 
 def katakana_to_hiragana(katakana_string: str) -> str:
@@ -11,18 +26,29 @@ def katakana_to_hiragana(katakana_string: str) -> str:
     
     Args:
         katakana_string: 片假名字符串
-        
+    
     Returns:
         转换后的平假名字符串
     """
-    hiragana_string = ""
-    for char in katakana_string:
-        if 'ァ' <= char <= 'ヶ':
-            hiragana_char = chr(ord(char) - 96)
-            hiragana_string += hiragana_char
-        else:
-            hiragana_string += char
-    return hiragana_string
+    return katakana_string.translate(_KATA_TO_HIRA)
+
+
+def katakana_to_hiragana_batch(strings: Iterable[str]) -> List[str]:
+    """
+    批量将片假名转换为平假名（拼接后一次转换，适合整行token的读音）
+    
+    Args:
+        strings: 字符串序列
+    
+    Returns:
+        与输入一一对应的平假名字符串列表
+    """
+    items = list(strings)
+    if not items:
+        return []
+    if any(_BATCH_SEP in s for s in items):
+        return [s.translate(_KATA_TO_HIRA) for s in items]
+    return _BATCH_SEP.join(items).translate(_KATA_TO_HIRA).split(_BATCH_SEP)
 
 
 def is_all_katakana(text: str) -> bool:
@@ -31,16 +57,11 @@ def is_all_katakana(text: str) -> bool:
     
     Args:
         text: 待检查的文本
-        
+    
     Returns:
         True如果全部为片假名，否则False
     """
-    if not text:
-        return False
-    for char in text:
-        if not ('ァ' <= char <= 'ヶ' or char == 'ー'):
-            return False
-    return True
+    return bool(text) and _ALL_KATAKANA_RE.fullmatch(text) is not None
 
 
 def is_hiragana(char: str) -> bool:
@@ -49,7 +70,7 @@ def is_hiragana(char: str) -> bool:
     
     Args:
         char: 单个字符
-        
+    
     Returns:
         True如果是平假名，否则False
     """
@@ -62,16 +83,11 @@ def is_hiragana_text(text: str) -> bool:
     
     Args:
         text: 待检查的文本
-        
+    
     Returns:
         True如果全部为平假名，否则False
     """
-    if not text:
-        return False
-    for ch in text:
-        if not ('\u3040' <= ch <= '\u309f'):
-            return False
-    return True
+    return bool(text) and _HIRAGANA_TEXT_RE.fullmatch(text) is not None
 
 
 def is_katakana(text: str) -> bool:
@@ -80,14 +96,8 @@ def is_katakana(text: str) -> bool:
     
     Args:
         text: 待检查的文本
-        
+    
     Returns:
         True如果是片假名，否则False
     """
-    if not text:
-        return False
-    for char in text:
-        if not ('\u30A0' <= char <= '\u30FF' or char == '\u30FC'):
-            return False
-    return True
-
+    return bool(text) and _KATAKANA_RE.fullmatch(text) is not None
@@ -0,0 +1,145 @@
+"""
+LRU缓存工具模块
+提供按条目数和估算字节数双重限制的线程安全LRU缓存
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    估算对象占用的字节数（递归处理常见容器）
+    
+    Args:
+        obj: 待估算的对象
+    
+    Returns:
+        估算字节数
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item)
+    return size
+
+
+class LRUCache:
+    """
+    有界LRU缓存
+    
+    同时按条目数(max_entries)和估算字节数(max_bytes)限制容量，
+    超出任一限制时淘汰最久未使用的条目。
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Args:
+            max_entries: 最大条目数，<=0 表示禁用缓存
+            max_bytes: 最大估算字节数，<=0 表示不限制
+            sizeof: 估算条目大小的函数，默认使用 estimate_size
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or estimate_size
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用"""
+        return self.max_entries > 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存，命中时将条目移到最近使用端
+        
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+        
+        Returns:
+            缓存值或default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        写入缓存并按容量淘汰
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+        """
+        if not self.enabled:
+            return
+        size = self._sizeof(key) + self._sizeof(value)
+        if self.max_bytes > 0 and size > self.max_bytes:
+            return
+        
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            
+            while self._data and (
+                len(self._data) > self.max_entries or
+                (self.max_bytes > 0 and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """清空缓存（保留统计计数）"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回缓存统计信息
+        
+        Returns:
+            包含命中/未命中/淘汰次数、条目数和字节数的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,420 @@
+"""
+指标工具模块
+提供进程内的计数器/仪表/直方图与Prometheus文本格式输出
+
+多进程（gunicorn多worker、并行注音进程池）场景下，各进程把自己的指标快照
+写入共享目录下的 metrics_<pid>.json，抓取时汇总所有进程的文件:
+    计数器、直方图  跨进程求和（已退出进程的计数累加进 metrics_totals.json，累计值保持单调）
+    仪表            只汇总仍存活进程的值
+
+已退出进程的快照由 gunicorn 主进程在 child_exit 钩子中累加进汇总文件后删除，
+目录不随工作进程轮换（max_requests）无限增长，复用的pid也不会覆盖已退出进程的计数。
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 已退出进程的累计计数（格式同进程快照，pid为null）
+TOTALS_FILE = 'metrics_totals.json'
+
+# 默认耗时分桶（秒）
+DEFAULT_TIME_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class _Metric:
+    """指标基类"""
+    
+    kind = ""
+    
+    def __init__(self, registry: 'MetricsRegistry', name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._values: Dict[LabelValues, Any] = {}
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        """
+        增加计数
+        
+        Args:
+            amount: 增量
+            labels: 标签值（与labelnames一一对应）
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def set_total(self, value: float, *labels: str) -> None:
+        """同步外部维护的累计值（供采集函数使用，如缓存命中数）"""
+        with self._lock:
+            self._values[labels] = float(value)
+
+
+class Gauge(_Metric):
+    """仪表（可增可减的当前值）"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, *labels: str) -> None:
+        """
+        设置当前值
+        
+        Args:
+            value: 数值
+            labels: 标签值
+        """
+        with self._lock:
+            self._values[labels] = float(value)
+
+
+class Histogram(_Metric):
+    """直方图（分桶计数 + 总和）"""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        registry: 'MetricsRegistry',
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float]
+    ):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        记录一次观测值
+        
+        Args:
+            value: 观测值
+            labels: 标签值
+        """
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    
+    记录操作只在进程内加锁更新字典；跨进程汇总通过周期性写出的快照文件完成，
+    不在请求路径上做任何IO（写文件按 flush_interval 节流）。
+    """
+    
+    def __init__(self, enabled: bool = True, directory: str = "", flush_interval: float = 5.0):
+        """
+        Args:
+            enabled: 是否启用
+            directory: 多进程快照目录，为空表示仅统计本进程
+            flush_interval: 快照文件最短写出间隔（秒）
+        """
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._last_flush = 0.0
+    
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册计数器"""
+        return self._register(Counter(self, name, help_text, labelnames))
+    
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """注册仪表"""
+        return self._register(Gauge(self, name, help_text, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_TIME_BUCKETS
+    ) -> Histogram:
+        """注册直方图"""
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+    
+    def _register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """
+        注册采集函数，在生成快照前调用，用于把外部状态（如缓存统计）同步到指标
+        
+        Args:
+            collector: 无参函数
+        """
+        self._collectors.append(collector)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        生成本进程的指标快照
+        
+        Returns:
+            {"pid": ..., "metrics": {名称: [[标签值, 值], ...]}}
+        """
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"指标采集函数执行失败: {e}")
+        
+        with self._lock:
+            metrics = {}
+            for name, metric in self._metrics.items():
+                if isinstance(metric, Histogram):
+                    metrics[name] = [
+                        [list(labels), list(state[0]), state[1]]
+                        for labels, state in metric._values.items()
+                    ]
+                else:
+                    metrics[name] = [[list(labels), value] for labels, value in metric._values.items()]
+        return {"pid": os.getpid(), "time": time.time(), "metrics": metrics}
+    
+    def maybe_flush(self) -> None:
+        """距上次写出超过 flush_interval 时写出快照文件（未配置目录时不做任何事）"""
+        if not self.directory or not self.enabled:
+            return
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        self.flush()
+    
+    def flush(self) -> None:
+        """立即写出本进程的快照文件"""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠ 指标快照写出失败: {e}")
+    
+    def clear_directory(self) -> None:
+        """删除快照目录中的旧文件（服务启动时调用）"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith("metrics_") and name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+    
+    def retire_dead(self) -> int:
+        """
+        把已退出进程的快照（计数器和直方图）累加进汇总文件并删除
+        
+        只能由单个进程调用（gunicorn主进程的 child_exit 钩子），否则同一快照可能被重复累加。
+        
+        Returns:
+            处理的快照数
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        dead = []
+        for name in os.listdir(self.directory):
+            pid = _snapshot_pid(name)
+            if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                dead.append(os.path.join(self.directory, name))
+        if not dead:
+            return 0
+        
+        totals: Dict[str, Dict[LabelValues, Any]] = {name: {} for name in self._metrics}
+        totals_path = os.path.join(self.directory, TOTALS_FILE)
+        for path in [totals_path] + dead:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._merge(totals, json.load(f), gauges=False)
+            except (OSError, ValueError):
+                continue
+        
+        snapshot = {"pid": None, "time": time.time(), "metrics": self._entries(totals)}
+        tmp_path = f"{totals_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, totals_path)
+        except OSError as e:
+            logger.warning(f"⚠ 指标汇总文件写出失败: {e}")
+            return 0
+        for path in dead:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(dead)
+    
+    def _load_snapshots(self) -> List[Dict[str, Any]]:
+        """读取所有进程的快照（本进程使用实时数据）"""
+        own = self.snapshot()
+        if not self.directory:
+            return [own]
+        
+        self.flush()
+        snapshots = [own]
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return snapshots
+        for name in names:
+            if not (name.startswith("metrics_") and name.endswith(".json")):
+                continue
+            if name == f"metrics_{own['pid']}.json":
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+    
+    def aggregate(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """
+        汇总所有进程的指标
+        
+        Returns:
+            {名称: {标签值: 值}}，直方图的值为 [分桶计数, 总和]
+        """
+        result: Dict[str, Dict[LabelValues, Any]] = {name: {} for name in self._metrics}
+        for snap in self._load_snapshots():
+            alive = snap.get("pid") == os.getpid() or _pid_alive(snap.get("pid"))
+            self._merge(result, snap, gauges=alive)
+        return result
+    
+    def _merge(self, result: Dict[str, Dict[LabelValues, Any]], snap: Dict[str, Any], gauges: bool) -> None:
+        """把一个快照累加进汇总结果（gauges为False时跳过仪表）"""
+        for name, entries in snap.get("metrics", {}).items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            if isinstance(metric, Gauge) and not gauges:
+                continue
+            values = result[name]
+            for entry in entries:
+                labels = tuple(entry[0])
+                if isinstance(metric, Histogram):
+                    counts, total = entry[1], entry[2]
+                    if len(counts) != len(metric.buckets) + 1:
+                        continue
+                    state = values.setdefault(labels, [[0] * len(counts), 0.0])
+                    state[0] = [a + b for a, b in zip(state[0], counts)]
+                    state[1] += total
+                else:
+                    values[labels] = values.get(labels, 0.0) + entry[1]
+    
+    def _entries(self, data: Dict[str, Dict[LabelValues, Any]]) -> Dict[str, List[Any]]:
+        """汇总结果转回快照中的条目格式"""
+        metrics = {}
+        for name, values in data.items():
+            if isinstance(self._metrics[name], Histogram):
+                metrics[name] = [[list(labels), state[0], state[1]] for labels, state in values.items()]
+            else:
+                metrics[name] = [[list(labels), value] for labels, value in values.items()]
+        return metrics
+    
+    def render(self, extra: Optional[Callable[[Dict[str, Dict[LabelValues, Any]]], Iterable[str]]] = None) -> str:
+        """
+        输出Prometheus文本格式
+        
+        Args:
+            extra: 根据汇总结果生成附加行的函数（如命中率等派生指标）
+        
+        Returns:
+            指标文本
+        """
+        data = self.aggregate()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(data[name].items()):
+                label_pairs = list(zip(metric.labelnames, labels))
+                if isinstance(metric, Histogram):
+                    counts, total = value
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(label_pairs + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(label_pairs)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(label_pairs)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_format_labels(label_pairs)} {_format_value(value)}")
+        if extra is not None:
+            lines.extend(extra(data))
+        return "\n".join(lines) + "\n"
+
+
+def _snapshot_pid(name: str) -> Optional[int]:
+    """从快照文件名 metrics_<pid>.json 中取出pid，其他文件返回None"""
+    if not (name.startswith("metrics_") and name.endswith(".json")):
+        return None
+    pid = name[len("metrics_"):-len(".json")]
+    return int(pid) if pid.isdigit() else None
+
+
+def _pid_alive(pid: Any) -> bool:
+    """判断进程是否仍存活"""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in pairs) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,366 @@
+"""
+持久缓存工具模块
+基于SQLite(WAL模式)的键值缓存，同一主机上的多个工作进程并发读写，进程重启后保留
+
+- 版本: 键中包含版本，词典、规则或代码变化后旧条目不再命中；旧条目不在打开时清空
+  （滚动发布期间新旧进程交替启动，清空会互相删掉对方仍在使用的条目），而是随容量淘汰，
+  版本变化时另外删除超过 _STALE_AFTER 未被使用的条目（未限制容量时也不会无限增长）
+- 容量: 按值字节数之和限制，超出时按最近使用时间淘汰最旧的条目；条目数和字节数
+  作为计数器保存在 meta 表中，与写入/淘汰在同一事务内更新，请求路径上不扫描全表
+- 降级: 数据库被其他进程锁住时本次读写视为未命中/跳过；文件不可用或损坏时
+  记录一次警告并停用，调用方退回纯内存缓存
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+"""
+
+# 淘汰到容量上限的该比例，避免每次写入都触发淘汰
+_EVICT_TARGET = 0.9
+# 命中条目的最近使用时间至多每隔多少秒更新一次（减少读路径上的写入）
+_TOUCH_INTERVAL = 3600
+# 版本变化时删除超过该秒数未被使用的条目（须大于 _TOUCH_INTERVAL，仍在使用的旧版本条目得以保留）
+_STALE_AFTER = 24 * 3600
+# 单次SQL语句的参数上限（SQLite默认999）
+_MAX_PARAMS = 500
+
+
+class PersistentCache:
+    """
+    SQLite持久键值缓存（字符串键，字节值）
+    
+    连接按进程和线程分别创建（SQLite连接不能跨fork或跨线程使用）。
+    """
+    
+    def __init__(self, path: str, version: str, max_bytes: int = 0, timeout: float = 0.05):
+        """
+        Args:
+            path: 数据库文件路径，为空表示禁用
+            version: 内容版本（计入键中，变化后旧条目不再命中）
+            max_bytes: 值字节数之和的上限，<=0 表示不限制
+            timeout: 等待其他进程释放写锁的秒数，超时则跳过本次读写
+        """
+        self.path = path
+        self.version = version
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._disabled = not path
+        self._opened_pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.busy = 0
+        self._entries = 0
+        self._bytes = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """缓存是否可用"""
+        return not self._disabled
+    
+    def _key(self, key: str) -> bytes:
+        return hashlib.sha1(f"{self.version}\0{key}".encode('utf-8')).digest()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """当前进程当前线程的连接（首次使用时创建，进程内首个连接负责初始化）"""
+        local = self._local
+        pid = os.getpid()
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.pid == pid:
+            return conn
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        
+        with self._lock:
+            if self._opened_pid != pid:
+                self._initialize(conn)
+                self._opened_pid = pid
+        local.conn = conn
+        local.pid = pid
+        return conn
+    
+    def _initialize(self, conn: sqlite3.Connection) -> None:
+        """
+        建表；库中没有容量计数器时（旧版本创建的库）统计一次；
+        版本与库中记录的最近版本不同时删除长期未使用的条目
+        """
+        conn.executescript(_SCHEMA)
+        row = conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        changed = row is None or row[0] != self.version
+        pruned = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._read_totals(conn) is None:
+                entries, total = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+                self._set_totals(conn, entries, total)
+            if changed:
+                pruned = self._prune_stale(conn, int(time.time()) - _STALE_AFTER)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (self.version,)
+                )
+            self._enforce_limit(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is not None and changed:
+            logger.info(
+                f"✓ 持久缓存版本变化: {row[0]} -> {self.version}"
+                f"（旧条目随淘汰失效，已删除长期未使用的{pruned}条）"
+            )
+        logger.info(f"✓ 持久缓存已打开: {self.path} ({self._entries}条, {self._bytes // 1024}KB)")
+    
+    def _prune_stale(self, conn: sqlite3.Connection, before: int) -> int:
+        """
+        删除最近使用时间早于before的条目（沿 used 索引，须在事务内、读取计数器之后调用）
+        
+        Returns:
+            删除的条数
+        """
+        count, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE used < ?", (before,)
+        ).fetchone()
+        if count:
+            conn.execute("DELETE FROM entries WHERE used < ?", (before,))
+            self._add_totals(conn, -count, -size)
+            self._entries -= count
+            self._bytes -= size
+        return count
+    
+    def _read_totals(self, conn: sqlite3.Connection) -> Optional[Tuple[int, int]]:
+        """读取 meta 中的 (条目数, 字节数)，不存在时返回None"""
+        rows = dict(conn.execute(
+            "SELECT name, CAST(value AS INTEGER) FROM meta WHERE name IN ('entries', 'bytes')"
+        ).fetchall())
+        if len(rows) < 2:
+            return None
+        self._entries = rows['entries']
+        self._bytes = rows['bytes']
+        return self._entries, self._bytes
+    
+    def _set_totals(self, conn: sqlite3.Connection, entries: int, total: int) -> None:
+        """写入 meta 中的条目数和字节数（须在事务内调用）"""
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [('entries', entries), ('bytes', total)]
+        )
+        self._entries = entries
+        self._bytes = total
+    
+    def _add_totals(self, conn: sqlite3.Connection, entries: int, total: int) -> None:
+        """累加 meta 中的条目数和字节数（须在事务内调用）"""
+        conn.executemany(
+            "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE name = ?",
+            [(entries, 'entries'), (total, 'bytes')]
+        )
+    
+    def _run(self, func, default: Any) -> Any:
+        """
+        执行一次数据库操作并处理错误
+        
+        被锁住时返回default；其他错误时停用缓存并返回default
+        """
+        if self._disabled:
+            return default
+        try:
+            return func(self._connection())
+        except sqlite3.OperationalError as e:
+            message = str(e).lower()
+            if "locked" in message or "busy" in message:
+                self.busy += 1
+                return default
+            self._disable(e)
+        except (sqlite3.Error, OSError) as e:
+            self._disable(e)
+        return default
+    
+    def _disable(self, error: Exception) -> None:
+        if not self._disabled:
+            self._disabled = True
+            logger.warning(f"⚠ 持久缓存不可用，已停用: {self.path} ({error})")
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        读取单个键
+        
+        Returns:
+            值；未命中或缓存不可用时返回None
+        """
+        return self.get_many([key]).get(key)
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        批量读取
+        
+        Args:
+            keys: 键列表
+        
+        Returns:
+            命中的 {键: 值}
+        """
+        by_hash = {self._key(k): k for k in keys}
+        if not by_hash or self._disabled:
+            return {}
+        
+        def query(conn: sqlite3.Connection) -> Dict[str, bytes]:
+            found: Dict[str, bytes] = {}
+            stale: List[bytes] = []
+            now = int(time.time())
+            hashes = list(by_hash)
+            for start in range(0, len(hashes), _MAX_PARAMS):
+                batch = hashes[start:start + _MAX_PARAMS]
+                rows = conn.execute(
+                    f"SELECT key, value, used FROM entries WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for hashed, value, used in rows:
+                    found[by_hash[hashed]] = value
+                    if now - used > _TOUCH_INTERVAL:
+                        stale.append(hashed)
+            if stale:
+                try:
+                    conn.executemany("UPDATE entries SET used = ? WHERE key = ?", [(now, h) for h in stale])
+                except sqlite3.OperationalError:
+                    # 写锁被占用时下次命中再更新
+                    self.busy += 1
+            return found
+        
+        found = self._run(query, {})
+        self.hits += len(found)
+        self.misses += len(by_hash) - len(found)
+        return found
+    
+    def put(self, key: str, value: bytes) -> None:
+        """写入单个键"""
+        self.put_many([(key, value)])
+    
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        """
+        批量写入（同一事务），同时更新容量计数器，超出上限时淘汰
+        
+        Args:
+            items: (键, 值) 列表
+        """
+        now = int(time.time())
+        values = {self._key(k): v for k, v in items}
+        if not values or self._disabled:
+            return
+        rows = [(hashed, v, len(v), now) for hashed, v in values.items()]
+        
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 覆盖已有的键时先扣除旧值（通常是其他进程刚写入的同一行）
+                replaced = 0
+                replaced_bytes = 0
+                hashes = list(values)
+                for start in range(0, len(hashes), _MAX_PARAMS):
+                    batch = hashes[start:start + _MAX_PARAMS]
+                    count, size = conn.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries "
+                        f"WHERE key IN ({','.join('?' * len(batch))})",
+                        batch
+                    ).fetchone()
+                    replaced += count
+                    replaced_bytes += size
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)", rows
+                )
+                self._add_totals(
+                    conn, len(rows) - replaced, sum(row[2] for row in rows) - replaced_bytes
+                )
+                self._read_totals(conn)
+                self._enforce_limit(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        self._run(write, None)
+    
+    def _enforce_limit(self, conn: sqlite3.Connection) -> None:
+        """
+        超出容量上限时沿 used 索引淘汰最久未使用的条目，直到降到上限的 _EVICT_TARGET
+        （须在事务内、读取计数器之后调用）
+        """
+        if self.max_bytes <= 0 or self._bytes <= self.max_bytes:
+            return
+        excess = self._bytes - int(self.max_bytes * _EVICT_TARGET)
+        victims: List[bytes] = []
+        freed = 0
+        cursor = conn.execute("SELECT key, size FROM entries ORDER BY used")
+        try:
+            for hashed, size in cursor:
+                victims.append(hashed)
+                freed += size
+                if freed >= excess:
+                    break
+        finally:
+            cursor.close()
+        for start in range(0, len(victims), _MAX_PARAMS):
+            batch = victims[start:start + _MAX_PARAMS]
+            conn.execute(f"DELETE FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch)
+        self._add_totals(conn, -len(victims), -freed)
+        self._entries -= len(victims)
+        self._bytes -= freed
+        self.evictions += len(victims)
+    
+    def clear(self) -> None:
+        """清空全部条目"""
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries")
+                self._set_totals(conn, 0, 0)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._run(delete, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息（条目数和字节数为本进程最近一次写入时读到的计数器，包含其他进程写入的条目）
+        
+        Returns:
+            与 LRUCache.stats() 相同格式的字典，另含被锁跳过的次数和是否可用
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_entries": 0,
+            "max_bytes": self.max_bytes,
+            "busy": self.busy,
+            "enabled": self.enabled,
+        }
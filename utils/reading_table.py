@@ -0,0 +1,134 @@
+"""
+读音表工具模块
+把 {词: [读音, ...]} 形式的词典整理为紧凑的只读表
+
+- 读音在加载时统一转为平假名并去重（保持原顺序），查询时不再转换
+- 读音字符串经 sys.intern 驻留；读音元组和读音集合按内容共享，
+  读音完全相同的条目（如同音的汉字）指向同一个元组和同一个 frozenset
+- 读音集合按读音元组在首次查询时构造并缓存，每个不同的读音元组只构造一次；
+  成员判断（白名单、裁剪）直接使用。集合不在加载时全部构造：frozenset
+  的固定开销比共享元组省下的内存还大，而实际查询到的汉字只是一小部分
+"""
+import sys
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional, Set, Tuple
+
+from utils.kana_converter import katakana_to_hiragana
+
+
+EMPTY_READINGS: Tuple[str, ...] = ()
+EMPTY_READING_SET: FrozenSet[str] = frozenset()
+
+
+class ReadingTable:
+    """只读读音表（值为共享的平假名读音元组）"""
+    
+    def __init__(self, entries: Iterable[Tuple[Any, Any]], to_hiragana: bool = True):
+        """
+        Args:
+            entries: (词, 读音列表) 序列，如 dict.items()；非字符串键、非列表值和空读音被忽略
+            to_hiragana: 是否将读音转为平假名
+        """
+        self._data: Dict[str, Tuple[str, ...]] = {}
+        self._sets: Dict[Tuple[str, ...], FrozenSet[str]] = {}
+        tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        
+        for key, readings in entries:
+            if not isinstance(key, str) or not isinstance(readings, (list, tuple)):
+                continue
+            normalized = []
+            for r in readings:
+                if not isinstance(r, str) or not r:
+                    continue
+                if to_hiragana:
+                    r = katakana_to_hiragana(r)
+                normalized.append(sys.intern(r))
+            if not normalized:
+                continue
+            value = tuple(dict.fromkeys(normalized))
+            shared = tuples.get(value)
+            if shared is None:
+                shared = tuples[value] = value
+            self._data[sys.intern(key)] = shared
+    
+    def get(self, key: str, default: Optional[Tuple[str, ...]] = EMPTY_READINGS) -> Optional[Tuple[str, ...]]:
+        """获取读音元组（平假名，已去重），不存在时返回default"""
+        return self._data.get(key, default)
+    
+    def reading_set(self, key: str) -> FrozenSet[str]:
+        """获取读音集合（与读音相同的其他条目共享），不存在时返回空集合"""
+        value = self._data.get(key)
+        if value is None:
+            return EMPTY_READING_SET
+        result = self._sets.get(value)
+        if result is None:
+            result = self._sets.setdefault(value, frozenset(value))
+        return result
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+    
+    def keys(self) -> Iterator[str]:
+        """遍历所有键"""
+        return iter(self._data)
+    
+    def items(self) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+        """遍历 (键, 读音元组)"""
+        return iter(self._data.items())
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        统计共享情况
+        
+        Returns:
+            条目数、不同读音元组数、读音总数、不同读音字符串数、已构造的读音集合数
+        """
+        distinct_tuples = {id(value): value for value in self._data.values()}
+        distinct_strings: Set[str] = set()
+        for value in distinct_tuples.values():
+            distinct_strings.update(value)
+        return {
+            "entries": len(self._data),
+            "distinct_tuples": len(distinct_tuples),
+            "readings": sum(len(value) for value in self._data.values()),
+            "distinct_readings": len(distinct_strings),
+            "reading_sets": len(self._sets),
+        }
+    
+    def footprint(self) -> int:
+        """估算占用的字节数（共享对象只计一次，含已构造的读音集合）"""
+        return deep_sizeof(self._data, self._sets)
+
+
+def deep_sizeof(*objects: Any) -> int:
+    """
+    估算对象图占用的字节数（同一对象只计一次，因此能反映驻留和共享的效果）
+    
+    与 utils.lru_cache.estimate_size 不同，后者按值重复计数，适合估算单个缓存条目。
+    
+    Args:
+        objects: 待估算的对象（dict/list/tuple/set/frozenset 递归展开）
+    
+    Returns:
+        估算字节数
+    """
+    seen: Set[int] = set()
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
@@ -2,7 +2,61 @@
 文本处理工具模块
 包含汉字检测、假名提取等文本处理功能
 """
-from typing import List, Set
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+
+# 汉字的Unicode范围: CJK统一汉字 / CJK扩展A / CJK兼容汉字
+_KANJI_RANGES = '\u4e00-\u9fff\u3400-\u4dbf\uf900-\ufaff'
+
+_KANJI_RE = re.compile(f'[{_KANJI_RANGES}]')
+_TRAILING_HIRAGANA_RE = re.compile(r'[\u3040-\u309f]*\Z')
+
+# 字符类别标志（classify_text 的返回值为出现过的类别按位或）
+CHAR_KANJI = 1
+CHAR_HIRAGANA = 2
+CHAR_KATAKANA = 4        # ァ-ヶ
+CHAR_PROLONGED = 8       # 长音符 ー
+CHAR_KATAKANA_MARK = 16  # 片假名区内的其他符号（・ヽヾ等）
+CHAR_LATIN = 32
+CHAR_SPACE = 64
+CHAR_OTHER = 128
+
+# 按连续同类字符分段扫描，每段只在Python层处理一次
+_CHAR_CLASS_RE = re.compile(
+    f'(?P<kanji>[{_KANJI_RANGES}]+)'
+    r'|(?P<hiragana>[\u3040-\u309f]+)'
+    r'|(?P<katakana>[ァ-ヶ]+)'
+    r'|(?P<prolonged>ー+)'
+    r'|(?P<katakana_mark>[\u30a0-\u30ff]+)'
+    r'|(?P<latin>[A-Za-z]+)'
+    r'|(?P<space>\s+)'
+    f'|(?P<other>[^{_KANJI_RANGES}\\u3040-\\u30ffA-Za-z\\s]+)'
+)
+
+_CLASS_FLAGS: Dict[str, int] = {
+    'kanji': CHAR_KANJI,
+    'hiragana': CHAR_HIRAGANA,
+    'katakana': CHAR_KATAKANA,
+    'prolonged': CHAR_PROLONGED,
+    'katakana_mark': CHAR_KATAKANA_MARK,
+    'latin': CHAR_LATIN,
+    'space': CHAR_SPACE,
+    'other': CHAR_OTHER,
+}
+
+# 浊/半浊音分组 -> 每个假名对应的变体集合
+_HIRA_VOICING_GROUPS = [
+    ['か','が'], ['き','ぎ'], ['く','ぐ'], ['け','げ'], ['こ','ご'],
+    ['さ','ざ'], ['し','じ'], ['す','ず'], ['せ','ぜ'], ['そ','ぞ'],
+    ['た','だ'], ['ち','ぢ'], ['つ','づ'], ['て','で'], ['と','ど'],
+    ['は','ば','ぱ'], ['ひ','び','ぴ'], ['ふ','ぶ','ぷ'], 
+    ['へ','べ','ぺ'], ['ほ','ぼ','ぽ'], ['う','ゔ']
+]
+_VOICING_VARIANTS: Dict[str, FrozenSet[str]] = {
+    h: frozenset(grp) for grp in _HIRA_VOICING_GROUPS for h in grp
+}
 
 
 def contains_kanji(text: str) -> bool:
@@ -15,13 +69,82 @@ def contains_kanji(text: str) -> bool:
     Returns:
         True如果包含汉字，否则False
     """
-    for char in text:
-        # 汉字的Unicode范围
-        if ('\u4e00' <= char <= '\u9fff' or  # CJK统一汉字
-            '\u3400' <= char <= '\u4dbf' or  # CJK扩展A
-            '\uf900' <= char <= '\ufaff'):   # CJK兼容汉字
-            return True
-    return False
+    return _KANJI_RE.search(text) is not None
+
+
+@lru_cache(maxsize=8192)
+def is_common_kanji(char: str) -> bool:
+    """
+    判断是否为常见汉字（JIS X 0208 第一水准，EUC-JP编码首字节0xB0-0xCF）
+    
+    Args:
+        char: 单个汉字
+        
+    Returns:
+        True如果属于第一水准，第二水准及以外的汉字返回False
+    """
+    try:
+        encoded = char.encode('euc_jp')
+    except UnicodeEncodeError:
+        return False
+    return len(encoded) == 2 and 0xB0 <= encoded[0] <= 0xCF
+
+
+def contains_rare_kanji(text: str) -> bool:
+    """
+    检测文本是否包含生僻汉字（第一水准以外的汉字）
+    
+    Args:
+        text: 待检查的文本
+        
+    Returns:
+        True如果包含生僻汉字
+    """
+    return any(not is_common_kanji(c) for c in _KANJI_RE.findall(text))
+
+
+@lru_cache(maxsize=65536)
+def classify_text(text: str) -> int:
+    """
+    一次扫描得到文本中出现的字符类别
+    
+    Args:
+        text: 待检查的文本
+        
+    Returns:
+        CHAR_* 标志的按位或，空文本返回0
+    """
+    flags = 0
+    for m in _CHAR_CLASS_RE.finditer(text):
+        flags |= _CLASS_FLAGS[m.lastgroup]
+    return flags
+
+
+def classify_tokens(surfaces: Iterable[str]) -> List[int]:
+    """
+    批量分类一组token表面形式
+    
+    Args:
+        surfaces: 表面形式序列
+        
+    Returns:
+        与输入一一对应的类别标志列表
+    """
+    return [classify_text(s) for s in surfaces]
+
+
+def only_classes(flags: int, allowed: int) -> bool:
+    """
+    判断类别标志是否非空且只包含允许的类别
+    
+    Args:
+        flags: classify_text 的返回值
+        allowed: 允许的 CHAR_* 标志按位或
+        
+    Returns:
+        True如果全部字符都属于允许的类别
+    """
+    return flags != 0 and not (flags & ~allowed)
 
 
 def extract_trailing_hiragana(text: str) -> str:
@@ -36,10 +159,7 @@ def extract_trailing_hiragana(text: str) -> str:
     """
     if not text:
         return ""
-    i = len(text) - 1
-    while i >= 0 and ('\u3040' <= text[i] <= '\u309f'):
-        i -= 1
-    return text[i+1:]
+    return _TRAILING_HIRAGANA_RE.search(text).group()
 
 
 def collect_next_hiragana(tokens: List, current_index: int, max_chars: int = 2) -> str:
@@ -79,19 +199,7 @@ def voicing_variants(h: str) -> Set[str]:
     Returns:
         变体字符集合
     """
-    # 浊/半浊音分组
-    _HIRA_VOICING_GROUPS = [
-        ['か','が'], ['き','ぎ'], ['く','ぐ'], ['け','げ'], ['こ','ご'],
-        ['さ','ざ'], ['し','じ'], ['す','ず'], ['せ','ぜ'], ['そ','ぞ'],
-        ['た','だ'], ['ち','ぢ'], ['つ','づ'], ['て','で'], ['と','ど'],
-        ['は','ば','ぱ'], ['ひ','び','ぴ'], ['ふ','ぶ','ぷ'], 
-        ['へ','べ','ぺ'], ['ほ','ぼ','ぽ'], ['う','ゔ']
-    ]
-    
     if not h:
         return set()
-    for grp in _HIRA_VOICING_GROUPS:
-        if h in grp:
-            return set(grp)
-    return {h}
+    return set(_VOICING_VARIANTS.get(h, (h,)))
 
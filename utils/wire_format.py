@@ -0,0 +1,223 @@
+"""
+响应传输格式工具模块
+提供注音结果的紧凑列式编码和gzip压缩
+
+紧凑格式（Content-Type: application/vnd.furigana.compact+json，版本1）:
+    {
+        "v": 1,
+        "strings": ["", "明日", "あした", ...],   # 字符串表，0号固定为空字符串
+        "alts": [[], [2, 5], ...],                # 候选列表表（字符串下标），0号固定为空列表
+        "lines": [                                # 每行三个平行数组，空行为 []
+            [[表面下标...], [读音下标...], [候选表下标...]],
+            ...
+        ]
+    }
+    读音下标为 -1 表示读音与表面相同；整行候选均为空时省略第三个数组；
+    has_alternatives 由候选数 > 1 推出，不再传输。
+
+流式（NDJSON）时每条记录为 [新增字符串, 新增候选列表, 行]，
+解码方在同一响应内累积字符串表和候选表。
+
+增量注音（/api/furigana/diff）以行哈希标识行：UTF-8字节上的32位FNV-1a，
+8位小写十六进制，与 js/api.js 的 hashLine 一致。
+"""
+import gzip
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+
+COMPACT_MIMETYPE = 'application/vnd.furigana.compact+json'
+COMPACT_VERSION = 1
+
+# 响应头：标明响应体使用的格式（前端据此选择解码方式，兼容旧版服务端）
+FORMAT_HEADER = 'X-Furigana-Format'
+
+# 读音与表面相同
+SAME_AS_SURFACE = -1
+
+_FNV_OFFSET = 0x811c9dc5
+_FNV_PRIME = 0x01000193
+
+
+class CompactEncoder:
+    """紧凑格式编码器（同一响应内共享字符串表和候选表）"""
+    
+    def __init__(self):
+        self.strings: List[str] = [""]
+        self.alts: List[List[int]] = [[]]
+        self._string_ids: Dict[str, int] = {"": 0}
+        self._alt_ids: Dict[Tuple[str, ...], int] = {(): 0}
+        self._sent_strings = 1
+        self._sent_alts = 1
+    
+    def _string_id(self, value: str) -> int:
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+    
+    def _alt_id(self, readings: Sequence[str]) -> int:
+        key = tuple(readings)
+        index = self._alt_ids.get(key)
+        if index is None:
+            index = self._alt_ids[key] = len(self.alts)
+            self.alts.append([self._string_id(r) for r in key])
+        return index
+    
+    def encode_line(self, tokens: List[Dict[str, Any]]) -> List[List[int]]:
+        """
+        编码一行
+        
+        Args:
+            tokens: 行token列表（surface/reading/alternatives/has_alternatives）
+        
+        Returns:
+            [表面下标, 读音下标, 候选表下标]，候选均为空时只有前两个数组
+        """
+        if not tokens:
+            return []
+        surfaces = []
+        readings = []
+        alts = []
+        for token in tokens:
+            surface = token["surface"]
+            reading = token["reading"]
+            surfaces.append(self._string_id(surface))
+            readings.append(SAME_AS_SURFACE if reading == surface else self._string_id(reading))
+            alts.append(self._alt_id(token["alternatives"]))
+        if any(alts):
+            return [surfaces, readings, alts]
+        return [surfaces, readings]
+    
+    def encode(self, lines: Iterable[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        编码完整响应
+        
+        Args:
+            lines: 每行的token列表
+        
+        Returns:
+            紧凑格式字典
+        """
+        encoded = [self.encode_line(tokens) for tokens in lines]
+        return {"v": COMPACT_VERSION, "strings": self.strings, "alts": self.alts, "lines": encoded}
+    
+    def encode_stream_record(self, tokens: List[Dict[str, Any]]) -> List[Any]:
+        """
+        编码流式响应中的一行
+        
+        Returns:
+            [自上条记录以来新增的字符串, 新增的候选列表, 行]
+        """
+        line = self.encode_line(tokens)
+        new_strings = self.strings[self._sent_strings:]
+        new_alts = self.alts[self._sent_alts:]
+        self._sent_strings = len(self.strings)
+        self._sent_alts = len(self.alts)
+        return [new_strings, new_alts, line]
+
+
+def encode_compact(lines: Iterable[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """将注音结果编码为紧凑格式"""
+    return CompactEncoder().encode(lines)
+
+
+def decode_compact(payload: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """
+    解码紧凑格式（与前端 js/api.js 的解码逻辑一致，供工具和校验使用）
+    
+    Args:
+        payload: 紧凑格式字典
+    
+    Returns:
+        每行的token列表
+    
+    Raises:
+        ValueError: 版本不支持
+    """
+    if payload.get("v") != COMPACT_VERSION:
+        raise ValueError(f"不支持的紧凑格式版本: {payload.get('v')}")
+    strings = payload["strings"]
+    alt_lists = [[strings[i] for i in ids] for ids in payload["alts"]]
+    
+    result = []
+    for line in payload["lines"]:
+        if not line:
+            result.append([])
+            continue
+        surfaces, readings = line[0], line[1]
+        alts = line[2] if len(line) > 2 else [0] * len(surfaces)
+        tokens = []
+        for s, r, a in zip(surfaces, readings, alts):
+            surface = strings[s]
+            alternatives = list(alt_lists[a])
+            tokens.append({
+                "surface": surface,
+                "reading": surface if r == SAME_AS_SURFACE else strings[r],
+                "alternatives": alternatives,
+                "has_alternatives": len(alternatives) > 1
+            })
+        result.append(tokens)
+    return result
+
+
+def line_hash(text: str) -> str:
+    """
+    计算行哈希（32位FNV-1a）
+    
+    Args:
+        text: 行文本
+    
+    Returns:
+        8位十六进制哈希
+    """
+    h = _FNV_OFFSET
+    for byte in text.encode('utf-8'):
+        h = ((h ^ byte) * _FNV_PRIME) & 0xffffffff
+    return f"{h:08x}"
+
+
+def wants_compact(data: Optional[Dict[str, Any]], accept: str) -> bool:
+    """
+    判断请求是否要求紧凑格式（请求体 "format": "compact" 或 Accept 优先紧凑格式）
+    
+    Args:
+        data: 请求体
+        accept: Accept 请求头
+    """
+    if data and data.get("format") == "compact":
+        return True
+    if not accept:
+        return False
+    # JSON在前：Accept 为 */* 等不区分的值时保持原格式
+    best = parse_accept_header(accept, MIMEAccept).best_match(['application/json', COMPACT_MIMETYPE])
+    return best == COMPACT_MIMETYPE
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding 是否接受gzip"""
+    if not accept_encoding:
+        return False
+    return parse_accept_header(accept_encoding)["gzip"] > 0
+
+
+def gzip_body(body: bytes, accept_encoding: str, min_bytes: int, level: int) -> Optional[bytes]:
+    """
+    按需gzip压缩响应体
+    
+    Args:
+        body: 原始响应体
+        accept_encoding: Accept-Encoding 请求头
+        min_bytes: 小于该大小时不压缩
+        level: 压缩级别(1-9)
+    
+    Returns:
+        压缩后的数据；不需要压缩或压缩无收益时返回None
+    """
+    if len(body) < min_bytes or not accepts_gzip(accept_encoding):
+        return None
+    compressed = gzip.compress(body, compresslevel=level)
+    return compressed if len(compressed) < len(body) else None